@@ -1,6 +1,6 @@
 import atexit
 from pathlib import Path
-from typing import List, Iterable
+from typing import Iterable, List, Optional, Set
 
 import databusclient
 
@@ -9,23 +9,26 @@ from models.databus_identifier import (
     DatabusFileMetadata,
     DatabusVersionIdentifier,
 )
-from models.user_interaction import ProcessStepLog, check_is_nir_based_on_log
+from models.user_interaction import check_is_nir_based_on_log, classify_failure
 from utils import graphing
-from update import update_archivo
+from update import update_archivo, revisit_schedule, pre_check
 import json
 import os
 from datetime import datetime
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from crawling import discovery, sources
-from utils import archivo_config, string_tools, database_utils
+from crawling import discovery, sources, frontier, negative_cache
+from crawling.robots_cache import robots_cache
+from utils import archivo_config, string_tools, database_utils, http_client
 from querying import query_databus
 from utils.archivoLogs import (
     discovery_logger,
     diff_logger,
     dev_diff_logger,
 )
+from utils.parse_cache import parse_cache
+from utils.uri_index import URIIndex
 from utils.validation import TestSuite
 from webservice import app, db, dbModels
 
@@ -34,135 +37,265 @@ cron = BackgroundScheduler(daemon=True)
 cron.start()
 
 
-# Check whether the uri is in archivo uris or an archivo uri is a substring of it
+# Check whether the uri is in archivo uris or an archivo uri is a prefix of it
 # True returned when already contained, False otherwise
-def check_uri_containment(uri: str, archivo_uris: List[str]) -> bool:
-    for au in archivo_uris:
-        if uri == au or au in uri:
-            return True
-    return False
+def check_uri_containment(uri: str, archivo_uris: URIIndex) -> bool:
+    return archivo_uris.contains_prefix_of(uri)
 
 
-# This is the discovery process
+# This is the discovery process, it fills the discovery frontier which is crawled by drain_discovery_frontier
 def ontology_discovery():
-    # init parameters
-    test_suite: TestSuite = TestSuite()
+    all_onts = URIIndex(
+        ont.uri for ont in db.session.query(dbModels.Ontology.uri).all()
+    )
+    blocked_uris = negative_cache.get_blocked_uris()
 
     for source, access_function in sources.SOURCES_GETFUN_MAPPING.items():
         discovery_logger.info(f"Started discovery of {source} URIs...")
-        run_discovery(
-            lst=access_function(),
-            source=source,
-            test_suite=test_suite,
-        )
+        enqueue_candidates(access_function(), source, all_onts, blocked_uris)
     discovery_logger.info("Started discovery of Databus SPOs...")
     for uri_list in query_databus.get_identifier_on_databus(logger=discovery_logger):
-        run_discovery(lst=uri_list, source="SPOs", test_suite=test_suite)
+        enqueue_candidates(uri_list, "SPOs", all_onts, blocked_uris)
+    discovery_logger.info(f"Discovery frontier size: {frontier.size()}")
 
 
-def run_discovery(
-    lst: Iterable[str], source: str, test_suite: TestSuite, logger=discovery_logger
+def enqueue_candidates(
+    lst: Iterable[str],
+    source: str,
+    all_onts: URIIndex,
+    blocked_uris: Set[str],
+    logger=discovery_logger,
 ):
     if lst is None:
         return
-    all_onts = [ont.uri for ont in db.session.query(dbModels.Ontology.uri).all()]
-    logger.info(f"Starting the discovery of URIs from {source}")
-    for uri in lst:
-        if check_uri_containment(uri, all_onts):
-            continue
-        output: List[ProcessStepLog] = []
-        logger.info(f"Crawling the URI {uri}")
-        try:
-            archivo_version = discovery.discover_new_uri(
-                uri=uri,
-                vocab_uri_cache=all_onts,
-                test_suite=test_suite,
-                source=source,
-                logger=logger,
-                process_log=output,
-            )
-        except Exception:
-            discovery_logger.exception(
-                f"Problem during validating {uri}", exc_info=True
-            )
-            continue
-        if archivo_version:
-            logger.info(f"Successfully crawled the URI {uri}: {output[-1].message}")
-            dev_version = archivo_version.handle_dev_version()
-            dbOnt, dbVersion = database_utils.get_database_entries(archivo_version)
-            if dev_version:
-                dev_ont, dev_version = database_utils.get_database_entries(dev_version)
-                db.session.add(dev_ont)
-                db.session.add(dev_version)
-                dbOnt.devel = dev_ont.uri
-            db.session.add(dbOnt)
-            db.session.add(dbVersion)
+    # known ontologies and URIs that failed recently are not crawled again
+    candidates = (
+        uri
+        for uri in lst
+        if not check_uri_containment(uri, all_onts)
+        and not negative_cache.is_blocked(uri, blocked_uris)
+    )
+    added = frontier.enqueue_all(candidates, source)
+    logger.info(f"Added {added} URIs from {source} to the discovery frontier")
+
+
+def drain_discovery_frontier():
+    tasks = frontier.claim_batch()
+    if not tasks:
+        return
+    discovery_logger.info(f"Crawling {len(tasks)} URIs of the discovery frontier")
+    run_discovery(tasks, test_suite=TestSuite())
+    discovery_logger.info(f"Robots.txt cache stats: {robots_cache.stats()}")
+    discovery_logger.info(f"Parse cache stats: {parse_cache.stats()}")
+    discovery_logger.debug(f"HTTP connections per host: {http_client.host_stats()}")
+
+
+def run_discovery(
+    tasks: Iterable[discovery.DiscoveryTask],
+    test_suite: TestSuite,
+    logger=discovery_logger,
+):
+    all_onts = URIIndex(
+        ont.uri for ont in db.session.query(dbModels.Ontology.uri).all()
+    )
+    blocked_uris = negative_cache.get_blocked_uris()
+
+    def filter_known(task_iterable: Iterable[discovery.DiscoveryTask]):
+        for task in task_iterable:
+            if check_uri_containment(
+                task.uri, all_onts
+            ) or negative_cache.is_blocked(task.uri, blocked_uris):
+                frontier.mark_done(task.uri)
+            else:
+                yield task
+
+    # the workers only crawl and deploy, this thread is the only one writing to the database
+    for task, result, exception in discovery.discover_new_uris(
+        filter_known(tasks),
+        vocab_uri_cache=all_onts,
+        test_suite=test_suite,
+        logger=logger,
+        defer_linked=True,
+    ):
+        uri = task.uri
+        if exception is not None:
+            logger.error(f"Problem during validating {uri}", exc_info=exception)
+            frontier.mark_failed(uri)
             try:
                 db.session.commit()
-                all_onts.append(archivo_version.nir)
             except Exception:
                 db.session.rollback()
+            continue
+        output = result.process_log
+        archivo_version = result.archivo_version
+        frontier.mark_done(uri)
+        for linked_uri, depth in result.linked_uris:
+            if not check_uri_containment(
+                linked_uri, all_onts
+            ) and not negative_cache.is_blocked(linked_uri, blocked_uris):
+                frontier.enqueue(linked_uri, "linked", depth=depth)
+        if archivo_version:
+            logger.info(f"Successfully crawled the URI {uri}: {output[-1].message}")
+            negative_cache.record_success(uri)
+            if archivo_version.nir in all_onts:
+                # another worker discovered the same ontology in the meantime
+                logger.warning(f"Ontology {archivo_version.nir} was already added")
+            else:
+                dbOnt, dbVersion = database_utils.get_database_entries(
+                    archivo_version
+                )
+                if result.dev_version:
+                    dev_ont, dev_version = database_utils.get_database_entries(
+                        result.dev_version
+                    )
+                    db.session.add(dev_ont)
+                    db.session.add(dev_version)
+                    dbOnt.devel = dev_ont.uri
+                db.session.add(dbOnt)
+                db.session.add(dbVersion)
         elif check_is_nir_based_on_log(output):
             logger.info(f"No feasible result for URI {uri}: {output[-1].message}")
             fallout = dbModels.Fallout(
                 uri=uri,
-                source=source,
+                source=task.source,
                 inArchivo=False,
                 error=json.dumps([step.to_dict() for step in output]),
             )
             db.session.add(fallout)
-            try:
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
+        failure_class = classify_failure(output, uri)
+        if not archivo_version and failure_class is not None:
+            negative_cache.record_failure(uri, failure_class)
+        try:
+            db.session.commit()
+            if archivo_version:
+                all_onts.add(archivo_version.nir)
+        except Exception:
+            db.session.rollback()
+    # known and blocked tasks filtered after the last result are only marked done in the session
+    try:
+        db.session.commit()
+    except Exception:
+        logger.exception("Couldn't remove the filtered URIs from the discovery frontier")
+        db.session.rollback()
+
+
+# the latest versions on the databus, queried at most every UPDATE_DATABUS_QUERY_INTERVAL_MINUTES
+latest_version_cache = query_databus.LatestVersionCache()
+
+
+def get_databus_artifact_url(group: str, artifact: str) -> str:
+    return f"{archivo_config.DATABUS_BASE}/{archivo_config.DATABUS_USER}/{group}/{artifact}"
 
 
 def ontology_official_update():
-    all_ontologies_info = query_databus.nir_to_latest_version_files()
+    now = datetime.now()
+    # only the due ontologies are loaded, most hourly runs check a few of them
+    due_ontologies = revisit_schedule.get_due_ontologies(dbModels.OfficialOntology, now)
+    if not due_ontologies:
+        diff_logger.info("No ontologies are due for a check")
+        return
+    all_ontologies_info = latest_version_cache.get(now)
     if all_ontologies_info is None:
         diff_logger.warning(
             "There seems to be an error with the databus, no official diff possible"
         )
         return
-    diff_logger.info("Started diff at " + datetime.now().strftime("%Y.%m.%d; %H:%M:%S"))
-    test_suite = TestSuite()
-    for i, ont in enumerate(db.session.query(dbModels.OfficialOntology).all()):
+    diff_logger.info("Started diff at " + now.strftime("%Y.%m.%d; %H:%M:%S"))
+    ontologies = {ont.uri: ont for ont in due_ontologies}
+    tasks = []
+    for ont in ontologies.values():
 
-        # skip problematic ontologies
+        # skip problematic ontologies, recorded as failed check so they aren't due again right away
         if ont.uri in archivo_config.DIFF_SKIP_ONTOLOGY_URLS:
-            diff_logger.info(
-                f"{str(i + 1)}: Skipped ontology {ont.uri} due to earlier problems..."
-            )
+            diff_logger.info(f"Skipped ontology {ont.uri} due to earlier problems...")
+            revisit_schedule.record_check(ont.uri, "official", None)
             continue
 
-        data_writer = models.data_writer.FileWriter(
-            path_base=Path(archivo_config.LOCAL_PATH),
-            target_url_base=archivo_config.PUBLIC_URL_BASE,
-            logger=diff_logger,
-        )
-
-        diff_logger.info(f"{str(i + 1)}: Handling ontology: {ont.uri}")
         group, artifact = string_tools.generate_databus_identifier_from_uri(ont.uri)
-        databusURL = f"{archivo_config.DATABUS_BASE}/{archivo_config.DATABUS_USER}/{group}/{artifact}"
+        databusURL = get_databus_artifact_url(group, artifact)
         try:
             urlInfo = all_ontologies_info[databusURL]
         except KeyError:
             diff_logger.error(f"Could't find databus artifact for {ont.uri}")
+            revisit_schedule.record_check(ont.uri, "official", None)
             continue
-        try:
-            success, message, archivo_version = update_archivo.update_for_ontology_uri(
+        tasks.append(
+            update_archivo.UpdateTask(
                 uri=ont.uri,
-                last_version_timestamp=urlInfo["version"],
-                test_suite=test_suite,
                 source=ont.source,
-                data_writer=data_writer,
-                logger=diff_logger,
+                last_version_timestamp=urlInfo["version"],
             )
-        except Exception:
-            diff_logger.exception(f"There was an error handling {str(ont)}")
+        )
+    diff_logger.info(f"{len(tasks)} ontologies are due for a check")
+
+    # the workers only crawl and deploy, this thread is the only one writing to the database
+    pending_results = 0
+    for i, (task, result, exception) in enumerate(
+        run_update_cycle(tasks, logger=diff_logger)
+    ):
+        diff_logger.info(f"{str(i + 1)}/{len(tasks)}: Handled ontology: {task.uri}")
+        if exception is not None:
+            diff_logger.error(
+                f"There was an error handling {task.uri}", exc_info=exception
+            )
+            revisit_schedule.record_check(task.uri, "official", None)
             continue
+        write_official_update_result(ontologies[task.uri], result)
+        if result.success and result.archivo_version is not None:
+            # the cached databus versions stay the latest ones until they are queried again
+            version_id = result.archivo_version.db_version_identifier
+            latest_version_cache.set_version(
+                get_databus_artifact_url(version_id.group, version_id.artifact),
+                version_id.version,
+            )
+        revisit_schedule.record_check(task.uri, "official", get_change_state(result))
+        pending_results += 1
+        if pending_results >= archivo_config.UPDATE_COMMIT_BATCH_SIZE:
+            commit_update_results(diff_logger)
+            pending_results = 0
+    commit_update_results(diff_logger)
+    diff_logger.info(f"Parse cache stats: {parse_cache.stats()}")
 
-        if success is None:
+
+def run_update_cycle(tasks: List[update_archivo.UpdateTask], logger):
+    """Yields the (task, result, exception) tuples of all tasks. The ontologies are pre-checked concurrently
+    first, unchanged ones get their result right away and only the others go through the update pipeline."""
+
+    if archivo_config.UPDATE_PRECHECK_ENABLED:
+        tasks, unchanged_tasks = pre_check.split_unchanged(tasks, logger=logger)
+    else:
+        unchanged_tasks = []
+    for task in unchanged_tasks:
+        yield task, update_archivo.UpdateResult(
+            False, f"No different version for {task.dev_uri or task.uri}", None
+        ), None
+    yield from update_archivo.update_ontologies(
+        tasks, test_suite=TestSuite(), logger=logger
+    )
+
+
+def write_official_update_result(
+    ont: dbModels.OfficialOntology, result: update_archivo.UpdateResult
+):
+    success, message, archivo_version = (
+        result.success,
+        result.message,
+        result.archivo_version,
+    )
+    if success is None:
+        dbFallout = dbModels.Fallout(
+            uri=ont.uri,
+            source=ont.source,
+            inArchivo=True,
+            error=message,
+            ontology=ont.uri,
+        )
+        ont.crawling_status = False
+        db.session.add(dbFallout)
+    elif success:
+        if message is None: # need to take care in deployment routine that no message means crawling was successful
+            ont.crawling_status = True
+        else: # in which case(s) of a sucess is a message thrown??? given that no message is supposed to be thrown on success???
             dbFallout = dbModels.Fallout(
                 uri=ont.uri,
                 source=ont.source,
@@ -172,60 +305,67 @@ def ontology_official_update():
             )
             ont.crawling_status = False
             db.session.add(dbFallout)
-        elif success:
-            if message is None: # need to take care in deployment routine that no message means crawling was successful
-                ont.crawling_status = True
-            else: # in which case(s) of a sucess is a message thrown??? given that no message is supposed to be thrown on success???
-                dbFallout = dbModels.Fallout(
-                    uri=ont.uri,
-                    source=ont.source,
-                    inArchivo=True,
-                    error=message,
-                    ontology=ont.uri,
+
+        # the worker already checked for a new trackThis URI
+        dev_version = result.dev_version
+        _, dbVersion = database_utils.get_database_entries(archivo_version)
+        db.session.add(dbVersion)
+        if dev_version:
+            dev_ont, dev_version = database_utils.get_database_entries(dev_version)
+            # update with new trackThis URI
+            if ont.devel is not None and ont.devel != dev_ont.uri:
+                old_dev_obj = (
+                    db.session.query(dbModels.DevelopOntology)
+                    .filter_by(uri=ont.devel)
+                    .first()
                 )
-                ont.crawling_status = False
-                db.session.add(dbFallout)
-
-            # check for new trackThis URI
-            dev_version = archivo_version.handle_dev_version()
-            _, dbVersion = database_utils.get_database_entries(archivo_version)
-            db.session.add(dbVersion)
-            if dev_version:
-                dev_ont, dev_version = database_utils.get_database_entries(dev_version)
-                # update with new trackThis URI
-                if ont.devel is not None and ont.devel != dev_ont.uri:
-                    old_dev_obj = (
-                        db.session.query(dbModels.DevelopOntology)
-                        .filter_by(uri=ont.devel)
-                        .first()
-                    )
-                    db.session.add(dev_ont)
-                    db.session.add(dev_version)
-                    # change old dev versions to new one
-                    for v in (
-                        db.session.query(dbModels.Version)
-                        .filter_by(ontology=ont.devel)
-                        .all()
-                    ):
-                        v.ontology = dev_ont.uri
-                    #
-                    ont.devel = dev_ont.uri
-                    db.session.delete(old_dev_obj)
-                # when new trackThis was found
-                else:
-                    db.session.add(dev_ont)
-                    db.session.add(dev_version)
-                    ont.devel = dev_ont.uri
-        else:
-            ont.crawling_status = True
-        # commit changes to database
-        try:
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+                db.session.add(dev_ont)
+                db.session.add(dev_version)
+                # change old dev versions to new one
+                for v in (
+                    db.session.query(dbModels.Version)
+                    .filter_by(ontology=ont.devel)
+                    .all()
+                ):
+                    v.ontology = dev_ont.uri
+                #
+                ont.devel = dev_ont.uri
+                db.session.delete(old_dev_obj)
+                revisit_schedule.delete_schedule(old_dev_obj.uri)
+            # when new trackThis was found
+            else:
+                db.session.add(dev_ont)
+                db.session.add(dev_version)
+                ont.devel = dev_ont.uri
+    else:
+        ont.crawling_status = True
+
+
+def get_change_state(result: update_archivo.UpdateResult) -> Optional[bool]:
+    """Whether the check found a change, None if it failed"""
+    if result.success is None:
+        return None
+    # a new version which couldn't be deployed still is a change
+    return bool(result.success) or result.archivo_version is not None
+
+
+def commit_update_results(logger):
+    try:
+        db.session.commit()
+    except Exception:
+        logger.exception("Couldn't write the update results to the database")
+        db.session.rollback()
 
 
 def ontology_dev_update():
+    ontologies = {
+        ont.uri: ont
+        for ont in revisit_schedule.get_due_ontologies(
+            dbModels.DevelopOntology, datetime.now()
+        )
+    }
+    if not ontologies:
+        return
     allOntologiesInfo = query_databus.nir_to_latest_version_files()
     if allOntologiesInfo is None:
         dev_diff_logger.warning(
@@ -235,9 +375,8 @@ def ontology_dev_update():
     dev_diff_logger.info(
         "Started diff at " + datetime.now().strftime("%Y.%m.%d; %H:%M:%S")
     )
-    testSuite = TestSuite()
-    for ont in db.session.query(dbModels.DevelopOntology).all():
-        dev_diff_logger.info(f"Handling ontology: {ont.official} (DEV)")
+    tasks = []
+    for ont in ontologies.values():
         group, artifact = string_tools.generate_databus_identifier_from_uri(
             ont.official, dev=True
         )
@@ -246,52 +385,52 @@ def ontology_dev_update():
             urlInfo = allOntologiesInfo[databusURL]
         except KeyError:
             dev_diff_logger.error(f"Could't find databus artifact for {ont.uri}")
+            revisit_schedule.record_check(ont.uri, "dev", None)
             continue
-
-        data_writer = models.data_writer.FileWriter(
-            path_base=Path(archivo_config.LOCAL_PATH),
-            target_url_base=archivo_config.PUBLIC_URL_BASE,
-            logger=dev_diff_logger,
-        )
-
-        try:
-            success, message, archivo_version = update_archivo.update_for_ontology_uri(
+        tasks.append(
+            update_archivo.UpdateTask(
                 uri=ont.official,
-                last_version_timestamp=urlInfo["version"],
-                test_suite=testSuite,
                 source=ont.source,
-                data_writer=data_writer,
-                logger=diff_logger,
+                last_version_timestamp=urlInfo["version"],
                 dev_uri=ont.uri,
             )
-        except Exception:
-            dev_diff_logger.exception(f"Problem handling {str(ont)}")
+        )
+
+    # the workers only crawl and deploy, this thread is the only one writing to the database
+    pending_results = 0
+    for task, result, exception in run_update_cycle(tasks, logger=dev_diff_logger):
+        dev_diff_logger.info(f"Handled ontology: {task.uri} (DEV)")
+        if exception is not None:
+            dev_diff_logger.error(
+                f"Problem handling {task.dev_uri}", exc_info=exception
+            )
+            revisit_schedule.record_check(task.dev_uri, "dev", None)
             continue
-        if success is None:
+        ont = ontologies[task.dev_uri]
+        revisit_schedule.record_check(task.dev_uri, "dev", get_change_state(result))
+        if result.success is None:
             dbFallout = dbModels.Fallout(
                 uri=ont.uri,
                 source=ont.source,
                 inArchivo=True,
-                error=message,
+                error=result.message,
                 ontology=ont.uri,
             )
             ont.crawling_status = False
             db.session.add(dbFallout)
-        elif success:
+        elif result.success:
             ont.crawling_status = True
-            _, dev_version = database_utils.get_database_entries(archivo_version)
+            _, dev_version = database_utils.get_database_entries(
+                result.archivo_version
+            )
             db.session.add(dev_version)
-            try:
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
         else:
             ont.crawling_status = True
-            try:
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
-        # commit changes to database
+        pending_results += 1
+        if pending_results >= archivo_config.UPDATE_COMMIT_BATCH_SIZE:
+            commit_update_results(dev_diff_logger)
+            pending_results = 0
+    commit_update_results(dev_diff_logger)
 
 
 # updates the star graph json every midnight
@@ -413,6 +552,8 @@ elif __name__ == "archivo":
         import sys
 
         sys.exit(reason)
+    # creates tables added since the database was set up
+    db.create_all()
     # runs the cronjob when run with gunicorn
     cron = BackgroundScheduler(daemon=True)
     # add the archivo cronjobs:
@@ -441,7 +582,7 @@ elif __name__ == "archivo":
         ontology_official_update,
         "cron",
         id="archivo_official_ontology_update",
-        hour="2,10,18",
+        hour="*",
         day_of_week="mon-sun",
     )
     cron.add_job(
@@ -452,6 +593,13 @@ elif __name__ == "archivo":
         minute="48",
         day_of_week="sat",
     )
+    cron.add_job(
+        drain_discovery_frontier,
+        "cron",
+        id="archivo_discovery_frontier",
+        minute="30",
+        day_of_week="mon-sun",
+    )
     # Explicitly kick off the background thread
     cron.start()
 
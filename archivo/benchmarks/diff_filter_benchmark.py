@@ -0,0 +1,86 @@
+"""Compares the substring scan of the diff's ignore filter with the predicate-indexed triple filter.
+
+Run from the archivo directory:
+    python -m benchmarks.diff_filter_benchmark [--iterations N] [FILE.nt ...]
+
+The files are used as changed triples of a diff. Without files a high-churn diff is generated, where every term
+got a new modification date and some comments mention the ignored properties.
+"""
+import argparse
+import time
+from typing import Callable, List
+
+from utils import archivo_config
+from utils.triple_filter import TripleFilter
+
+
+def generate_changed_triples(term_count: int) -> List[str]:
+    base = "http://example.org/churn#"
+    lines = []
+    for term in range(term_count):
+        subject = f"<{base}Term{term}>"
+        lines += [
+            f'{subject} <http://purl.org/dc/terms/modified> "2023-01-{term % 28 + 1:02d}" .',
+            f'{subject} <http://www.w3.org/2002/07/owl#versionInfo> "1.{term}" .',
+            f'{subject} <http://www.w3.org/2000/01/rdf-schema#label> "Term {term}"@en .',
+        ]
+        if term % 10 == 0:
+            # a real change, which the substring scan wrongly ignores
+            lines.append(
+                f"{subject} <http://www.w3.org/2000/01/rdf-schema#seeAlso> <http://purl.org/dc/terms/modified> ."
+            )
+    return lines
+
+
+def substring_is_ignored(line: str) -> bool:
+    """The filter of the diff before the triple filter"""
+    for prop in archivo_config.DIFF_IGNORE_PROPERTIES:
+        if prop in line:
+            return True
+    return False
+
+
+def measure(
+    name: str, lines: List[str], is_ignored: Callable[[str], bool], iterations: int
+) -> None:
+    ignored = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        ignored = sum(1 for line in lines if is_ignored(line))
+    duration = time.perf_counter() - start
+    print(
+        f"{name:<24} {duration:8.3f}s {1e6 * duration / (iterations * len(lines)):8.3f}us/triple "
+        f"{ignored:>10} of {len(lines)} ignored"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("files", nargs="*", help="N-Triples files")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--terms", type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.files:
+        lines = []
+        for path in args.files:
+            with open(path, encoding="utf-8") as nt_file:
+                lines += [line for line in nt_file if line.strip()]
+    else:
+        lines = generate_changed_triples(args.terms)
+
+    triple_filter = TripleFilter()
+    measure("substring scan", lines, substring_is_ignored, args.iterations)
+    measure("triple filter", lines, triple_filter.is_ignored_line, args.iterations)
+    # the diff passes the undecoded lines of the sorted files
+    byte_lines = [line.encode("utf-8") for line in lines]
+    measure(
+        "triple filter (bytes)",
+        byte_lines,
+        triple_filter.is_ignored_bytes,
+        args.iterations,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compares loading rdflib graphs from rapper-produced Turtle and N-Triples.
+
+Run from the archivo directory:
+    python -m benchmarks.graph_loading_benchmark [--iterations N] [FILE ...]
+
+Every document is converted with rapper to both serializations first, then the load time and the peak memory
+(tracemalloc) of rdflib's n3 and nt parsers are measured on them. Without files a set of synthetic vocabularies
+is used, pass the files of the ontology corpus (e.g. the archived originals) for representative numbers.
+"""
+import argparse
+import time
+import tracemalloc
+from typing import List, Tuple
+
+import rdflib
+
+from benchmarks.parsing_benchmark import load_documents
+from models.content_negotiation import RDF_Type, get_rdflib_string
+from utils.parsing_service import RapperBackend
+
+
+def convert_documents(
+    documents: List[Tuple[str, bytes, RDF_Type]], output_type: RDF_Type
+) -> List[str]:
+    rapper = RapperBackend()
+    return [
+        rapper.parse(data, base_uri, rdf_type, output_type).parsed_rdf
+        for base_uri, data, rdf_type in documents
+    ]
+
+
+def load_graph(rdf_string: str, rdf_type: RDF_Type) -> int:
+    graph = rdflib.Graph()
+    graph.parse(data=rdf_string, format=get_rdflib_string(rdf_type))
+    return len(graph)
+
+
+def measure_time(
+    serializations: List[str], rdf_type: RDF_Type, iterations: int
+) -> Tuple[float, int]:
+    triples = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for rdf_string in serializations:
+            triples += load_graph(rdf_string, rdf_type)
+    return time.perf_counter() - start, triples // iterations
+
+
+def measure_peak_memory(serializations: List[str], rdf_type: RDF_Type) -> int:
+    """Returns the highest peak of all single loads in bytes, measured in a separate run since tracemalloc
+    slows down the parsing"""
+
+    max_peak = 0
+    for rdf_string in serializations:
+        tracemalloc.start()
+        load_graph(rdf_string, rdf_type)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        max_peak = max(max_peak, peak)
+    return max_peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("files", nargs="*", help="RDF files (.owl, .rdf, .ttl, .nt)")
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = load_documents(args.files)
+    print(f"{len(documents)} documents, {args.iterations} iterations")
+
+    results = {}
+    for rdf_type in [RDF_Type.TURTLE, RDF_Type.N_TRIPLES]:
+        serializations = convert_documents(documents, rdf_type)
+        duration, triples = measure_time(serializations, rdf_type, args.iterations)
+        peak = measure_peak_memory(serializations, rdf_type)
+        results[rdf_type] = duration
+        print(
+            f"rdflib {get_rdflib_string(rdf_type):<4} {rdf_type.name:<10} {duration:8.2f}s "
+            f"{1000 * duration / (args.iterations * len(documents)):8.2f}ms/doc "
+            f"{peak / 2 ** 20:8.1f}MiB peak {triples:>10} triples"
+        )
+
+    if results[RDF_Type.N_TRIPLES] > 0:
+        print(
+            f"N-Triples speedup: {results[RDF_Type.TURTLE] / results[RDF_Type.N_TRIPLES]:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Compares the parsing service with one rapper subprocess per document.
+
+Run from the archivo directory:
+    python -m benchmarks.parsing_benchmark [--iterations N] [FILE ...]
+
+Without files a set of small synthetic vocabularies is used, which is the case the worker pool is meant for.
+"""
+import argparse
+import os
+import time
+from typing import Callable, List, Tuple
+
+from models.content_negotiation import RDF_Type
+from utils.parsing_service import ParsingService, RapperBackend
+
+__EXTENSION_TYPES = {
+    ".owl": RDF_Type.RDF_XML,
+    ".rdf": RDF_Type.RDF_XML,
+    ".xml": RDF_Type.RDF_XML,
+    ".ttl": RDF_Type.TURTLE,
+    ".nt": RDF_Type.N_TRIPLES,
+}
+
+
+def generate_vocabulary(index: int, term_count: int) -> str:
+    base = f"http://example.org/vocab{index}#"
+    lines = [
+        "@prefix owl: <http://www.w3.org/2002/07/owl#> .",
+        "@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .",
+        f'<{base}> a owl:Ontology ; rdfs:label "Vocabulary {index}"@en .',
+    ]
+    for term in range(term_count):
+        lines.append(
+            f'<{base}Term{term}> a owl:Class ; rdfs:label "Term {term}"@en ; '
+            f"rdfs:isDefinedBy <{base}> ."
+        )
+    return "\n".join(lines) + "\n"
+
+
+def load_documents(paths: List[str]) -> List[Tuple[str, bytes, RDF_Type]]:
+    if not paths:
+        return [
+            (
+                f"http://example.org/vocab{i}#",
+                generate_vocabulary(i, 20 + i % 80).encode("utf-8"),
+                RDF_Type.TURTLE,
+            )
+            for i in range(200)
+        ]
+
+    documents = []
+    for path in paths:
+        rdf_type = __EXTENSION_TYPES.get(os.path.splitext(path)[1], None)
+        if rdf_type is None:
+            print(f"Skipping {path}: unknown file extension")
+            continue
+        with open(path, "rb") as document_file:
+            documents.append(
+                (f"file://{os.path.abspath(path)}", document_file.read(), rdf_type)
+            )
+    return documents
+
+
+def measure(
+    name: str,
+    documents: List[Tuple[str, bytes, RDF_Type]],
+    fun: Callable[[bytes, str, RDF_Type], int],
+    iterations: int,
+) -> None:
+    triples = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for base_uri, data, rdf_type in documents:
+            triples += fun(data, base_uri, rdf_type)
+    duration = time.perf_counter() - start
+    parses = iterations * len(documents)
+    print(
+        f"{name:<32} {duration:8.2f}s {1000 * duration / parses:8.2f}ms/doc {triples // iterations:>10} triples"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("files", nargs="*", help="RDF files (.owl, .rdf, .ttl, .nt)")
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = load_documents(args.files)
+    print(f"{len(documents)} documents, {args.iterations} iterations")
+
+    rapper = RapperBackend()
+    service = ParsingService(mode="auto")
+    # start the workers before measuring
+    service.parse(
+        documents[0][1],
+        documents[0][0],
+        documents[0][2],
+        RDF_Type.N_TRIPLES,
+        allow_inprocess=True,
+    )
+
+    measure(
+        "rapper subprocess (count)",
+        documents,
+        lambda data, uri, rdf_type: rapper.count(data, uri, rdf_type).triple_number,
+        args.iterations,
+    )
+    measure(
+        "rapper subprocess (to N-Triples)",
+        documents,
+        lambda data, uri, rdf_type: rapper.parse(
+            data, uri, rdf_type, RDF_Type.N_TRIPLES
+        ).parsing_info.triple_number,
+        args.iterations,
+    )
+    measure(
+        "parsing service (to N-Triples)",
+        documents,
+        lambda data, uri, rdf_type: service.parse(
+            data, uri, rdf_type, RDF_Type.N_TRIPLES, allow_inprocess=True
+        ).parsing_info.triple_number,
+        args.iterations,
+    )
+    print(f"Parsing service stats: {service.stats()}")
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 import requests
 from models import content_negotiation
+from models.content_negotiation import RDF_Type
 from models.crawling_response import CrawlingResponse
-from utils import parsing
+from utils import parsing, archivo_config, http_client
+from utils.http_client import SpooledResponse
 
-from models.user_interaction import LogLevel, ProcessStepLog
+from models.user_interaction import FailureClass, LogLevel, ProcessStepLog
 
 
 class UnavailableException(Exception):
-    def __init__(self, response: requests.Response):
+    def __init__(self, response: Union[requests.Response, SpooledResponse]):
         self.message = (
             f"Ontology Unavailable at {response.url}: Status {response.status_code}"
         )
@@ -16,10 +18,18 @@ class UnavailableException(Exception):
 
 
 def download_rdf_string(
-    uri: str, acc_header: str, encoding="utf-8", timeout_seconds: int = 30
-) -> requests.Response:
+    uri: str,
+    acc_header: str,
+    encoding="utf-8",
+    timeout_seconds: int = 30,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> SpooledResponse:
+    """Downloads the URI with the given Accept header. The body is streamed into a spooled file, so large
+    ontologies are kept on disk instead of in memory, and aborted if it exceeds DOWNLOAD_MAX_SIZE_BYTES."""
     headers = {"Accept": acc_header}
-    response = requests.get(
+    if extra_headers:
+        headers.update(extra_headers)
+    response = http_client.download_to_spool(
         uri, headers=headers, timeout=timeout_seconds, allow_redirects=True
     )
 
@@ -35,7 +45,7 @@ def download_rdf_string(
 
 def handle_parsing(
     uri: str,
-    response: requests.Response,
+    response: SpooledResponse,
     rdf_type: content_negotiation.RDF_Type,
     user_output: Optional[List[ProcessStepLog]] = None,
 ) -> CrawlingResponse:
@@ -45,7 +55,7 @@ def handle_parsing(
         user_output = []
 
     parsing_info = parsing.get_triples_from_rdf_string(
-        response.text, uri, input_type=rdf_type
+        response.body, uri, input_type=rdf_type
     )
 
     # append user output notification
@@ -67,13 +77,57 @@ def handle_parsing(
     return CrawlingResponse(uri, response, rdf_type, parsing_info)
 
 
-def determine_best_content_type(
-    uri: str, user_output: List[ProcessStepLog]
-) -> Optional[CrawlingResponse]:
-    """Tests multiple RDF content types for the most yielding triples"""
+def __get_log_level(crawling_result: CrawlingResponse) -> LogLevel:
+    """Determines the log level of a crawling result based on the parsing result"""
+    if (
+        crawling_result.parsing_info.triple_number > 0
+        and len(crawling_result.parsing_info.errors) == 0
+        and len(crawling_result.parsing_info.warnings) == 0
+    ):
+        return LogLevel.INFO
+    elif (
+        crawling_result.parsing_info.triple_number > 0
+        and len(crawling_result.parsing_info.errors) == 0
+        and len(crawling_result.parsing_info.warnings) > 0
+    ):
+        return LogLevel.WARNING
+    else:
+        return LogLevel.ERROR
+
+
+def __is_huge(crawling_result: CrawlingResponse) -> bool:
+    return crawling_result.parsing_info.triple_number > 200000
+
+
+def __log_parsing_result(
+    uri: str,
+    header: str,
+    crawling_result: CrawlingResponse,
+    user_output: List[ProcessStepLog],
+) -> None:
+    message = f"Parsed {crawling_result.parsing_info.triple_number} triples with {len(crawling_result.parsing_info.errors)} Errors and {len(crawling_result.parsing_info.warnings)} Warnings."
+    if __is_huge(crawling_result):
+        message += " Since this is a huge ontology other formats wont be tested."
+    user_output.append(
+        ProcessStepLog(
+            status=__get_log_level(crawling_result),
+            stepname=f"Loading and parsing from {uri} with header {header}",
+            message=message,
+        )
+    )
 
-    if user_output is None:
-        user_output = []
+
+def probe_content_types(
+    uri: str,
+    user_output: List[ProcessStepLog],
+    known_results: Optional[Dict[Tuple[str, RDF_Type], CrawlingResponse]] = None,
+) -> List[CrawlingResponse]:
+    """Requests the URI once for every RDF type and parses the responses.
+    Responses with a body that was already parsed as the same RDF type (identified by the hash of the body in
+    known_results) are not parsed again."""
+
+    if known_results is None:
+        known_results = {}
 
     results: List[CrawlingResponse] = []
 
@@ -81,6 +135,18 @@ def determine_best_content_type(
         header = content_negotiation.get_accept_header(rdf_type)
         try:
             response = download_rdf_string(uri, acc_header=header)
+            body_hash = response.body.sha_256_sum
+            known_result = known_results.get((body_hash, rdf_type), None)
+            if known_result is not None:
+                user_output.append(
+                    ProcessStepLog(
+                        status=LogLevel.INFO,
+                        stepname=f"Loading and parsing from {uri} with header {header}",
+                        message="Same content as an already parsed response, reusing the parsing result.",
+                    )
+                )
+                # the same content is already contained in the results, no need to add it twice
+                continue
             crawling_result = handle_parsing(
                 uri, response, rdf_type, user_output=user_output
             )
@@ -93,41 +159,88 @@ def determine_best_content_type(
                 )
             )
         else:
+            known_results[(body_hash, rdf_type)] = crawling_result
             results.append(crawling_result)
-            # determine log lavel based on the result
-            if (
-                crawling_result.parsing_info.triple_number > 0
-                and len(crawling_result.parsing_info.errors) == 0
-                and len(crawling_result.parsing_info.warnings) == 0
-            ):
-                log_level = LogLevel.INFO
-            elif (
-                crawling_result.parsing_info.triple_number > 0
-                and len(crawling_result.parsing_info.errors) == 0
-                and len(crawling_result.parsing_info.warnings) > 0
-            ):
-                log_level = LogLevel.WARNING
-            else:
-                log_level = LogLevel.ERROR
-
+            __log_parsing_result(uri, header, crawling_result, user_output)
             # break if the ontology is really huge
-            if crawling_result.parsing_info.triple_number > 200000:
-                user_output.append(
-                    ProcessStepLog(
-                        status=log_level,
-                        stepname=f"Loading and parsing from {uri} with header {header}",
-                        message=f"Parsed {crawling_result.parsing_info.triple_number} triples with {len(crawling_result.parsing_info.errors)} Errors and {len(crawling_result.parsing_info.warnings)} Warnings. Since this is a huge ontology other formats wont be tested.",
-                    )
-                )
+            if __is_huge(crawling_result):
                 break
-            else:
+
+    return results
+
+
+def negotiate_content_type(
+    uri: str, user_output: List[ProcessStepLog]
+) -> Tuple[Optional[CrawlingResponse], Dict[Tuple[str, RDF_Type], CrawlingResponse]]:
+    """Requests the URI once with an Accept header containing all supported RDF types and determines the type
+    of the response by its Content-Type and content. Returns the result (None if the content could not be
+    determined or downloaded) and the parsed results by (body hash, RDF type) for later deduplication."""
+
+    header = content_negotiation.get_weighted_accept_header()
+    try:
+        response = download_rdf_string(uri, acc_header=header)
+    except Exception as e:
+        user_output.append(
+            ProcessStepLog(
+                status=LogLevel.ERROR,
+                stepname=f"Loading and parsing from {uri} with header {header}",
+                message=f"{str(e)}",
+            )
+        )
+        return None, {}
+
+    rdf_type = content_negotiation.determine_rdf_type(
+        response.headers.get("Content-Type", None),
+        response.body.get_text(limit=4096),
+    )
+
+    if rdf_type is None:
+        user_output.append(
+            ProcessStepLog(
+                status=LogLevel.WARNING,
+                stepname=f"Loading and parsing from {uri} with header {header}",
+                message=f"Could not determine an RDF format from Content-Type {response.headers.get('Content-Type', None)} and the content of the response",
+            )
+        )
+        return None, {}
+
+    crawling_result = handle_parsing(uri, response, rdf_type, user_output=user_output)
+    __log_parsing_result(uri, header, crawling_result, user_output)
+    body_hash = response.body.sha_256_sum
+
+    return crawling_result, {(body_hash, rdf_type): crawling_result}
+
+
+def determine_best_content_type(
+    uri: str, user_output: List[ProcessStepLog]
+) -> Optional[CrawlingResponse]:
+    """Finds the RDF content type yielding the most triples. In the negotiate mode a single request is tried first,
+    the other formats are only probed if its result is empty or has parsing errors."""
+
+    if user_output is None:
+        user_output = []
+
+    results: List[CrawlingResponse] = []
+    known_results: Dict[Tuple[str, RDF_Type], CrawlingResponse] = {}
+
+    if archivo_config.CONTENT_NEGOTIATION_MODE == "negotiate":
+        negotiated_result, known_results = negotiate_content_type(uri, user_output)
+        if negotiated_result is not None:
+            if (
+                negotiated_result.parsing_info.triple_number > 0
+                and len(negotiated_result.parsing_info.errors) == 0
+            ) or __is_huge(negotiated_result):
                 user_output.append(
                     ProcessStepLog(
-                        status=log_level,
-                        stepname=f"Loading and parsing from {uri} with header {header}",
-                        message=f"Parsed {crawling_result.parsing_info.triple_number} triples with {len(crawling_result.parsing_info.errors)} Errors and {len(crawling_result.parsing_info.warnings)} Warnings.",
+                        status=LogLevel.INFO,
+                        stepname="Accessing RDF content",
+                        message=f"RDF content is accessible as {content_negotiation.get_accept_header(negotiated_result.rdf_type)}",
                     )
                 )
+                return negotiated_result
+            results.append(negotiated_result)
+
+    results += probe_content_types(uri, user_output, known_results=known_results)
 
     # find best result
     parseable_results = [r for r in results if r.parsing_info.triple_number > 0]
@@ -136,8 +249,13 @@ def determine_best_content_type(
         user_output.append(
             ProcessStepLog(
                 status=LogLevel.ERROR,
-                stepname=f"Accessing RDF content",
+                stepname="Accessing RDF content",
                 message="No RDF content accessible or parseable",
+                # content was only parsed if at least one download succeeded
+                failure_class=FailureClass.NO_RDF
+                if results
+                else FailureClass.UNAVAILABLE,
+                uri=uri,
             )
         )
         return None
@@ -146,7 +264,7 @@ def determine_best_content_type(
         user_output.append(
             ProcessStepLog(
                 status=LogLevel.INFO,
-                stepname=f"Accessing RDF content",
+                stepname="Accessing RDF content",
                 message=f"RDF content is accessible in {len(parseable_results)} formats",
             )
         )
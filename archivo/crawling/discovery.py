@@ -1,16 +1,21 @@
 from __future__ import annotations
 
 import json
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Tuple
+from typing import Tuple, Iterable, Iterator, Callable
 
-import requests
 import traceback
+from contextlib import contextmanager
 
-from urllib.robotparser import RobotFileParser
-from urllib.parse import urlparse, urldefrag, quote
+from urllib.parse import urldefrag, quote
 
 from crawling.best_effort_crawling import determine_best_content_type
+from crawling.robots_cache import robots_cache
 from datetime import datetime
 from logging import Logger
 from string import Template
@@ -29,7 +34,7 @@ from models.databus_identifier import (
     DatabusVersionIdentifier,
 )
 from models.data_writer import DataWriter, FileWriter
-from models.user_interaction import ProcessStepLog, LogLevel
+from models.user_interaction import FailureClass, ProcessStepLog, LogLevel
 from utils import (
     string_tools,
     feature_plugins,
@@ -37,7 +42,13 @@ from utils import (
     archivo_config,
     parsing,
     content_access,
+    triple_index,
 )
+from utils.concurrency import run_host_aware, get_host_key
+from utils.imports_resolver import imports_resolver
+from utils.parse_cache import ParseCache
+from utils.spooling import SpooledContent
+from utils.uri_index import URIIndex
 from querying import graph_handling
 from utils.validation import TestSuite
 from utils.string_tools import stars_from_meta_dict
@@ -89,6 +100,8 @@ class ArchivoVersion:
         self.semantic_version = semantic_version
         self.user_output = user_output
         self.logger = logger
+        # set when the parsed files are generated
+        self.triple_fingerprint: Optional[str] = None
         if len(self.crawling_result.response.history) > 0:
             self.nir_header = str(self.crawling_result.response.history[0].headers)
         else:
@@ -104,41 +117,120 @@ class ArchivoVersion:
         }
 
     def __write_original_file(self):
-        db_file_metadata = DatabusFileMetadata.build_from_content(
-            content=self.crawling_result.response.text,
+        # the original content is written as downloaded, without loading it into memory
+        body = self.crawling_result.response.body
+        db_file_metadata = DatabusFileMetadata(
             version_identifier=self.db_version_identifier,
             content_variants={"type": "orig"},
             file_extension=get_file_extension(self.crawling_result.rdf_type),
+            compression=None,
+            sha_256_sum=body.sha_256_sum,
+            content_length=body.content_length,
         )
 
-        self.data_writer.write_databus_file(
-            self.crawling_result.response.text, db_file_metadata
-        )
+        self.data_writer.write_databus_stream(body, db_file_metadata)
 
     def __generate_parsed_rdf(self):
+        """Parses the original file once into sorted N-Triples on disk and derives the other serializations
+        from them in parallel, instead of parsing the original file again for every format"""
 
-        for parsing_type in RDF_Type:
-            if parsing_type == self.parsing_result.rdf_type:
-                db_file_metadata = parsing.generate_metadata_for_parsing_result(
-                    self.db_version_identifier, self.parsing_result
-                )
-                self.data_writer.write_databus_file(
-                    self.parsing_result.parsed_rdf, db_file_metadata
-                )
-            else:
-                new_parsing_result = parsing.parse_rdf_from_string(
-                    self.crawling_result.response.text,
-                    self.nir,
-                    self.crawling_result.rdf_type,
-                    parsing_type,
-                )
+        body = self.crawling_result.response.body
+        # already parsed N-Triples are cheaper to parse than the original file
+        if self.parsing_result.rdf_type == RDF_Type.N_TRIPLES:
+            source, source_type = self.parsing_result.parsed_rdf, RDF_Type.N_TRIPLES
+        else:
+            source, source_type = body, self.crawling_result.rdf_type
 
-                db_file_metadata = parsing.generate_metadata_for_parsing_result(
-                    self.db_version_identifier, new_parsing_result
+        with tempfile.TemporaryDirectory(prefix="archivo-") as work_dir:
+            ntriples_path = os.path.join(work_dir, "parsed.nt")
+            parsing.parse_to_sorted_ntriples_file(
+                source, self.nir, source_type, ntriples_path, tmp_dir=work_dir
+            )
+            # sidecar of the triple hashes, so the next update can diff without reading this version completely
+            index_path = os.path.join(work_dir, "parsed.idx")
+            triple_index.build_triple_index(ntriples_path, index_path)
+            self.triple_fingerprint = triple_index.compute_file_fingerprint(
+                ntriples_path
+            )
+            # rapper only knows the prefixes of the original file if it is parsed, so they are passed along
+            namespaces = parsing.sniff_namespaces(body.get_text(limit=64 * 1024))
+
+            derived_types = [
+                parsing_type
+                for parsing_type in RDF_Type
+                if parsing_type
+                not in [self.parsing_result.rdf_type, RDF_Type.N_TRIPLES]
+            ]
+            with ThreadPoolExecutor(max_workers=max(len(derived_types), 1)) as executor:
+                derived_paths = {
+                    parsing_type: os.path.join(
+                        work_dir, f"parsed.{get_file_extension(parsing_type)}"
+                    )
+                    for parsing_type in derived_types
+                }
+                futures = {
+                    parsing_type: executor.submit(
+                        parsing.serialize_ntriples_file,
+                        ntriples_path,
+                        self.nir,
+                        parsing_type,
+                        derived_paths[parsing_type],
+                        namespaces,
+                    )
+                    for parsing_type in derived_types
+                }
+                failed_types = set()
+                for parsing_type, future in futures.items():
+                    try:
+                        future.result()
+                    except subprocess.CalledProcessError:
+                        # a partial serialization must not be published
+                        self.logger.exception(
+                            f"Couldn't serialize {self.nir} as {parsing_type.name}"
+                        )
+                        failed_types.add(parsing_type)
+
+            for parsing_type in RDF_Type:
+                if parsing_type in failed_types:
+                    continue
+                if (
+                    parsing_type == self.parsing_result.rdf_type
+                    and parsing_type != RDF_Type.N_TRIPLES
+                ):
+                    db_file_metadata = parsing.generate_metadata_for_parsing_result(
+                        self.db_version_identifier, self.parsing_result
+                    )
+                    self.data_writer.write_databus_file(
+                        self.parsing_result.parsed_rdf, db_file_metadata
+                    )
+                    continue
+
+                path = (
+                    ntriples_path
+                    if parsing_type == RDF_Type.N_TRIPLES
+                    else derived_paths[parsing_type]
                 )
-                self.data_writer.write_databus_file(
-                    new_parsing_result.parsed_rdf, db_file_metadata
+                content = SpooledContent.from_file(path)
+                try:
+                    db_file_metadata = parsing.generate_metadata_for_parsed_file(
+                        self.db_version_identifier, parsing_type, content
+                    )
+                    self.data_writer.write_databus_stream(content, db_file_metadata)
+                finally:
+                    content.close()
+
+            # the sidecar is only used by Archivo itself and not deployed to the databus
+            index_content = SpooledContent.from_file(index_path)
+            try:
+                self.data_writer.write_databus_stream(
+                    index_content,
+                    triple_index.get_triple_index_metadata(
+                        self.db_version_identifier, index_content
+                    ),
+                    log_file=False,
                 )
+            finally:
+                index_content.close()
 
     def __generate_shacl_reports(self):
 
@@ -174,80 +266,122 @@ class ArchivoVersion:
             if report_key:
                 self.metadata_dict["test-results"][report_key] = conforms
 
-    def __run_consistency_checks(self):
-
+    def __get_parsed_file_metadata(
+        self, file_extension: str
+    ) -> Optional[DatabusFileMetadata]:
         # looks in the data writer for the written parsed version of the ontology
-        file_metadata = None
         for metadata, error in self.data_writer.written_files:
             if (
-                metadata.file_extension == "ttl"
+                metadata.file_extension == file_extension
                 and metadata.content_variants["type"] == "parsed"
+                and len(metadata.content_variants) == 1
             ):
-                file_metadata = metadata
-                break
+                return metadata
+        return None
+
+    @contextmanager
+    def __reasoning_runs(
+        self, file_metadata: DatabusFileMetadata
+    ) -> Iterator[List[Tuple[bool, List[str], str, Optional[str]]]]:
+        """Yields the pellet runs as (ignore_imports, imports content variants, ontology URL, cache key).
+        Without owl:imports both variants have the same result, so pellet runs only once for them. With imports
+        pellet gets a copy of the ontology whose imports point to the latest archived versions of the imported
+        ontologies, its result is only cached if the whole imports closure was found in the archive."""
+
+        url = content_access.get_location_url(file_metadata)
+        content_key = file_metadata.sha_256_sum
+
+        imports = graph_handling.get_imports(self.ontology_graph)
+        if not imports:
+            yield [(True, ["NONE", "FULL"], url, content_key)]
+            return
+
+        nt_metadata = self.__get_parsed_file_metadata("nt")
+        nt_path = (
+            content_access.get_local_file_path(nt_metadata)
+            if nt_metadata is not None
+            else None
+        )
+        if nt_path is None or not imports_resolver.is_available():
+            yield [(True, ["NONE"], url, content_key), (False, ["FULL"], url, None)]
+            return
+
+        closure = imports_resolver.build_closure(imports)
+        full_key = (
+            ParseCache.build_key(content_key, closure.digest)
+            if closure.is_complete
+            else None
+        )
+        with imports_resolver.materialize(nt_path, closure) as full_path:
+            yield [
+                (True, ["NONE"], url, content_key),
+                (False, ["FULL"], full_path, full_key),
+            ]
+
+    def __run_consistency_checks(self):
+
+        file_metadata = self.__get_parsed_file_metadata("ttl")
 
         if file_metadata:
 
-            url = content_access.get_location_url(file_metadata)
+            with self.__reasoning_runs(file_metadata) as runs:
 
-            for ignore_imports in [True, False]:
+                for ignore_imports, imports_cvs, url, cache_key in runs:
 
-                imports_cv = "NONE" if ignore_imports else "FULL"
-                metadata_key = (
-                    "consistent-without-imports" if ignore_imports else "consistent"
-                )
+                    consistency, output = self.test_suite.get_consistency(
+                        ontology_url=url,
+                        ignore_imports=ignore_imports,
+                        cache_key=cache_key,
+                    )
 
-                consistency, output = self.test_suite.get_consistency(
-                    ontology_url=url, ignore_imports=False
-                )
-                self.metadata_dict["test-results"][metadata_key] = consistency
-
-                file_metadata = DatabusFileMetadata.build_from_content(
-                    content=output,
-                    version_identifier=self.db_version_identifier,
-                    content_variants={
-                        "type": "pelletConsistency",
-                        "imports": imports_cv,
-                    },
-                    file_extension="txt",
-                )
+                    for imports_cv in imports_cvs:
+                        metadata_key = (
+                            "consistent-without-imports"
+                            if imports_cv == "NONE"
+                            else "consistent"
+                        )
+                        self.metadata_dict["test-results"][metadata_key] = consistency
+
+                        output_metadata = DatabusFileMetadata.build_from_content(
+                            content=output,
+                            version_identifier=self.db_version_identifier,
+                            content_variants={
+                                "type": "pelletConsistency",
+                                "imports": imports_cv,
+                            },
+                            file_extension="txt",
+                        )
 
-                self.data_writer.write_databus_file(output, file_metadata)
+                        self.data_writer.write_databus_file(output, output_metadata)
 
     def __run_pellet_info(self):
 
-        file_metadata = None
-        for metadata, error in self.data_writer.written_files:
-            if (
-                metadata.file_extension == "ttl"
-                and metadata.content_variants["type"] == "parsed"
-            ):
-                file_metadata = metadata
-                break
+        file_metadata = self.__get_parsed_file_metadata("ttl")
 
         if file_metadata:
 
-            url = content_access.get_location_url(file_metadata)
+            with self.__reasoning_runs(file_metadata) as runs:
 
-            for ignore_imports in [True, False]:
+                for ignore_imports, imports_cvs, url, cache_key in runs:
 
-                imports_cv = "NONE" if ignore_imports else "FULL"
-
-                output = self.test_suite.get_pellet_info(
-                    ontology_url=url, ignore_imports=False
-                )
+                    output = self.test_suite.get_pellet_info(
+                        ontology_url=url,
+                        ignore_imports=ignore_imports,
+                        cache_key=cache_key,
+                    )
 
-                file_metadata = DatabusFileMetadata.build_from_content(
-                    content=output,
-                    version_identifier=self.db_version_identifier,
-                    content_variants={
-                        "type": "pelletInfo",
-                        "imports": imports_cv,
-                    },
-                    file_extension="txt",
-                )
+                    for imports_cv in imports_cvs:
+                        output_metadata = DatabusFileMetadata.build_from_content(
+                            content=output,
+                            version_identifier=self.db_version_identifier,
+                            content_variants={
+                                "type": "pelletInfo",
+                                "imports": imports_cv,
+                            },
+                            file_extension="txt",
+                        )
 
-                self.data_writer.write_databus_file(output, file_metadata)
+                        self.data_writer.write_databus_file(output, output_metadata)
 
     def __generate_documentation_files(self):
         """generates the HTML documentation files"""
@@ -301,6 +435,7 @@ class ArchivoVersion:
         info_dict["semantic-version"] = self.semantic_version
         info_dict["snapshot-url"] = self.location_uri
         info_dict["triples"] = self.parsing_result.parsing_info.triple_number
+        info_dict["triple-fingerprint"] = self.triple_fingerprint
         info_dict["stars"] = stars_from_meta_dict(self.metadata_dict)
 
         content = json.dumps(self.metadata_dict, indent=4)
@@ -471,26 +606,29 @@ class ArchivoVersion:
         databusclient.deploy(databus_dataset_jsonld, archivo_config.DATABUS_API_KEY)
 
 
+@dataclass
+class DiscoveryTask:
+    """A candidate URI for the discovery, with the source it was found in and its recursion depth"""
+
+    uri: str
+    source: str
+    recursion_depth: int = 1
+
+
+@dataclass
+class DiscoveryResult:
+    """Outcome of the discovery of one candidate URI, handed from the workers to the committing thread"""
+
+    uri: str
+    archivo_version: Optional[ArchivoVersion] = None
+    dev_version: Optional[ArchivoVersion] = None
+    process_log: List[ProcessStepLog] = field(default_factory=list)
+    # linked URIs that were not followed immediately, as (uri, recursion depth)
+    linked_uris: List[Tuple[str, int]] = field(default_factory=list)
+
+
 def check_robot(uri: str) -> Tuple[Optional[bool], Optional[str]]:
-    parsedUrl = urlparse(uri)
-    if parsedUrl.scheme == "" or parsedUrl.netloc == "":
-        return None, None
-    robotsUrl = str(parsedUrl.scheme) + "://" + str(parsedUrl.netloc) + "/robots.txt"
-    try:
-        req = requests.get(url=robotsUrl)
-    except Exception as e:
-        return True, str(e)
-
-    if req.status_code > 400:
-        # if robots.txt is not accessible, we are allowed
-        return True, None
-    rp = RobotFileParser()
-    rp.set_url(robotsUrl)
-    rp.parse(req.text.split("\n"))
-    if rp.can_fetch(archivo_config.ARCHIVO_AGENT, uri):
-        return True, None
-    else:
-        return False, "Not allowed"
+    return robots_cache.can_fetch(uri)
 
 
 # returns the NIR if fragment-equivalent, else None
@@ -510,6 +648,8 @@ def check_ontology_id_uri(
                 status=LogLevel.ERROR,
                 stepname="Determine non-information resource (ID of the ontology)",
                 message="Can't neither find a triple with <code>owl:Ontology</code> or <code>skos:ConceptScheme</code> as value",
+                failure_class=FailureClass.NO_ONTOLOGY,
+                uri=uri,
             )
         )
         return False, None
@@ -552,6 +692,8 @@ def perform_robot_check(
                 status=LogLevel.ERROR,
                 stepname="Robot allowance check",
                 message=f"Archivo-Agent {archivo_config.ARCHIVO_AGENT} is not allowed to access the ontology at <a href={vocab_uri}>{vocab_uri}</a>",
+                failure_class=FailureClass.ROBOTS_DENIED,
+                uri=vocab_uri,
             )
         )
         return False
@@ -577,16 +719,51 @@ def parse_uri(uri: str) -> Tuple[str, Optional[str], Optional[str]]:
     return defrag_uri, group_id, artifact_id
 
 
+def __follow_linked_uri(
+    linked_uri: str,
+    vocab_uri_cache: URIIndex,
+    logger: Logger,
+    process_log: List[ProcessStepLog],
+    recursion_depth: int,
+    source: str,
+    test_suite: TestSuite,
+    enqueue_linked: Optional[Callable[[str, int], None]],
+) -> Optional[ArchivoVersion]:
+    """Crawls a linked URI right away, or hands it to enqueue_linked to be crawled later if given"""
+
+    if enqueue_linked is not None:
+        enqueue_linked(linked_uri, recursion_depth)
+        process_log.append(
+            ProcessStepLog(
+                status=LogLevel.INFO,
+                stepname="Searching for linked ontologies",
+                message=f"Queued the linked potential ontology at {linked_uri} for crawling",
+            )
+        )
+        return None
+
+    return discover_new_uri(
+        uri=linked_uri,
+        vocab_uri_cache=vocab_uri_cache,
+        logger=logger,
+        process_log=process_log,
+        recursion_depth=recursion_depth,
+        source=source,
+        test_suite=test_suite,
+    )
+
+
 def searching_for_linked_ontologies(
     uri: str,
     found_ontology_id: Optional[str],
     onto_graph: rdflib.Graph,
-    vocab_uri_cache: List[str],
+    vocab_uri_cache: URIIndex,
     logger: Logger,
     process_log: List[ProcessStepLog],
     recursion_depth: int,
     source: str,
     test_suite: TestSuite,
+    enqueue_linked: Optional[Callable[[str, int], None]] = None,
 ) -> Optional[ArchivoVersion]:
 
     match found_ontology_id:
@@ -601,6 +778,8 @@ def searching_for_linked_ontologies(
                             status=LogLevel.ERROR,
                             stepname="Searching for linked ontologies",
                             message=f"The document given at {uri} does not contain a <code>rdfs:isDefinedBy</code> or <code>skos:inScheme</code> triple",
+                            failure_class=FailureClass.NO_ONTOLOGY,
+                            uri=uri,
                         )
                     )
                     return None
@@ -612,14 +791,15 @@ def searching_for_linked_ontologies(
                             message=f"Found linked potential ontology at {def_by_uri}",
                         )
                     )
-                    return discover_new_uri(
-                        uri=def_by_uri,
+                    return __follow_linked_uri(
+                        linked_uri=def_by_uri,
                         vocab_uri_cache=vocab_uri_cache,
                         logger=logger,
                         process_log=process_log,
                         recursion_depth=recursion_depth + 1,
                         source=source,
                         test_suite=test_suite,
+                        enqueue_linked=enqueue_linked,
                     )
                 case def_by_uri if string_tools.check_uri_equality(def_by_uri, uri):
                     process_log.append(
@@ -627,6 +807,8 @@ def searching_for_linked_ontologies(
                             status=LogLevel.ERROR,
                             stepname="Searching for linked ontologies",
                             message=f"The document given at {uri} links to itself via an <code>rdfs:isDefinedBy</code> or <code>skos:inScheme</code> triple but is no ontology",
+                            failure_class=FailureClass.NO_ONTOLOGY,
+                            uri=uri,
                         )
                     )
                     return None
@@ -641,14 +823,15 @@ def searching_for_linked_ontologies(
                 )
             )
             if recursion_depth <= archivo_config.DISCOVERY_MAXIMUM_RECURSION_DEPTH:
-                return discover_new_uri(
-                    uri=nir,
+                return __follow_linked_uri(
+                    linked_uri=nir,
                     vocab_uri_cache=vocab_uri_cache,
                     logger=logger,
                     process_log=process_log,
                     recursion_depth=recursion_depth + 1,
                     source=source,
                     test_suite=test_suite,
+                    enqueue_linked=enqueue_linked,
                 )
             else:
                 process_log.append(
@@ -656,6 +839,8 @@ def searching_for_linked_ontologies(
                         status=LogLevel.ERROR,
                         stepname="Searching for linked ontologies",
                         message=f"Maximum recursion depth of {archivo_config.DISCOVERY_MAXIMUM_RECURSION_DEPTH} reached",
+                        failure_class=FailureClass.NO_ONTOLOGY,
+                        uri=uri,
                     )
                 )
                 return None
@@ -665,13 +850,16 @@ def searching_for_linked_ontologies(
 
 def discover_new_uri(
     uri: str,
-    vocab_uri_cache: List[str],
+    vocab_uri_cache: URIIndex,
     test_suite: TestSuite,
     source: str,
     logger: Logger,
     process_log: List[ProcessStepLog] | None = None,
     recursion_depth: int = 1,
+    enqueue_linked: Optional[Callable[[str, int], None]] = None,
 ) -> Optional[ArchivoVersion]:
+    """Crawls the URI and deploys it as new ontology if it is one. Linked potential ontologies are crawled
+    recursively, or handed to enqueue_linked (with their recursion depth) to be crawled later if it is given."""
 
     if process_log is None:
         process_log = []
@@ -685,12 +873,14 @@ def discover_new_uri(
                 status=LogLevel.ERROR,
                 stepname="URI parsing check",
                 message=f"ERROR: Malformed URI {uri}",
+                failure_class=FailureClass.MALFORMED,
+                uri=uri,
             )
         )
         return None
 
     # check if uri is in cache
-    found_uri = string_tools.get_uri_from_index(uri, vocab_uri_cache)
+    found_uri = vocab_uri_cache.find(uri)
     if found_uri is not None:
         logger.info("Already known uri, skipping...")
         process_log.append(
@@ -714,15 +904,16 @@ def discover_new_uri(
     access_date = datetime.now()
     version_id = access_date.strftime("%Y.%m.%d-%H%M%S")
 
-    # parse the content with rapper since its more consumeable by rdflib and load it into a graph
+    # parse the content with rapper to N-Triples, which rdflib loads much faster than turtle, and load it into
+    # a graph
 
-    parsing_result_turtle = parsing.parse_rdf_from_string(
-        crawling_result.response.text, uri, crawling_result.rdf_type, RDF_Type.TURTLE
+    parsing_result_nt = parsing.parse_rdf_from_string(
+        crawling_result.response.body, uri, crawling_result.rdf_type, RDF_Type.N_TRIPLES
     )
 
     try:
         onto_graph = graph_handling.get_graph_of_string(
-            parsing_result_turtle.parsed_rdf, RDF_Type.TURTLE
+            parsing_result_nt.parsed_rdf, RDF_Type.N_TRIPLES
         )
     except Exception:
         logger.error(f"Exception in rdflib parsing of URI {uri}", exc_info=True)
@@ -731,6 +922,8 @@ def discover_new_uri(
                 status=LogLevel.ERROR,
                 stepname="Load Graph in rdflib",
                 message=f"RDFlib couldn't parse the file of {uri}. Reason: {traceback.format_exc()}",
+                failure_class=FailureClass.UNPARSEABLE,
+                uri=uri,
             )
         )
         return None
@@ -749,6 +942,7 @@ def discover_new_uri(
             recursion_depth=recursion_depth,
             source=source,
             test_suite=test_suite,
+            enqueue_linked=enqueue_linked,
         )
     assert ontology_id_uri is not None
 
@@ -766,12 +960,14 @@ def discover_new_uri(
                 status=LogLevel.ERROR,
                 stepname="URI parsing check",
                 message=f"ERROR: Malformed ontology ID in document: {ontology_id_uri}",
+                failure_class=FailureClass.MALFORMED,
+                uri=uri,
             )
         )
         return None
 
     # again cache check
-    found_uri = string_tools.get_uri_from_index(ontology_id_uri, vocab_uri_cache)
+    found_uri = vocab_uri_cache.find(ontology_id_uri)
     if found_uri is not None:
         logger.info("Already known uri, skipping...")
         process_log.append(
@@ -804,7 +1000,7 @@ def discover_new_uri(
     archivo_version = ArchivoVersion(
         confirmed_ontology_id=ontology_id_uri,
         crawling_result=crawling_result,
-        parsing_result=parsing_result_turtle,
+        parsing_result=parsing_result_nt,
         databus_version_identifier=databus_version_id,
         access_date=access_date,
         data_writer=data_writer,
@@ -863,16 +1059,16 @@ def handle_track_this_uri(
 
     # all it needs to be is readable by rdflib, so try parsing it
 
-    parsing_result_turtle = parsing.parse_rdf_from_string(
-        crawling_result.response.text,
+    parsing_result_nt = parsing.parse_rdf_from_string(
+        crawling_result.response.body,
         original_nir,
         crawling_result.rdf_type,
-        RDF_Type.TURTLE,
+        RDF_Type.N_TRIPLES,
     )
 
     try:
         onto_graph = graph_handling.get_graph_of_string(
-            parsing_result_turtle.parsed_rdf, RDF_Type.TURTLE
+            parsing_result_nt.parsed_rdf, RDF_Type.N_TRIPLES
         )
     except Exception:
         logger.error(
@@ -883,6 +1079,8 @@ def handle_track_this_uri(
                 status=LogLevel.ERROR,
                 stepname="Load Graph in rdflib",
                 message=f"RDFlib couldn't parse the file of {dev_version_location}. Reason: {traceback.format_exc()}",
+                failure_class=FailureClass.UNPARSEABLE,
+                uri=dev_version_location,
             )
         )
         return None
@@ -906,7 +1104,7 @@ def handle_track_this_uri(
     archivo_version = ArchivoVersion(
         confirmed_ontology_id=original_nir,
         crawling_result=crawling_result,
-        parsing_result=parsing_result_turtle,
+        parsing_result=parsing_result_nt,
         databus_version_identifier=databus_version_id,
         access_date=access_date,
         data_writer=data_writer,
@@ -940,3 +1138,66 @@ def handle_track_this_uri(
             )
         )
         return None
+
+
+def discover_and_track_uri(
+    task: DiscoveryTask,
+    vocab_uri_cache: URIIndex,
+    test_suite: TestSuite,
+    logger: Logger,
+    defer_linked: bool = False,
+) -> DiscoveryResult:
+    """Runs the complete discovery for one URI, including the handling of a linked dev version.
+    If defer_linked is set, linked potential ontologies are collected in the result instead of being crawled.
+    Does not touch the database, so it can run in a worker thread."""
+
+    logger.info(f"Crawling the URI {task.uri}")
+    result = DiscoveryResult(uri=task.uri)
+    result.archivo_version = discover_new_uri(
+        uri=task.uri,
+        vocab_uri_cache=vocab_uri_cache,
+        test_suite=test_suite,
+        source=task.source,
+        logger=logger,
+        process_log=result.process_log,
+        recursion_depth=task.recursion_depth,
+        enqueue_linked=(
+            lambda linked_uri, depth: result.linked_uris.append((linked_uri, depth))
+        )
+        if defer_linked
+        else None,
+    )
+    if result.archivo_version is not None:
+        result.dev_version = result.archivo_version.handle_dev_version()
+    return result
+
+
+def discover_new_uris(
+    tasks: Iterable[DiscoveryTask],
+    vocab_uri_cache: URIIndex,
+    test_suite: TestSuite,
+    logger: Logger,
+    defer_linked: bool = False,
+    max_workers: int = archivo_config.DISCOVERY_WORKER_COUNT,
+    max_requests_per_host: int = archivo_config.DISCOVERY_MAX_REQUESTS_PER_HOST,
+) -> Iterator[Tuple[DiscoveryTask, Optional[DiscoveryResult], Optional[BaseException]]]:
+    """Discovers the given URIs concurrently on a pool of workers, with at most max_requests_per_host URIs of the
+    same host being crawled at once. Yields (task, result, exception) tuples as soon as a URI is finished, the
+    consumer is responsible for writing the results to the database."""
+
+    def work_fun(task: DiscoveryTask) -> DiscoveryResult:
+        return discover_and_track_uri(
+            task=task,
+            vocab_uri_cache=vocab_uri_cache,
+            test_suite=test_suite,
+            logger=logger,
+            defer_linked=defer_linked,
+        )
+
+    yield from run_host_aware(
+        tasks,
+        work_fun=work_fun,
+        key_fun=lambda task: get_host_key(task.uri),
+        max_workers=max_workers,
+        max_per_host=max_requests_per_host,
+    )
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from crawling.discovery import DiscoveryTask
+from utils import archivo_config
+from webservice import db
+from webservice.dbModels import FrontierEntry
+
+# The discovery frontier is a persistent priority queue of candidate URIs in the database.
+# The discovery enqueues the URIs of all sources, the frontier job claims them in batches, so an interrupted
+# discovery continues where it stopped and the crawling is spread over time.
+# enqueue, mark_done and mark_failed only change the session, the caller commits them together with its results.
+
+
+def get_priority(source: str) -> int:
+    return archivo_config.DISCOVERY_FRONTIER_SOURCE_PRIORITIES.get(source, 0)
+
+
+def enqueue(
+    uri: str, source: str, priority: Optional[int] = None, depth: int = 1
+) -> None:
+    """Adds the URI to the frontier. If it is already waiting, it keeps the higher priority and lower depth."""
+
+    if priority is None:
+        priority = get_priority(source)
+
+    entry = db.session.query(FrontierEntry).filter_by(uri=uri).first()
+    if entry is None:
+        db.session.add(
+            FrontierEntry(
+                uri=uri,
+                source=source,
+                priority=priority,
+                depth=depth,
+                attempts=0,
+                nextEligible=datetime.now(),
+            )
+        )
+    else:
+        if priority > entry.priority:
+            entry.priority = priority
+            entry.source = source
+        entry.depth = min(entry.depth, depth)
+
+
+def enqueue_all(uris: Iterable[str], source: str, chunk_size: int = 1000) -> int:
+    """Adds all URIs not already waiting in the frontier and commits them in chunks. Returns the number added."""
+
+    priority = get_priority(source)
+    waiting = {uri for (uri,) in db.session.query(FrontierEntry.uri).all()}
+
+    added = 0
+    for uri in uris:
+        if uri in waiting:
+            continue
+        waiting.add(uri)
+        db.session.add(
+            FrontierEntry(
+                uri=uri,
+                source=source,
+                priority=priority,
+                depth=1,
+                attempts=0,
+                nextEligible=datetime.now(),
+            )
+        )
+        added += 1
+        if added % chunk_size == 0:
+            db.session.commit()
+    db.session.commit()
+    return added
+
+
+def claim_batch(
+    size: int = archivo_config.DISCOVERY_FRONTIER_BATCH_SIZE,
+) -> List[DiscoveryTask]:
+    """Claims the eligible URIs with the highest priority. Claimed URIs are leased and not handed out again until
+    the lease expires, so URIs of a crashed run are crawled again later."""
+
+    now = datetime.now()
+    entries = (
+        db.session.query(FrontierEntry)
+        .filter(FrontierEntry.nextEligible <= now)
+        .order_by(FrontierEntry.priority.desc(), FrontierEntry.nextEligible)
+        .limit(size)
+        .all()
+    )
+
+    lease_end = now + timedelta(seconds=archivo_config.DISCOVERY_FRONTIER_LEASE_SECONDS)
+    tasks = []
+    for entry in entries:
+        entry.attempts += 1
+        entry.nextEligible = lease_end
+        tasks.append(
+            DiscoveryTask(
+                uri=entry.uri, source=entry.source, recursion_depth=entry.depth
+            )
+        )
+    db.session.commit()
+    return tasks
+
+
+def mark_done(uri: str) -> None:
+    entry = db.session.query(FrontierEntry).filter_by(uri=uri).first()
+    if entry is not None:
+        db.session.delete(entry)
+
+
+def mark_failed(uri: str) -> bool:
+    """Schedules a retry of the URI with a delay growing with the attempts.
+    Returns False if the URI was dropped because it reached the max. number of attempts."""
+
+    entry = db.session.query(FrontierEntry).filter_by(uri=uri).first()
+    if entry is None:
+        return False
+    if entry.attempts >= archivo_config.DISCOVERY_FRONTIER_MAX_ATTEMPTS:
+        db.session.delete(entry)
+        return False
+    entry.nextEligible = datetime.now() + timedelta(
+        seconds=archivo_config.DISCOVERY_FRONTIER_RETRY_DELAY_SECONDS * entry.attempts
+    )
+    return True
+
+
+def size() -> int:
+    return db.session.query(FrontierEntry).count()
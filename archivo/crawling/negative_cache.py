@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+from typing import Set
+
+from models.user_interaction import FailureClass
+from utils import archivo_config
+from utils.uri_index import URIIndex
+from webservice import db
+from webservice.dbModels import NegativeCacheEntry
+
+# The negative cache remembers URIs whose discovery failed and backs off exponentially per failure class,
+# so the discovery doesn't spend requests and parser runs on the same bad URIs every cycle.
+# record_failure and record_success only change the session, the caller commits them with its results.
+
+
+def get_retry_delay(failure_class: FailureClass, attempts: int) -> timedelta:
+    base_hours = archivo_config.DISCOVERY_RETRY_BASE_DELAY_HOURS.get(
+        failure_class.value, 24
+    )
+    hours = min(
+        base_hours * 2 ** (attempts - 1), archivo_config.DISCOVERY_RETRY_MAX_DELAY_HOURS
+    )
+    return timedelta(hours=hours)
+
+
+def get_blocked_uris() -> Set[str]:
+    """Returns the normalized URIs which must not be crawled yet"""
+
+    now = datetime.now()
+    return {
+        uri
+        for (uri,) in db.session.query(NegativeCacheEntry.uri)
+        .filter(NegativeCacheEntry.nextRetry > now)
+        .all()
+    }
+
+
+def is_blocked(uri: str, blocked_uris: Set[str]) -> bool:
+    return URIIndex.normalize(uri) in blocked_uris
+
+
+def record_failure(uri: str, failure_class: FailureClass) -> None:
+    key = URIIndex.normalize(uri)
+    now = datetime.now()
+
+    entry = db.session.query(NegativeCacheEntry).filter_by(uri=key).first()
+    if entry is None:
+        entry = NegativeCacheEntry(uri=key, attempts=0)
+        db.session.add(entry)
+    entry.attempts += 1
+    entry.failureClass = failure_class.value
+    entry.lastAttempt = now
+    entry.nextRetry = now + get_retry_delay(failure_class, entry.attempts)
+
+
+def record_success(uri: str) -> None:
+    entry = (
+        db.session.query(NegativeCacheEntry)
+        .filter_by(uri=URIIndex.normalize(uri))
+        .first()
+    )
+    if entry is not None:
+        db.session.delete(entry)
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from utils import archivo_config, http_client
+from utils.concurrency import KeyedLocks
+
+
+@dataclass
+class RobotsCacheEntry:
+    """The parsed robots.txt of one host. A parser of None means the robots.txt was not available,
+    which allows crawling everything on the host."""
+
+    parser: Optional[RobotFileParser]
+    error: Optional[str]
+    fetched_at: float
+
+    def is_negative(self) -> bool:
+        return self.parser is None
+
+
+class RobotsCache:
+    """Thread-safe cache of parsed robots.txt files, keyed by scheme and netloc of the URI.
+    At most max_entries hosts are kept, the least recently used ones are evicted."""
+
+    def __init__(
+        self,
+        agent: str = archivo_config.ARCHIVO_AGENT,
+        ttl_seconds: int = archivo_config.ROBOTS_CACHE_TTL_SECONDS,
+        negative_ttl_seconds: int = archivo_config.ROBOTS_CACHE_NEGATIVE_TTL_SECONDS,
+        timeout_seconds: int = archivo_config.ROBOTS_TIMEOUT_SECONDS,
+        max_entries: int = archivo_config.ROBOTS_CACHE_MAX_ENTRIES,
+    ):
+        self.agent = agent
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.timeout_seconds = timeout_seconds
+
+        self.hits = 0
+        self.misses = 0
+
+        self.__entries: "OrderedDict[str, RobotsCacheEntry]" = OrderedDict()
+        # only exist while a thread fetches or waits for the robots.txt of the host
+        self.__host_locks = KeyedLocks()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def get_robots_url(uri: str) -> Optional[str]:
+        parsed_url = urlparse(uri)
+        if parsed_url.scheme == "" or parsed_url.netloc == "":
+            return None
+        return f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt"
+
+    def __is_fresh(self, entry: RobotsCacheEntry) -> bool:
+        ttl = self.negative_ttl_seconds if entry.is_negative() else self.ttl_seconds
+        return time.monotonic() - entry.fetched_at < ttl
+
+    def __fetch(self, robots_url: str) -> RobotsCacheEntry:
+        try:
+            req = http_client.get(robots_url, timeout=self.timeout_seconds)
+        except Exception as e:
+            return RobotsCacheEntry(None, str(e), time.monotonic())
+
+        if req.status_code > 400:
+            # if robots.txt is not accessible, we are allowed
+            return RobotsCacheEntry(None, None, time.monotonic())
+
+        rp = RobotFileParser()
+        rp.set_url(robots_url)
+        rp.parse(req.text.split("\n"))
+        return RobotsCacheEntry(rp, None, time.monotonic())
+
+    def get_entry(self, uri: str) -> Optional[RobotsCacheEntry]:
+        """Returns the (possibly cached) robots.txt entry for the host of the URI, None for malformed URIs"""
+
+        robots_url = self.get_robots_url(uri)
+        if robots_url is None:
+            return None
+
+        # only one thread fetches the robots.txt of a host, the others wait for its result
+        with self.__host_locks.hold(robots_url):
+            with self.__lock:
+                entry = self.__entries.get(robots_url)
+                if entry is not None and self.__is_fresh(entry):
+                    self.hits += 1
+                    self.__entries.move_to_end(robots_url)
+                    return entry
+
+            entry = self.__fetch(robots_url)
+            with self.__lock:
+                self.misses += 1
+                self.__entries[robots_url] = entry
+                self.__entries.move_to_end(robots_url)
+                while len(self.__entries) > self.max_entries:
+                    self.__entries.popitem(last=False)
+            return entry
+
+    def can_fetch(self, uri: str) -> Tuple[Optional[bool], Optional[str]]:
+        """Returns a tuple (allowed, message), allowed is None for malformed URIs"""
+
+        entry = self.get_entry(uri)
+        if entry is None:
+            return None, None
+        if entry.is_negative():
+            return True, entry.error
+        if entry.parser.can_fetch(self.agent, uri):
+            return True, None
+        else:
+            return False, "Not allowed"
+
+    def get_crawl_delay(self, uri: str) -> Optional[float]:
+        """Returns the Crawl-delay in seconds the host of the URI requests for the Archivo agent (if any)"""
+
+        entry = self.get_entry(uri)
+        if entry is None or entry.is_negative():
+            return None
+        delay = entry.parser.crawl_delay(self.agent)
+        return float(delay) if delay is not None else None
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries = OrderedDict()
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hosts": len(self.__entries),
+            }
+
+
+# the cache shared by the discovery, the updates and the webservice of this process
+robots_cache = RobotsCache()
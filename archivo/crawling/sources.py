@@ -1,8 +1,7 @@
 from typing import Dict, Callable, Iterable
 
-import requests
-
 from querying import query_databus
+from utils import http_client
 
 # url to get all vocabs and their resource
 lovOntologiesURL = "https://lov.linkeddata.es/dataset/lov/api/v2/vocabulary/list"
@@ -12,13 +11,13 @@ prefixccURLs = "http://prefix.cc/context"
 
 
 def get_lov_urls() -> Iterable[str]:
-    req = requests.get(lovOntologiesURL)
+    req = http_client.get(lovOntologiesURL)
     json_data = req.json()
     return [dataObj["uri"] for dataObj in json_data]
 
 
 def get_prefix_cc_urls() -> Iterable[str]:
-    req = requests.get(prefixccURLs)
+    req = http_client.get(prefixccURLs)
     json_data = req.json()
     prefixOntoDict = json_data["@context"]
     return [prefixOntoDict[prefix] for prefix in prefixOntoDict]
@@ -26,7 +25,7 @@ def get_prefix_cc_urls() -> Iterable[str]:
 
 def get_bioregistry_urls() -> Iterable[str]:
     url = "https://raw.githubusercontent.com/biopragmatics/bioregistry/main/exports/registry/registry.json"
-    resp_json = requests.get(url).json()
+    resp_json = http_client.get(url).json()
 
     relevant_keys = ["download_rdf", "download_owl"]
 
@@ -0,0 +1,297 @@
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.File;
+import java.io.FileDescriptor;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.security.Permission;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.jar.JarFile;
+
+/**
+ * Long-lived JVM running the main methods of Archivo's Java tools (DisplayAxioms, profilechecker, Pellet),
+ * so every job doesn't pay for JVM startup, class loading and JIT warmup. Used by utils/jvm_worker.py.
+ *
+ * <p>Jobs are read from stdin, one at a time:
+ *
+ * <pre>
+ * classpath TAB main class (or "-" for the Main-Class of the first jar) TAB argument TAB ... NEWLINE
+ * length of the stdin content NEWLINE content bytes   (or: "@" path of a file used as stdin NEWLINE)
+ * </pre>
+ *
+ * Tabs, newlines and backslashes in the fields are escaped as \t, \n and \\. The result is written to stdout:
+ *
+ * <pre>
+ * exit code SPACE length of stdout SPACE length of stderr NEWLINE stdout bytes stderr bytes
+ * </pre>
+ *
+ * System.exit of a tool is trapped and returned as exit code. The class loaders of the tools are kept, so static
+ * state survives between jobs; the Python side replaces the worker after a number of jobs.
+ */
+public class ArchivoJvmWorker {
+
+    /** Output stream whose target is switched to the buffers of the current job */
+    static final class SwitchableOutputStream extends OutputStream {
+        volatile OutputStream target;
+
+        SwitchableOutputStream(OutputStream target) {
+            this.target = target;
+        }
+
+        @Override
+        public void write(int b) throws IOException {
+            target.write(b);
+        }
+
+        @Override
+        public void write(byte[] b, int off, int len) throws IOException {
+            target.write(b, off, len);
+        }
+
+        @Override
+        public void flush() throws IOException {
+            target.flush();
+        }
+    }
+
+    /** Input stream whose source is switched to the stdin content of the current job */
+    static final class SwitchableInputStream extends InputStream {
+        volatile InputStream source = new ByteArrayInputStream(new byte[0]);
+
+        @Override
+        public int read() throws IOException {
+            return source.read();
+        }
+
+        @Override
+        public int read(byte[] b, int off, int len) throws IOException {
+            return source.read(b, off, len);
+        }
+
+        @Override
+        public int available() throws IOException {
+            return source.available();
+        }
+    }
+
+    static final class ExitTrappedException extends SecurityException {
+        final int status;
+
+        ExitTrappedException(int status) {
+            super("System.exit(" + status + ") trapped");
+            this.status = status;
+        }
+    }
+
+    private static volatile boolean inJob = false;
+
+    private static final Map<String, ClassLoader> classLoaders = new HashMap<>();
+
+    public static void main(String[] args) throws Exception {
+        DataInputStream protocolIn = new DataInputStream(new BufferedInputStream(System.in));
+        OutputStream protocolOut =
+                new BufferedOutputStream(new FileOutputStream(FileDescriptor.out));
+
+        // loggers of the tools keep the streams they see first, so the streams stay and only their targets change
+        PrintStream idleErr = new PrintStream(new FileOutputStream(FileDescriptor.err), true);
+        SwitchableOutputStream jobOut = new SwitchableOutputStream(idleErr);
+        SwitchableOutputStream jobErr = new SwitchableOutputStream(idleErr);
+        SwitchableInputStream jobIn = new SwitchableInputStream();
+        System.setOut(new PrintStream(jobOut, true, "UTF-8"));
+        System.setErr(new PrintStream(jobErr, true, "UTF-8"));
+        System.setIn(jobIn);
+
+        try {
+            System.setSecurityManager(
+                    new SecurityManager() {
+                        @Override
+                        public void checkPermission(Permission permission) {}
+
+                        @Override
+                        public void checkPermission(Permission permission, Object context) {}
+
+                        @Override
+                        public void checkExit(int status) {
+                            if (inJob) {
+                                throw new ExitTrappedException(status);
+                            }
+                        }
+                    });
+        } catch (UnsupportedOperationException e) {
+            // Java >= 18 without -Djava.security.manager=allow: a System.exit of a tool ends the worker,
+            // the Python side then runs the job in a new JVM
+            idleErr.println("Can't trap System.exit: " + e.getMessage());
+        }
+
+        while (true) {
+            String header = readLine(protocolIn);
+            if (header == null) {
+                break;
+            }
+            String[] fields = header.split("\t", -1);
+            for (int i = 0; i < fields.length; i++) {
+                fields[i] = unescape(fields[i]);
+            }
+
+            String stdinSpec = readLine(protocolIn);
+            if (stdinSpec == null) {
+                break;
+            }
+            InputStream stdinContent;
+            if (stdinSpec.startsWith("@")) {
+                stdinContent = new FileInputStream(stdinSpec.substring(1));
+            } else {
+                byte[] payload = new byte[Integer.parseInt(stdinSpec)];
+                protocolIn.readFully(payload);
+                stdinContent = new ByteArrayInputStream(payload);
+            }
+
+            ByteArrayOutputStream stdout = new ByteArrayOutputStream();
+            ByteArrayOutputStream stderr = new ByteArrayOutputStream();
+            jobOut.target = stdout;
+            jobErr.target = stderr;
+            jobIn.source = stdinContent;
+
+            int exitCode;
+            try {
+                exitCode = runJob(fields[0], fields[1], Arrays.copyOfRange(fields, 2, fields.length));
+            } catch (Throwable e) {
+                e.printStackTrace(System.err);
+                exitCode = 1;
+            } finally {
+                System.out.flush();
+                System.err.flush();
+                jobOut.target = idleErr;
+                jobErr.target = idleErr;
+                jobIn.source = new ByteArrayInputStream(new byte[0]);
+                stdinContent.close();
+            }
+
+            protocolOut.write(
+                    (exitCode + " " + stdout.size() + " " + stderr.size() + "\n")
+                            .getBytes(StandardCharsets.UTF_8));
+            stdout.writeTo(protocolOut);
+            stderr.writeTo(protocolOut);
+            protocolOut.flush();
+        }
+    }
+
+    private static int runJob(String classpath, String mainClass, String[] args) throws Exception {
+        ClassLoader loader = getClassLoader(classpath);
+        if (mainClass.equals("-")) {
+            mainClass = getManifestMainClass(classpath);
+        }
+        Method mainMethod = Class.forName(mainClass, true, loader).getMethod("main", String[].class);
+
+        Thread.currentThread().setContextClassLoader(loader);
+        inJob = true;
+        try {
+            mainMethod.invoke(null, (Object) args);
+            return 0;
+        } catch (InvocationTargetException e) {
+            Throwable cause = e.getCause();
+            while (cause != null && !(cause instanceof ExitTrappedException)) {
+                cause = cause.getCause();
+            }
+            if (cause != null) {
+                return ((ExitTrappedException) cause).status;
+            }
+            e.getCause().printStackTrace(System.err);
+            return 1;
+        } finally {
+            inJob = false;
+            Thread.currentThread().setContextClassLoader(ArchivoJvmWorker.class.getClassLoader());
+        }
+    }
+
+    private static List<File> getClasspathFiles(String classpath) {
+        List<File> files = new ArrayList<>();
+        for (String entry : classpath.split(File.pathSeparator)) {
+            if (entry.endsWith("*")) {
+                // wildcard entries like the java command line: all jars of the directory
+                File[] jars =
+                        new File(entry.substring(0, entry.length() - 1))
+                                .listFiles((dir, name) -> name.endsWith(".jar"));
+                if (jars != null) {
+                    Arrays.sort(jars);
+                    files.addAll(Arrays.asList(jars));
+                }
+            } else {
+                files.add(new File(entry));
+            }
+        }
+        return files;
+    }
+
+    private static ClassLoader getClassLoader(String classpath) throws IOException {
+        ClassLoader loader = classLoaders.get(classpath);
+        if (loader == null) {
+            List<File> files = getClasspathFiles(classpath);
+            URL[] urls = new URL[files.size()];
+            for (int i = 0; i < urls.length; i++) {
+                urls[i] = files.get(i).toURI().toURL();
+            }
+            loader = new URLClassLoader(urls, ClassLoader.getSystemClassLoader());
+            classLoaders.put(classpath, loader);
+        }
+        return loader;
+    }
+
+    private static String getManifestMainClass(String classpath) throws IOException {
+        for (File file : getClasspathFiles(classpath)) {
+            if (file.getName().endsWith(".jar")) {
+                try (JarFile jar = new JarFile(file)) {
+                    if (jar.getManifest() != null) {
+                        String mainClass = jar.getManifest().getMainAttributes().getValue("Main-Class");
+                        if (mainClass != null) {
+                            return mainClass.trim();
+                        }
+                    }
+                }
+            }
+        }
+        throw new IOException("No Main-Class found in " + classpath);
+    }
+
+    private static String readLine(DataInputStream in) throws IOException {
+        ByteArrayOutputStream line = new ByteArrayOutputStream();
+        int b;
+        while ((b = in.read()) != '\n') {
+            if (b == -1) {
+                return line.size() == 0 ? null : line.toString("UTF-8");
+            }
+            line.write(b);
+        }
+        return line.toString("UTF-8");
+    }
+
+    private static String unescape(String value) {
+        StringBuilder result = new StringBuilder(value.length());
+        for (int i = 0; i < value.length(); i++) {
+            char c = value.charAt(i);
+            if (c == '\\' && i + 1 < value.length()) {
+                char next = value.charAt(++i);
+                result.append(next == 't' ? '\t' : next == 'n' ? '\n' : next);
+            } else {
+                result.append(c);
+            }
+        }
+        return result.toString();
+    }
+}
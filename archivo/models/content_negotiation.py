@@ -1,3 +1,4 @@
+import re
 from enum import Enum
 from functools import singledispatch
 from typing import Optional
@@ -64,3 +65,91 @@ def get_rdf_type(header: str) -> Optional[RDF_Type]:
             return RDF_Type.TURTLE
         case _:
             return None
+
+
+# q-weights for requesting all supported formats at once, the order matches the preference of the probing
+__WEIGHTED_ACCEPT_HEADER = ", ".join(
+    [
+        "application/rdf+xml",
+        "text/turtle;q=0.9",
+        "application/n-triples;q=0.8",
+        "application/ntriples;q=0.8",
+        "*/*;q=0.1",
+    ]
+)
+
+__CONTENT_TYPE_MAPPING = {
+    "application/rdf+xml": RDF_Type.RDF_XML,
+    "application/owl+xml": RDF_Type.RDF_XML,
+    "text/turtle": RDF_Type.TURTLE,
+    "application/x-turtle": RDF_Type.TURTLE,
+    "application/turtle": RDF_Type.TURTLE,
+    "application/n-triples": RDF_Type.N_TRIPLES,
+    "application/ntriples": RDF_Type.N_TRIPLES,
+}
+
+__NTRIPLES_LINE_REGEX = re.compile(r"^(<[^>\s]*>|_:\S+)\s+<[^>\s]*>\s+.+\.\s*$")
+
+__TURTLE_DIRECTIVE_REGEX = re.compile(
+    r"^(@prefix|@base|prefix\s|base\s)", re.IGNORECASE
+)
+
+
+def get_weighted_accept_header() -> str:
+    """Returns an Accept header requesting all supported RDF types, weighted by preference"""
+    return __WEIGHTED_ACCEPT_HEADER
+
+
+def get_rdf_type_of_content_type(content_type: Optional[str]) -> Optional[RDF_Type]:
+    """Returns the RDF type of an HTTP Content-Type header value (ignoring parameters like charset), if supported"""
+    if not content_type:
+        return None
+    mime_type = content_type.split(";")[0].strip().lower()
+    return __CONTENT_TYPE_MAPPING.get(mime_type, None)
+
+
+def sniff_rdf_type(content_start: str) -> Optional[RDF_Type]:
+    """Guesses the RDF type by looking at the start of a document. Returns None if it looks like no supported type"""
+
+    text = content_start.lstrip("﻿ \t\r\n")
+
+    if text.startswith("<?xml") or "<rdf:RDF" in text:
+        return RDF_Type.RDF_XML
+
+    for line in text.split("\n"):
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            continue
+        if __TURTLE_DIRECTIVE_REGEX.match(line):
+            return RDF_Type.TURTLE
+        if __NTRIPLES_LINE_REGEX.match(line):
+            return RDF_Type.N_TRIPLES
+        if line.startswith("<") and not line.startswith("<http"):
+            # some markup like HTML
+            return None
+        if ":" in line and not line.startswith(("{", "[")):
+            # first statement of a document using prefixed names
+            return RDF_Type.TURTLE
+        return None
+
+    return None
+
+
+def determine_rdf_type(
+    content_type: Optional[str], content_start: str
+) -> Optional[RDF_Type]:
+    """Determines the RDF type of a response by its Content-Type and its beginning.
+    The content wins if the declared type contradicts it, since many servers send wrong Content-Types."""
+
+    declared_type = get_rdf_type_of_content_type(content_type)
+    sniffed_type = sniff_rdf_type(content_start)
+
+    if declared_type is None:
+        return sniffed_type
+    elif sniffed_type is None or sniffed_type == declared_type:
+        return declared_type
+    elif declared_type == RDF_Type.TURTLE and sniffed_type == RDF_Type.N_TRIPLES:
+        # N-Triples is a subset of turtle
+        return declared_type
+    else:
+        return sniffed_type
@@ -1,8 +1,7 @@
 from dataclasses import dataclass
 
-import requests
-
 from models.content_negotiation import RDF_Type
+from utils.http_client import SpooledResponse
 from utils.parsing import RapperParsingInfo
 
 
@@ -11,6 +10,6 @@ class CrawlingResponse:
     """Represents the response of the best effort crawling"""
 
     uri: str
-    response: requests.Response
+    response: SpooledResponse
     rdf_type: RDF_Type
     parsing_info: RapperParsingInfo
@@ -1,4 +1,5 @@
 import os
+import shutil
 from abc import ABC, abstractmethod
 from logging import Logger
 from pathlib import Path
@@ -8,6 +9,7 @@ import databusclient  # type: ignore
 
 from models.databus_identifier import DatabusFileMetadata
 from utils.WebDAVUtils import WebDAVHandler
+from utils.spooling import SpooledContent
 
 
 class DataWriter(ABC):
@@ -22,6 +24,13 @@ class DataWriter(ABC):
         """Writing the data to the resource identifier"""
         raise NotImplementedError
 
+    @abstractmethod
+    def write_stream(
+        self, content: SpooledContent, db_file_metadata: DatabusFileMetadata
+    ) -> None:
+        """Writing spooled binary content to the resource identifier without loading it into memory"""
+        raise NotImplementedError
+
     def clear_history(self):
         self.written_files = []
 
@@ -38,6 +47,22 @@ class DataWriter(ABC):
             if log_file:
                 self.written_files.append((db_file_metadata, str(e)))
 
+    def write_databus_stream(
+        self,
+        content: SpooledContent,
+        db_file_metadata: DatabusFileMetadata,
+        log_file: bool = True,
+    ) -> None:
+
+        try:
+            self.write_stream(content, db_file_metadata)
+            if log_file:
+                self.written_files.append((db_file_metadata, None))
+        except Exception as e:
+            self.logger.error(f"Error writing file {db_file_metadata}:", e)
+            if log_file:
+                self.written_files.append((db_file_metadata, str(e)))
+
     def generate_distributions(self) -> List[str]:
 
         distributions = []
@@ -70,19 +95,30 @@ class FileWriter(DataWriter):
         self.target_url_base = target_url_base
         self.logger = logger
 
-    def write_data(self, content: str, db_file_metadata: DatabusFileMetadata) -> None:
+    def __get_file_path(self, db_file_metadata: DatabusFileMetadata) -> str:
         version_dir = os.path.join(
             self.path_base, str(db_file_metadata.version_identifier)
         )
 
-        filepath = os.path.join(version_dir, db_file_metadata.get_file_name())
-
         if self.create_parent_dirs and not os.path.isdir(version_dir):
             os.makedirs(version_dir)
 
+        return os.path.join(version_dir, db_file_metadata.get_file_name())
+
+    def write_data(self, content: str, db_file_metadata: DatabusFileMetadata) -> None:
+        filepath = self.__get_file_path(db_file_metadata)
+
         with open(filepath, "w+") as target_file:
             target_file.write(content)
 
+    def write_stream(
+        self, content: SpooledContent, db_file_metadata: DatabusFileMetadata
+    ) -> None:
+        filepath = self.__get_file_path(db_file_metadata)
+
+        with content.open() as source_file, open(filepath, "wb") as target_file:
+            shutil.copyfileobj(source_file, target_file)
+
 
 class WebDAVWriter(DataWriter):
     def __init__(self, target_url_base: str, api_key: str):
@@ -95,3 +131,13 @@ class WebDAVWriter(DataWriter):
         new_file_uri = f"{self.target_url_base}/{db_file_metadata}"
 
         self.webdav_handler.upload_file(new_file_uri, content, create_parent_dirs=True)
+
+    def write_stream(
+        self, content: SpooledContent, db_file_metadata: DatabusFileMetadata
+    ) -> None:
+        new_file_uri = f"{self.target_url_base}/{db_file_metadata}"
+
+        with content.open() as content_file:
+            self.webdav_handler.upload_file(
+                new_file_uri, content_file, create_parent_dirs=True
+            )
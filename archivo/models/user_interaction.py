@@ -1,7 +1,8 @@
 import json
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, List
+from typing import Dict, List, Optional
+from urllib.parse import urldefrag
 
 
 class LogLevel(Enum):
@@ -13,12 +14,27 @@ class LogLevel(Enum):
     ERROR = 4
 
 
+class FailureClass(Enum):
+    """Reasons for a failed discovery of an URI, used for deciding when to try it again"""
+
+    MALFORMED = "malformed"
+    ROBOTS_DENIED = "robots-denied"
+    UNAVAILABLE = "unavailable"
+    NO_RDF = "no-rdf"
+    UNPARSEABLE = "unparseable"
+    NO_ONTOLOGY = "no-ontology"
+
+
 @dataclass
 class ProcessStepLog:
 
     status: LogLevel
     stepname: str
     message: str
+    # set on errors that are a property of the URI, so the URI isn't retried too early
+    failure_class: Optional[FailureClass] = None
+    # the URI the failure belongs to, linked URIs are crawled with the same log
+    uri: Optional[str] = None
 
     def to_dict(self) -> Dict[str, str]:
 
@@ -40,3 +56,20 @@ def check_is_nir_based_on_log(process_log: List[ProcessStepLog]) -> bool:
             return True
 
     return False
+
+
+def classify_failure(
+    process_log: List[ProcessStepLog], uri: str
+) -> Optional[FailureClass]:
+    """Determines why the discovery of the URI failed based on the last classified error of the URI itself.
+    Returns None if there is no such error, e.g. if only linked URIs failed or the Databus deployment."""
+
+    for step_log in reversed(process_log):
+        if (
+            step_log.status == LogLevel.ERROR
+            and step_log.failure_class is not None
+            and step_log.uri is not None
+            and urldefrag(step_log.uri)[0] == urldefrag(uri)[0]
+        ):
+            return step_log.failure_class
+    return None
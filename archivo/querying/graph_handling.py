@@ -1,12 +1,11 @@
 from typing import List, Optional, Dict
 
 import rdflib
-import requests
 from rdflib import OWL, RDFS, RDF, URIRef, Graph
 from rdflib.namespace import DCTERMS, DC, SKOS
 
 from models.content_negotiation import RDF_Type
-from utils import string_tools, archivo_config
+from utils import string_tools, archivo_config, http_client
 from urllib.parse import urlparse
 from models.content_negotiation import get_rdflib_string
 from utils.archivo_exceptions import UnknownRDFFormatException
@@ -121,6 +120,12 @@ def get_owl_version_iri(graph: Graph) -> Optional[str]:
         return None
 
 
+def get_imports(graph: Graph) -> List[str]:
+    """Returns the sorted URIs of all owl:imports of the graph"""
+
+    return sorted({str(obj) for obj in graph.objects(None, OWL.imports)})
+
+
 def get_ontology_uris(graph: Graph) -> List[str]:
     """Get a List of ontology URIs of an ontology graph. Currently either owl:Ontology or skos:ConceptScheme"""
 
@@ -335,7 +340,7 @@ def hacky_shacl_content_severity(text: str) -> str:
 
 def hacky_shacl_report_severity(shacl_report_url: str) -> str:
     try:
-        shaclString = requests.get(shacl_report_url).text
+        shaclString = http_client.get(shacl_report_url).text
     except Exception as e:
         return "ERROR"
 
@@ -1,6 +1,5 @@
 from logging import Logger
 
-import requests
 from typing import Callable, Optional, Dict, List, Generator, Iterator
 
 from SPARQLWrapper import SPARQLWrapper, JSON
@@ -14,10 +13,12 @@ from models.databus_responses import (
     ContentTestResult,
     Link,
 )
-from utils import string_tools, archivo_config
+from utils import string_tools, archivo_config, http_client
+from utils.uri_index import URIIndex
 from querying import graph_handling, query_templates
 from datetime import datetime, timedelta
 import csv
+import threading
 
 __DATABUS_REPO_URL = f"{archivo_config.DATABUS_BASE}/sparql"
 
@@ -56,7 +57,7 @@ def get_info_for_artifact(group: str, artifact: str) -> ArtifactInformation:
         lodeShaclURL = binding.get("shaclLode", {"value": ""})["value"]
         consistencyURL = binding["consistencyReport"]["value"]
 
-        metadata = requests.get(metafile).json()
+        metadata = http_client.get(metafile).json()
 
         try:
             archivo_test_url = binding["shaclArchivo"]["value"]
@@ -265,6 +266,32 @@ def nir_to_latest_version_files() -> Dict[str, Dict[str, str]]:
     return result
 
 
+class LatestVersionCache:
+    """The result of nir_to_latest_version_files, only queried again once it is older than max_age_minutes.
+    Versions deployed in between are recorded with set_version, so the cached versions stay the latest ones."""
+
+    def __init__(
+        self, max_age_minutes: int = archivo_config.UPDATE_DATABUS_QUERY_INTERVAL_MINUTES
+    ):
+        self.max_age = timedelta(minutes=max_age_minutes)
+        self.__lock = threading.Lock()
+        self.__info: Optional[Dict[str, Dict[str, str]]] = None
+        self.__fetched_at: Optional[datetime] = None
+
+    def get(self, now: datetime) -> Optional[Dict[str, Dict[str, str]]]:
+        with self.__lock:
+            if self.__info is None or now - self.__fetched_at >= self.max_age:
+                info = nir_to_latest_version_files()
+                if info is not None:
+                    self.__info, self.__fetched_at = info, now
+            return self.__info
+
+    def set_version(self, databus_artifact_url: str, version: str) -> None:
+        with self.__lock:
+            if self.__info is not None and databus_artifact_url in self.__info:
+                self.__info[databus_artifact_url]["version"] = version
+
+
 def get_last_official_index() -> Optional[List[List[str]]]:
     query = query_templates.get_last_index_template.safe_substitute(
         INDEXTYPE="official"
@@ -279,7 +306,7 @@ def get_last_official_index() -> Optional[List[List[str]]]:
     except (KeyError, IndexError):
         return None
 
-    csvString = requests.get(downloadURL).text
+    csvString = http_client.get(downloadURL).text
     csvIO = StringIO(csvString)
 
     return [tp for tp in csv.reader(csvIO, delimiter=",")]
@@ -297,7 +324,7 @@ def get_last_dev_index() -> Optional[List[List[str]]]:
     except (KeyError, IndexError):
         return None
 
-    csvString = requests.get(downloadURL).text
+    csvString = http_client.get(downloadURL).text
     csvIO = StringIO(csvString)
 
     return [tp for tp in csv.reader(csvIO, delimiter=",")]
@@ -333,19 +360,18 @@ def get_identifier_on_databus(
     for binding in results:
         spo_csv_uri = binding["generated"]["value"]
         try:
-            csv_doc = requests.get(spo_csv_uri).text
+            csv_doc = http_client.get(spo_csv_uri).text
         except Exception:
             continue
         csv_IO = StringIO(csv_doc)
-        distinct_spo_uris: List[str] = []
+        distinct_spo_uris = URIIndex()
         for tp in csv.reader(csv_IO, delimiter=";"):
             try:
                 uri = tp[0]
             except Exception:
                 continue
-            if string_tools.get_uri_from_index(uri, distinct_spo_uris) is None:
-                distinct_spo_uris.append(uri)
-        yield distinct_spo_uris
+            distinct_spo_uris.add(uri)
+        yield distinct_spo_uris.to_list()
 
 
 # returns a distinct list of VOID classes and properties
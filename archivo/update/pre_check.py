@@ -0,0 +1,151 @@
+import asyncio
+from dataclasses import dataclass
+from logging import Logger
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from requests.structures import CaseInsensitiveDict
+
+from update import update_archivo
+from utils import archivo_config, string_tools
+from utils.archivoLogs import diff_logger
+from utils.concurrency import get_host_key
+
+# The pre-check sends the conditional HEAD requests of a whole update cycle concurrently before the update
+# pipeline starts, so only ontologies that changed (or whose state is unknown) get crawled, diffed and validated.
+# It only filters: everything it can't decide is left to the checks of the pipeline.
+
+
+@dataclass
+class HeadResponse:
+    """The parts of a response has_changed_headers and the header getters of string_tools look at"""
+
+    url: str
+    status_code: int
+    headers: CaseInsensitiveDict
+
+
+def get_conditional_headers(http_data: Dict) -> Dict[str, str]:
+    headers = {"Accept": http_data["best-header"]}
+    if not string_tools.is_none_or_empty(http_data["e-tag"]):
+        headers["If-None-Match"] = http_data["e-tag"]
+    if not string_tools.is_none_or_empty(http_data["lastModified"]):
+        headers["If-Modified-Since"] = http_data["lastModified"]
+    return headers
+
+
+async def check_one(
+    session: aiohttp.ClientSession,
+    host_semaphore: asyncio.Semaphore,
+    task: update_archivo.UpdateTask,
+    logger: Logger,
+) -> Optional[bool]:
+    """Returns whether the ontology of the task changed, None if that is unknown"""
+
+    try:
+        # the metadata is read from disk or the databus, so not in the event loop
+        metadata, old_version_id = await asyncio.to_thread(
+            update_archivo.prepare_diff_for_ontology,
+            uri=task.uri,
+            last_version_timestamp=task.last_version_timestamp,
+            dev_uri=task.dev_uri,
+        )
+        # handed to the update pipeline, so it doesn't fetch the metadata again
+        task.old_metadata, task.old_version_id = metadata, old_version_id
+        http_data = metadata["http-data"]
+    except Exception as e:
+        logger.debug(f"Pre-check: no metadata of {task.uri}: {e}")
+        return None
+
+    if (
+        string_tools.is_none_or_empty(http_data["e-tag"])
+        and string_tools.is_none_or_empty(http_data["lastModified"])
+        and string_tools.is_none_or_empty(http_data["content-length"])
+    ):
+        # nothing to compare
+        return None
+
+    location = task.dev_uri or task.uri
+    try:
+        async with host_semaphore:
+            async with session.head(
+                location,
+                headers=get_conditional_headers(http_data),
+                allow_redirects=True,
+            ) as resp:
+                response = HeadResponse(
+                    str(resp.url), resp.status, CaseInsensitiveDict(resp.headers)
+                )
+    except Exception as e:
+        logger.debug(f"Pre-check: HEAD of {location} failed: {e}")
+        return None
+
+    if response.status_code == 304:
+        return False
+    if response.status_code >= 400:
+        # e.g. servers not allowing HEAD, the pipeline finds out what is wrong
+        return None
+    return update_archivo.has_changed_headers(
+        response,
+        http_data["e-tag"],
+        http_data["lastModified"],
+        http_data["content-length"],
+    )
+
+
+async def check_all(
+    tasks: List[update_archivo.UpdateTask],
+    logger: Logger,
+    max_connections: int,
+    max_requests_per_host: int,
+) -> List[Optional[bool]]:
+    host_semaphores: Dict[str, asyncio.Semaphore] = {}
+    for task in tasks:
+        host = get_host_key(task.dev_uri or task.uri)
+        if host not in host_semaphores:
+            host_semaphores[host] = asyncio.Semaphore(max_requests_per_host)
+
+    async with aiohttp.ClientSession(
+        headers={"User-Agent": archivo_config.ARCHIVO_AGENT},
+        connector=aiohttp.TCPConnector(limit=max_connections),
+        timeout=aiohttp.ClientTimeout(
+            total=archivo_config.UPDATE_PRECHECK_TIMEOUT_SECONDS
+        ),
+    ) as session:
+        return await asyncio.gather(
+            *[
+                check_one(
+                    session,
+                    host_semaphores[get_host_key(task.dev_uri or task.uri)],
+                    task,
+                    logger,
+                )
+                for task in tasks
+            ]
+        )
+
+
+def split_unchanged(
+    tasks: List[update_archivo.UpdateTask],
+    logger: Logger = diff_logger,
+    max_connections: int = archivo_config.UPDATE_PRECHECK_MAX_CONNECTIONS,
+    max_requests_per_host: int = archivo_config.UPDATE_MAX_REQUESTS_PER_HOST,
+) -> Tuple[List[update_archivo.UpdateTask], List[update_archivo.UpdateTask]]:
+    """Returns the tasks that need the update pipeline (changed or unknown) and the unchanged ones"""
+
+    if not tasks:
+        return [], []
+    results = asyncio.run(
+        check_all(tasks, logger, max_connections, max_requests_per_host)
+    )
+    to_update, unchanged = [], []
+    for task, changed in zip(tasks, results):
+        if changed is False:
+            unchanged.append(task)
+        else:
+            to_update.append(task)
+    logger.info(
+        f"Pre-check: {len(unchanged)} of {len(tasks)} ontologies unchanged, "
+        f"{sum(1 for changed in results if changed is None)} unknown"
+    )
+    return to_update, unchanged
@@ -0,0 +1,139 @@
+import math
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import or_
+
+from utils import archivo_config
+from webservice import db
+from webservice.dbModels import Fallout, RevisitSchedule, Version
+
+# The revisit schedule decides when an ontology is checked for updates next. Changes are modelled as a Poisson
+# process whose rate is estimated with exponentially weighted averages of the changes found and of the days
+# between the checks, seeded from the archived versions. The next check is due once a change since the last check
+# has become REVISIT_TARGET_CHANGE_PROBABILITY likely, stretched for ontologies whose checks often fail.
+# record_check only changes the session, the caller commits it with the update results.
+
+
+def get_interval(
+    change_rate_per_day: float, failure_rate: float, kind: str
+) -> timedelta:
+    """The time until a change has the target probability, clamped to the interval limits of the kind"""
+
+    min_minutes = archivo_config.REVISIT_MIN_INTERVAL_MINUTES[kind]
+    max_minutes = archivo_config.REVISIT_MAX_INTERVAL_MINUTES[kind]
+    if change_rate_per_day <= 0:
+        return timedelta(minutes=max_minutes)
+    days = (
+        -math.log(1 - archivo_config.REVISIT_TARGET_CHANGE_PROBABILITY)
+        / change_rate_per_day
+    )
+    # failing hosts are checked up to half as often
+    minutes = days * 24 * 60 * (1 + min(failure_rate, 1.0))
+    return timedelta(minutes=min(max(minutes, min_minutes), max_minutes))
+
+
+def get_change_rate(schedule: RevisitSchedule) -> float:
+    """Estimated changes per day"""
+
+    if schedule.exposureWeight <= 0:
+        return 0.0
+    return schedule.changeWeight / schedule.exposureWeight
+
+
+def build_schedule(uri: str, kind: str, now: datetime) -> RevisitSchedule:
+    """New schedule entry, seeded with the change rate of the archived versions and the recent fallout rate"""
+
+    timestamps = [
+        version
+        for (version,) in db.session.query(Version.version)
+        .filter_by(ontology=uri)
+        .order_by(Version.version)
+        .all()
+        if version is not None
+    ]
+    changes = archivo_config.REVISIT_PRIOR_CHANGES
+    days = archivo_config.REVISIT_PRIOR_DAYS
+    if timestamps:
+        changes += len(timestamps) - 1
+        days += (now - timestamps[0]).total_seconds() / 86400
+    change_rate = changes / days
+
+    window_start = now - timedelta(days=archivo_config.REVISIT_FALLOUT_WINDOW_DAYS)
+    fallouts = (
+        db.session.query(Fallout)
+        .filter(Fallout.ontology == uri, Fallout.date >= window_start)
+        .count()
+    )
+    recent_versions = sum(1 for timestamp in timestamps if timestamp >= window_start)
+    failure_rate = (
+        fallouts / (fallouts + recent_versions) if fallouts + recent_versions else 0.0
+    )
+
+    # the seed counts as one average check at the resulting interval
+    exposure_days = (
+        get_interval(change_rate, failure_rate, kind).total_seconds() / 86400
+    )
+    return RevisitSchedule(
+        uri=uri,
+        changeWeight=change_rate * exposure_days,
+        exposureWeight=exposure_days,
+        failureWeight=failure_rate,
+        lastCheck=None,
+        nextCheck=now,
+    )
+
+
+def get_due_ontologies(ontology_model, now: datetime) -> List:
+    """The ontologies of the model (OfficialOntology or DevelopOntology) due for a check, selected in the
+    database. Ontologies without a schedule are always due."""
+
+    query = db.session.query(ontology_model)
+    if not archivo_config.REVISIT_SCHEDULING_ENABLED:
+        return query.all()
+    return (
+        query.outerjoin(RevisitSchedule, RevisitSchedule.uri == ontology_model.uri)
+        .filter(
+            or_(RevisitSchedule.nextCheck.is_(None), RevisitSchedule.nextCheck <= now)
+        )
+        .all()
+    )
+
+
+def record_check(uri: str, kind: str, changed: Optional[bool]) -> RevisitSchedule:
+    """Updates the estimates with the result of a check (changed is None if the check failed) and schedules the
+    next check"""
+
+    now = datetime.now()
+    schedule = db.session.query(RevisitSchedule).filter_by(uri=uri).first()
+    if schedule is None:
+        schedule = build_schedule(uri, kind, now)
+        db.session.add(schedule)
+
+    weight = archivo_config.REVISIT_EWMA_WEIGHT
+    schedule.failureWeight = (
+        weight * (changed is None) + (1 - weight) * schedule.failureWeight
+    )
+    # a failed check tells nothing about changes
+    if changed is not None:
+        elapsed_days = (
+            (now - schedule.lastCheck).total_seconds() / 86400
+            if schedule.lastCheck is not None
+            else schedule.exposureWeight
+        )
+        schedule.changeWeight = weight * changed + (1 - weight) * schedule.changeWeight
+        schedule.exposureWeight = (
+            weight * elapsed_days + (1 - weight) * schedule.exposureWeight
+        )
+        schedule.lastCheck = now
+
+    schedule.nextCheck = now + get_interval(
+        get_change_rate(schedule), schedule.failureWeight, kind
+    )
+    return schedule
+
+
+def delete_schedule(uri: str) -> None:
+    """Removes the schedule of an ontology removed from the database, e.g. a replaced dev URI"""
+
+    db.session.query(RevisitSchedule).filter_by(uri=uri).delete()
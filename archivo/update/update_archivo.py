@@ -1,18 +1,21 @@
 from dataclasses import dataclass
 from logging import Logger
-from typing import Tuple, List, Set, Optional, Dict
+from pathlib import Path
+from typing import Tuple, List, Set, Optional, Dict, Union, Iterable, Iterator
 
 from crawling.discovery import ArchivoVersion
 from models import content_negotiation
 from models.content_negotiation import RDF_Type
 from models.crawling_response import CrawlingResponse
-from models.data_writer import DataWriter
+from models.data_writer import DataWriter, FileWriter
 import requests
-from crawling import discovery
+from crawling import discovery, best_effort_crawling
 from datetime import datetime
 import os
 import json
 import re
+import subprocess
+import tempfile
 
 from models.user_interaction import ProcessStepLog
 from utils import (
@@ -21,6 +24,9 @@ from utils import (
     async_rdf_retrieval,
     parsing,
     content_access,
+    http_client,
+    triple_index,
+    triple_filter,
 )
 from querying import graph_handling
 from utils.archivo_exceptions import (
@@ -34,52 +40,168 @@ from models.databus_identifier import (
 )
 from utils.validation import TestSuite
 from utils.parsing import RapperParsingResult
+from utils.http_client import SpooledResponse
+from utils.spooling import SpooledContent
+from utils.concurrency import KeyedLocks, run_host_aware, get_host_key
+from utils.process_scheduler import process_scheduler
 
 __SEMANTIC_VERSION_REGEX = re.compile(r"^(\d+)\.(\d+)\.(\d+)$")
 
 __ENVIRONMENT = os.environ.copy()
 __ENVIRONMENT["LC_ALL"] = "C"
 
+# the official and the dev update of an ontology write to the same artifacts, so they are serialized by its NIR
+artifact_locks = KeyedLocks()
+
 
 @dataclass
 class DiffResult:
-    is_diff: bool
-    old_content: str
-    new_content: str
-    old_triples: Set[str]
-    new_triples: Set[str]
+    """The removed (old) and added (new) triples of a diff as sorted N-Triples on disk, close() deletes them"""
 
+    is_diff: bool
+    old_content: SpooledContent
+    new_content: SpooledContent
+    old_triple_count: int
+    new_triple_count: int
+
+    @staticmethod
+    def empty() -> "DiffResult":
+        return DiffResult(
+            False,
+            SpooledContent.from_bytes(b"", memory_threshold=0),
+            SpooledContent.from_bytes(b"", memory_threshold=0),
+            0,
+            0,
+        )
 
-def no_ignored_props_in_line(line: str):
-    for prop in archivo_config.DIFF_IGNORE_PROPERTIES:
-        if prop in line:
-            return False
-    return True
+    def close(self) -> None:
+        self.old_content.close()
+        self.new_content.close()
 
 
-def diff_content(old_triples: List[str], new_triples: List[str], logger: Logger = diff_logger) -> DiffResult:
-    """Checks the diff with python builtins. Also handles deduplication and empty lines. Returns a DiffResult"""
+def no_ignored_props_in_line(line: bytes):
+    """Checks the predicate and subject of the triple against the ignore rules of the diff"""
+    return not triple_filter.default_filter.is_ignored_bytes(line)
 
-    def filterfun(x: str):
-        """Kicking out empty lines"""
-        return x.strip() != ""
 
-    old_set_filtered = set(filter(filterfun, set(old_triples)))
-    new_set_filtered = set(filter(filterfun, set(new_triples)))
+def sort_ntriples_file(source_path: str, target_path: str, tmp_dir: str) -> None:
+    """Sorts the N-Triples file in byte order and removes duplicates, with sort spilling to tmp_dir instead of
+    holding the file in memory"""
 
-    new_triples = new_set_filtered - old_set_filtered
-    old_triples = old_set_filtered - new_set_filtered
+    command = ["sort", "-u", "-T", tmp_dir, "-o", target_path, source_path]
+    process = process_scheduler.run(
+        "sort",
+        command,
+        cost=os.path.getsize(source_path),
+        stdout=None,
+        stderr=None,
+        env=__ENVIRONMENT,
+    )
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
+
+def __iterate_triple_lines(path: str) -> Iterator[bytes]:
+    """Yields the lines of the file without line breaks, skipping empty lines"""
+
+    with open(path, "rb") as nt_file:
+        for line in nt_file:
+            line = line.rstrip(b"\r\n")
+            if line.strip():
+                yield line
+
+
+def diff_content(
+    old_sorted_path: str, new_sorted_path: str, logger: Logger = diff_logger
+) -> DiffResult:
+    """Diffs two byte-sorted, deduplicated N-Triples files with a single linear merge, so only one line of
+    each side is held in memory. Returns a DiffResult with the removed and added triples."""
+
+    removed_descriptor, removed_path = tempfile.mkstemp(prefix="archivo-", suffix=".nt")
+    added_descriptor, added_path = tempfile.mkstemp(prefix="archivo-", suffix=".nt")
+    removed_count, added_count = 0, 0
+    is_diff = False
+
+    with os.fdopen(removed_descriptor, "wb") as removed_file, os.fdopen(
+        added_descriptor, "wb"
+    ) as added_file:
+        old_lines = __iterate_triple_lines(old_sorted_path)
+        new_lines = __iterate_triple_lines(new_sorted_path)
+        old_line = next(old_lines, None)
+        new_line = next(new_lines, None)
+
+        while old_line is not None or new_line is not None:
+            if new_line is None or (old_line is not None and old_line < new_line):
+                # only in the old file
+                changed_line, target_file = old_line, removed_file
+                removed_count += 1
+                old_line = next(old_lines, None)
+            elif old_line is None or new_line < old_line:
+                # only in the new file
+                changed_line, target_file = new_line, added_file
+                added_count += 1
+                new_line = next(new_lines, None)
+            else:
+                old_line = next(old_lines, None)
+                new_line = next(new_lines, None)
+                continue
+
+            target_file.write(changed_line + b"\n")
+            if not is_diff and no_ignored_props_in_line(changed_line):
+                is_diff = True
 
-    is_diff = bool(set(filter(no_ignored_props_in_line, old_triples))) or bool(
-        set(filter(no_ignored_props_in_line, new_triples))
+    return DiffResult(
+        is_diff,
+        SpooledContent.from_file(removed_path),
+        SpooledContent.from_file(added_path),
+        removed_count,
+        added_count,
     )
 
+
+def diff_content_with_indices(
+    old_nt_path: str,
+    old_index_path: str,
+    new_nt_path: str,
+    work_dir: str,
+    logger: Logger = diff_logger,
+) -> DiffResult:
+    """Diffs with the triple hash sidecar of the old version: only the hashes are merged and only the changed
+    lines are read from the N-Triples files. The new file doesn't need to be sorted."""
+
+    new_index_path = os.path.join(work_dir, "new.idx")
+    triple_index.build_triple_index(new_nt_path, new_index_path)
+    with triple_index.TripleIndex(old_index_path) as old_index, triple_index.TripleIndex(
+        new_index_path
+    ) as new_index:
+        removed_offsets, added_offsets = triple_index.diff_triple_indices(
+            old_index, new_index
+        )
+
+    is_diff = False
+    changed_contents = []
+    for nt_path, offsets in [
+        (old_nt_path, removed_offsets),
+        (new_nt_path, added_offsets),
+    ]:
+        changed_path = os.path.join(work_dir, "changed.nt")
+        with open(changed_path, "wb") as changed_file:
+            for line in triple_index.read_lines_at(nt_path, offsets):
+                changed_file.write(line + b"\n")
+                if not is_diff and no_ignored_props_in_line(line):
+                    is_diff = True
+        # the diff files are sorted like the ones of the merge diff
+        descriptor, sorted_path = tempfile.mkstemp(prefix="archivo-", suffix=".nt")
+        os.close(descriptor)
+        sort_ntriples_file(changed_path, sorted_path, work_dir)
+        changed_contents.append(SpooledContent.from_file(sorted_path))
+
     return DiffResult(
         is_diff,
-        "\n".join(old_triples),
-        "\n".join(new_triples),
-        old_triples,
-        new_triples,
+        changed_contents[0],
+        changed_contents[1],
+        len(removed_offsets),
+        len(added_offsets),
     )
 
 
@@ -101,13 +223,25 @@ def check_for_new_version(
         # if none of the old versions are compareable -> full download diff is always needed
         return True
 
-    response = requests.head(
+    response = http_client.head(
         vocab_uri, headers={"Accept": best_header}, timeout=30, allow_redirects=True
     )
 
     if response.status_code > 400:
         raise UnavailableContentException(response)
 
+    return has_changed_headers(response, old_e_tag, old_last_mod, old_content_length)
+
+
+def has_changed_headers(
+    response: Union[requests.Response, SpooledResponse],
+    old_e_tag: str,
+    old_last_mod: str,
+    old_content_length: str,
+) -> bool:
+    """Compares the caching related headers of the response with the stored ones.
+    Returns true if any of them differs."""
+
     new_e_tag = string_tools.getEtagFromResponse(response)
     new_last_mod = string_tools.getLastModifiedFromResponse(response)
     new_content_length = string_tools.getContentLengthFromResponse(response)
@@ -121,26 +255,67 @@ def check_for_new_version(
         return True
 
 
+def fetch_if_modified(
+    vocab_uri: str,
+    old_e_tag: str,
+    old_last_mod: str,
+    old_content_length: str,
+    best_header: str,
+) -> Optional[SpooledResponse]:
+    """Performs a conditional GET with the stored ETag and Last-Modified values.
+    Returns None if the content was not modified (status 304 or unchanged headers), else the response."""
+
+    conditional_headers = {}
+    if not string_tools.is_none_or_empty(old_e_tag):
+        conditional_headers["If-None-Match"] = old_e_tag
+    if not string_tools.is_none_or_empty(old_last_mod):
+        conditional_headers["If-Modified-Since"] = old_last_mod
+
+    try:
+        response = best_effort_crawling.download_rdf_string(
+            vocab_uri, best_header, extra_headers=conditional_headers
+        )
+    except best_effort_crawling.UnavailableException as e:
+        raise UnavailableContentException(str(e))
+
+    if response.status_code == 304:
+        return None
+
+    if (
+        string_tools.is_none_or_empty(old_e_tag)
+        and string_tools.is_none_or_empty(old_last_mod)
+        and string_tools.is_none_or_empty(old_content_length)
+    ):
+        # nothing to compare -> the content needs to be diffed
+        return response
+
+    # some servers ignore the conditional headers
+    if has_changed_headers(response, old_e_tag, old_last_mod, old_content_length):
+        return response
+    else:
+        return None
+
+
 def handle_slash_uris(
-    uri: str, header: str, response: requests.Response, logger: Logger
+    uri: str, header: str, response: SpooledResponse, logger: Logger
 ) -> RapperParsingResult:
 
-    # parse it as turtle because rdflib used to have problems with parsing from ntriples
-    turtle_parsing_result = parsing.parse_rdf_from_string(
-        response.text,
+    # parse it once as ntriples: rdflib loads it faster than turtle and it is joined with the linked content
+    nt_parsing_result = parsing.parse_rdf_from_string(
+        response.body,
         uri,
         input_type=content_negotiation.get_rdf_type(header),
-        output_type=content_negotiation.RDF_Type.TURTLE,
+        output_type=content_negotiation.RDF_Type.N_TRIPLES,
     )
 
-    if turtle_parsing_result.parsing_info.errors:
+    if nt_parsing_result.parsing_info.errors:
         raise UnparseableRDFException(
-            f"Found {len(turtle_parsing_result.parsing_info.errors)} Errors during parsing:\n"
-            + "\n".join(turtle_parsing_result.parsing_info.errors)
+            f"Found {len(nt_parsing_result.parsing_info.errors)} Errors during parsing:\n"
+            + "\n".join(nt_parsing_result.parsing_info.errors)
         )
 
     graph = graph_handling.get_graph_of_string(
-        turtle_parsing_result.parsed_rdf, RDF_Type.TURTLE
+        nt_parsing_result.parsed_rdf, RDF_Type.N_TRIPLES
     )
 
     crawl_parsing_results, retrieval_errors = async_rdf_retrieval.gather_linked_content(
@@ -162,18 +337,9 @@ def handle_slash_uris(
         return RapperParsingResult(
             response.text,
             content_negotiation.get_rdf_type(header),
-            turtle_parsing_result.parsing_info,
+            nt_parsing_result.parsing_info,
         )
 
-    async_rdf_retrieval.join_ntriples_results(crawl_parsing_results)
-
-    nt_parsing_result = parsing.parse_rdf_from_string(
-        response.text,
-        uri,
-        input_type=content_negotiation.get_rdf_type(header),
-        output_type=content_negotiation.RDF_Type.N_TRIPLES,
-    )
-
     # append original nt content to retrieved content
     crawl_parsing_results.append(nt_parsing_result)
 
@@ -199,35 +365,49 @@ def diff_check_new_file(
     bestHeader = old_metadata["http-data"]["best-header"]
     contentLength = old_metadata["http-data"]["content-length"]
 
-    has_new_version = check_for_new_version(
-        locURI, oldETag, oldLastMod, contentLength, bestHeader
-    )
+    output: List[ProcessStepLog] = []
+    crawling_response: Optional[CrawlingResponse] = None
 
-    if not has_new_version:
-        # if there are no possible further values, we are done
-        return None, None, None
+    if archivo_config.UPDATE_CHECK_MODE == "conditional":
+        response = fetch_if_modified(
+            locURI, oldETag, oldLastMod, contentLength, bestHeader
+        )
 
-    output: List[ProcessStepLog] = []
+        if response is None:
+            # not modified, we are done
+            return None, None, None
+
+        best_rdf_type = content_negotiation.get_rdf_type(bestHeader)
+        if best_rdf_type is not None:
+            crawling_response = best_effort_crawling.handle_parsing(
+                locURI, response, best_rdf_type, user_output=output
+            )
+            if (
+                crawling_response.parsing_info.triple_number <= 0
+                or crawling_response.parsing_info.errors
+            ):
+                # the format may have changed, so look for the best one again
+                crawling_response = None
+    else:
+        has_new_version = check_for_new_version(
+            locURI, oldETag, oldLastMod, contentLength, bestHeader
+        )
 
-    crawling_response = discovery.determine_best_content_type(
-        locURI, user_output=output
-    )
-    crawling_response.response.encoding = "utf-8"
+        if not has_new_version:
+            # if there are no possible further values, we are done
+            return None, None, None
+
+    if crawling_response is None:
+        crawling_response = discovery.determine_best_content_type(
+            locURI, user_output=output
+        )
 
     if crawling_response is None:
         error_str = f"Error in step {output[-1].stepname}: {output[-1].message}"
         raise UnavailableContentException(error_str)
 
-    parsing_result = parsing.parse_rdf_from_string(
-        crawling_response.response.text,
-        uri,
-        input_type=crawling_response.rdf_type,
-        output_type=content_negotiation.RDF_Type.N_TRIPLES,
-    )
-
-    # raising an exception if there are no triples in the result
-    if parsing_result.parsing_info.triple_number <= 0:
-        raise UnparseableRDFException("\n".join(parsing_result.parsing_info.errors))
+    # the body is parsed as bytes, but the text of the response is decoded as utf-8 like in the old archivo
+    crawling_response.response.encoding = "utf-8"
 
     old_nt_file_metadata = DatabusFileMetadata(
         old_version_id,
@@ -238,11 +418,63 @@ def diff_check_new_file(
         compression=None,
     )
 
-    old_file_nt_content = content_access.get_databus_file(old_nt_file_metadata)
-    old_content_triples = old_file_nt_content.split("\n")
-    new_content_triples = parsing_result.parsed_rdf.split("\n")
+    old_nt_path = content_access.get_local_file_path(old_nt_file_metadata)
+    old_index_path = content_access.get_local_file_path(
+        triple_index.get_triple_index_metadata(old_version_id)
+    )
 
-    diff_result = diff_content(old_content_triples, new_content_triples)
+    with tempfile.TemporaryDirectory(prefix="archivo-diff-") as work_dir:
+        # rapper writes through sort straight to disk, the new version is only loaded if it is deployed
+        new_path = os.path.join(work_dir, "new.nt")
+        parsing_info = parsing.parse_to_sorted_ntriples_file(
+            crawling_response.response.body,
+            uri,
+            crawling_response.rdf_type,
+            new_path,
+            tmp_dir=work_dir,
+        )
+
+        # raising an exception if there are no triples in the result
+        if parsing_info.triple_number <= 0:
+            raise UnparseableRDFException("\n".join(parsing_info.errors))
+
+        # an equal fingerprint means no relevant change, the old version doesn't need to be loaded at all
+        old_fingerprint = old_metadata["ontology-info"].get("triple-fingerprint", None)
+        if (
+            old_fingerprint is not None
+            and triple_index.compute_file_fingerprint(new_path) == old_fingerprint
+        ):
+            logger.info(f"Same triple fingerprint as {old_version_id}")
+            return DiffResult.empty(), crawling_response, None
+
+        diff_result = None
+        if old_nt_path is not None and old_index_path is not None:
+            try:
+                diff_result = diff_content_with_indices(
+                    old_nt_path, old_index_path, new_path, work_dir, logger=logger
+                )
+            except Exception:
+                logger.exception(
+                    f"Couldn't diff {uri} with the triple index of {old_version_id}"
+                )
+
+        if diff_result is None:
+            # both sides are sorted on disk and merged, so the diff needs no memory growing with the ontology
+            old_path = content_access.download_databus_file(
+                old_nt_file_metadata, os.path.join(work_dir, "old-download.nt")
+            )
+            old_sorted_path = os.path.join(work_dir, "old.nt")
+            sort_ntriples_file(old_path, old_sorted_path, work_dir)
+            diff_result = diff_content(old_sorted_path, new_path, logger=logger)
+
+        if not diff_result.is_diff:
+            return diff_result, crawling_response, None
+
+        # the deployment needs the whole new version in memory (see DIFF_SKIP_ONTOLOGY_URLS)
+        with open(new_path, encoding="utf-8") as new_file:
+            parsing_result = RapperParsingResult(
+                new_file.read(), content_negotiation.RDF_Type.N_TRIPLES, parsing_info
+            )
 
     return diff_result, crawling_response, parsing_result
 
@@ -262,19 +494,16 @@ def create_diff_files(
         ("old", diff_result.old_content),
     ]:
 
-        shasum, content_length = string_tools.get_content_stats(bytes(content, "utf-8"))
         db_file_metadata = DatabusFileMetadata(
             version_identifier=databus_version_id,
-            content_length=content_length,
-            sha_256_sum=shasum,
+            content_length=content.content_length,
+            sha_256_sum=content.sha_256_sum,
             compression=None,
             content_variants={"type": "diff", "triples": triples_type},
             file_extension="nt",
         )
 
-        data_writer.write_databus_file(
-            db_file_metadata=db_file_metadata, content=content
-        )
+        data_writer.write_databus_stream(content, db_file_metadata)
 
     for axiom_type, content in [("new", new_axioms), ("old", old_axioms)]:
         content = "\n".join(content)
@@ -303,13 +532,18 @@ def update_for_ontology_uri(
     test_suite: TestSuite,
     dev_uri: Optional[str] = None,
     logger: Logger = diff_logger,
+    old_metadata: Optional[Dict] = None,
+    old_version_id: Optional[DatabusVersionIdentifier] = None,
 ) -> Tuple[bool, str, Optional[ArchivoVersion]]:
     try:
-        metadata, old_version_id = prepare_diff_for_ontology(
-            uri=uri,
-            last_version_timestamp=last_version_timestamp,
-            dev_uri=dev_uri,
-        )
+        if old_metadata is not None and old_version_id is not None:
+            metadata = old_metadata
+        else:
+            metadata, old_version_id = prepare_diff_for_ontology(
+                uri=uri,
+                last_version_timestamp=last_version_timestamp,
+                dev_uri=dev_uri,
+            )
         diff_result, crawling_response, parsing_result = diff_check_new_file(
             uri=uri,
             dev_uri=dev_uri,
@@ -323,14 +557,44 @@ def update_for_ontology_uri(
 
     if not diff_result or not diff_result.is_diff:
         if diff_result:
+            diff_result.close()
             logger.info(f"No difference in the triples, no new version")
         else:
             logger.info(f"No difference in the header files, no crawling happening")
         return False, f"No different version for {uri}", None
     # New version!
 
+    try:
+        return deploy_new_version(
+            uri,
+            source,
+            metadata,
+            old_version_id,
+            diff_result,
+            crawling_response,
+            parsing_result,
+            data_writer,
+            test_suite,
+            logger,
+        )
+    finally:
+        diff_result.close()
+
+
+def deploy_new_version(
+    uri: str,
+    source: str,
+    metadata: Dict,
+    old_version_id: DatabusVersionIdentifier,
+    diff_result: DiffResult,
+    crawling_response: CrawlingResponse,
+    parsing_result: RapperParsingResult,
+    data_writer: DataWriter,
+    test_suite: TestSuite,
+    logger: Logger,
+) -> Tuple[bool, str, Optional[ArchivoVersion]]:
     logger.info(
-        f"New, different version for ontology {uri}: {len(diff_result.old_triples)} old triples, {len(diff_result.new_triples)} new triples"
+        f"New, different version for ontology {uri}: {diff_result.old_triple_count} old triples, {diff_result.new_triple_count} new triples"
     )
 
     new_version_identifier = DatabusVersionIdentifier(
@@ -388,6 +652,78 @@ def update_for_ontology_uri(
         return False, "ERROR: Couldn't deploy to databus!", new_version
 
 
+@dataclass
+class UpdateTask:
+    """Plain data of an ontology to update, the workers never touch database objects"""
+
+    uri: str
+    source: str
+    last_version_timestamp: str
+    dev_uri: Optional[str] = None
+    # metadata and ID of the latest version, if they were already fetched (e.g. by the pre-check)
+    old_metadata: Optional[Dict] = None
+    old_version_id: Optional[DatabusVersionIdentifier] = None
+
+
+@dataclass
+class UpdateResult:
+    success: Optional[bool]
+    message: Optional[str]
+    archivo_version: Optional[ArchivoVersion]
+    dev_version: Optional[ArchivoVersion] = None
+
+
+def update_ontology_task(
+    task: UpdateTask, test_suite: TestSuite, logger: Logger
+) -> UpdateResult:
+    """Updates the ontology of the task and, for official ontologies, its trackThis dev version"""
+
+    data_writer = FileWriter(
+        path_base=Path(archivo_config.LOCAL_PATH),
+        target_url_base=archivo_config.PUBLIC_URL_BASE,
+        logger=logger,
+    )
+
+    with artifact_locks.hold(task.uri):
+        success, message, archivo_version = update_for_ontology_uri(
+            uri=task.uri,
+            last_version_timestamp=task.last_version_timestamp,
+            test_suite=test_suite,
+            source=task.source,
+            data_writer=data_writer,
+            logger=logger,
+            dev_uri=task.dev_uri,
+            old_metadata=task.old_metadata,
+            old_version_id=task.old_version_id,
+        )
+        dev_version = None
+        if success and task.dev_uri is None:
+            # check for new trackThis URI
+            dev_version = archivo_version.handle_dev_version()
+
+    return UpdateResult(success, message, archivo_version, dev_version)
+
+
+def update_ontologies(
+    tasks: Iterable[UpdateTask],
+    test_suite: TestSuite,
+    logger: Logger = diff_logger,
+    max_workers: int = archivo_config.UPDATE_WORKER_COUNT,
+    max_requests_per_host: int = archivo_config.UPDATE_MAX_REQUESTS_PER_HOST,
+) -> Iterator[Tuple[UpdateTask, Optional[UpdateResult], Optional[BaseException]]]:
+    """Updates the ontologies concurrently on a pool of workers, with at most max_requests_per_host ontologies of
+    the same host at once. Yields (task, result, exception) tuples as soon as an ontology is finished, the
+    consumer is responsible for writing the results to the database."""
+
+    yield from run_host_aware(
+        tasks,
+        work_fun=lambda task: update_ontology_task(task, test_suite, logger),
+        key_fun=lambda task: get_host_key(task.dev_uri or task.uri),
+        max_workers=max_workers,
+        max_per_host=max_requests_per_host,
+    )
+
+
 def prepare_diff_for_ontology(
     uri: str,
     last_version_timestamp: str,
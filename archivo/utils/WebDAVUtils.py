@@ -1,7 +1,9 @@
-from typing import List
+from typing import BinaryIO, List, Union
 
 import requests
 
+from utils import http_client
+
 
 class WebDAVException(Exception):
     """Generalized exception for WebDAV requests"""
@@ -24,7 +26,7 @@ class WebDAVHandler:
     def check_existence(self, path: str) -> bool:
         """check if path is available"""
         try:
-            resp = requests.head(url=f"{self.dav_base}{path}", timeout=4)
+            resp = http_client.head(f"{self.dav_base}{path}", timeout=4)
         except requests.RequestException:
             return False
 
@@ -36,14 +38,17 @@ class WebDAVHandler:
         """create directory"""
 
         if session is None:
-            session = requests.Session()
+            session = http_client.default_client.session
 
         req = requests.Request(
             method="MKCOL",
             url=f"{self.dav_base}{path}",
             headers={"X-API-KEY": f"{self.api_key}"},
         )
-        resp = session.send(req.prepare())
+        resp = session.send(
+            session.prepare_request(req),
+            timeout=http_client.default_client.timeout_seconds,
+        )
         return resp
 
     def create_dirs(self, path: str) -> List[requests.Response]:
@@ -64,16 +69,16 @@ class WebDAVHandler:
         return responses
 
     def upload_file(
-            self, path: str, data: str, create_parent_dirs: bool = False
+            self, path: str, data: Union[str, bytes, BinaryIO], create_parent_dirs: bool = False
     ) -> requests.Response:
-        """upload content as string to a path, optionally creating parent dirs."""
+        """upload content as string or file handle to a path, optionally creating parent dirs."""
 
         if create_parent_dirs:
             dirpath = path.rsplit("/", 1)[0]
             self.create_dirs(dirpath)
 
-        resp = requests.put(  # pylint: disable=missing-timeout
-            url=f"{self.dav_base}{path}",
+        resp = http_client.put(
+            f"{self.dav_base}{path}",
             headers={"X-API-KEY": f"{self.api_key}"},
             data=data,
         )
@@ -1,5 +1,6 @@
 # Databus 2.0 API config
-from typing import List
+import os
+from typing import Dict, List
 
 DATABUS_API_KEY: str = "blablubb"
 DATABUS_BASE: str = "https://databus.dbpedia.org"
@@ -8,6 +9,33 @@ DATABUS_USER: str = "ontologies"
 # agent name for crawling
 ARCHIVO_AGENT: str = "dbpedia-archivo-robot"
 
+# number of hosts the HTTP client keeps a pool of keep-alive connections for
+HTTP_POOL_CONNECTIONS: int = 100
+
+# max. number of keep-alive connections kept open per host
+HTTP_POOL_MAXSIZE: int = 10
+
+# timeout for outbound HTTP requests that don't set their own
+HTTP_DEFAULT_TIMEOUT_SECONDS: int = 60
+
+# max. size of a downloaded ontology, bigger ones are rejected
+DOWNLOAD_MAX_SIZE_BYTES: int = 2 * 1024 * 1024 * 1024
+
+# downloads bigger than this are spooled to a temporary file instead of being kept in memory
+DOWNLOAD_SPOOL_MEMORY_BYTES: int = 8 * 1024 * 1024
+
+# seconds a fetched robots.txt is reused before it is requested again
+ROBOTS_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+
+# seconds an unavailable robots.txt (connection errors, status > 400) is remembered
+ROBOTS_CACHE_NEGATIVE_TTL_SECONDS: int = 60 * 60
+
+# max. number of hosts whose robots.txt is cached, the least recently used ones are evicted
+ROBOTS_CACHE_MAX_ENTRIES: int = 10000
+
+# timeout for requesting a robots.txt
+ROBOTS_TIMEOUT_SECONDS: int = 10
+
 # deployment config for server
 
 # path the data should be written to NOTE: It's in the admins job to make this path public by the URL base noted
@@ -25,6 +53,11 @@ DIFF_IGNORE_PROPERTIES: List[str] = [
     "http://www.w3.org/2002/07/owl#versionInfo",
 ]
 
+# ignore rules for the triples of subjects matching a regex, by the full predicate URI
+# the key "*" applies the patterns to all predicates
+# e.g. {"http://www.w3.org/2002/07/owl#versionIRI": [r"^http://purl\.obolibrary\.org/obo/"]}
+DIFF_IGNORE_SUBJECT_RULES: Dict[str, List[str]] = {}
+
 # archivo trackthis uri
 ARCHIVO_TRACK_THIS_PROPERTY: str = "https://archivo.dbpedia.org/onto#trackThis"
 
@@ -37,15 +70,217 @@ ONTOLOGY_BACKLINK_PROPERTIES: List[str] = [
 ]
 
 
+# backend for parsing RDF:
+# "auto": small documents are parsed by rdflib in a pool of long-lived worker processes, rapper parses the rest
+# and everything the pool fails on
+# "rapper": every document is parsed by a new rapper subprocess
+PARSING_BACKEND: str = "auto"
+
+# max. size of documents parsed by the rdflib worker pool
+PARSING_INPROCESS_MAX_BYTES: int = 256 * 1024
+
+# number of rdflib worker processes
+PARSING_WORKER_COUNT: int = 4
+
+# number of documents an rdflib worker process parses before it is replaced
+PARSING_WORKER_MAX_TASKS: int = 500
+
+# seconds to wait for the rdflib worker pool before falling back to rapper
+PARSING_INPROCESS_TIMEOUT_SECONDS: int = 60
+
+# directory of the caches of this installation, they are created only accessible by the user running Archivo
+CACHE_DIR: str = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache"
+)
+
+# directory of the on-disk cache of parsing results, keyed by the SHA-256 of the input
+PARSE_CACHE_DIR: str = os.path.join(CACHE_DIR, "parse")
+
+# max. size of the parse cache, the least recently used entries are evicted above it
+PARSE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+
+# inputs smaller than this are not cached, since parsing them is cheaper than the disk access
+PARSE_CACHE_MIN_INPUT_BYTES: int = 64 * 1024
+
+# switch for the parse cache
+PARSE_CACHE_ENABLED: bool = True
+
+# directory of the on-disk cache of pellet results, keyed by the SHA-256 of the parsed ontology, its imports and
+# the pellet options
+REASONING_CACHE_DIR: str = os.path.join(CACHE_DIR, "reasoning")
+
+# max. size of the reasoning cache, the least recently used entries are evicted above it
+REASONING_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+# switch for the reasoning cache
+REASONING_CACHE_ENABLED: bool = True
+
+# where the imports closures of ontologies, rewritten to the archived files in LOCAL_PATH, are kept for pellet
+IMPORTS_CLOSURE_DIR: str = os.path.join(CACHE_DIR, "imports-closures")
+
+# max. number of kept imports closures, the least recently used are removed
+IMPORTS_CLOSURE_MAX_ENTRIES: int = 500
+
+# closures used more recently than this are never removed, since pellet of another process may still read them
+# (longer than a pellet run including its time in the process queue)
+IMPORTS_CLOSURE_MIN_AGE_SECONDS: int = 2 * 60 * 60
+
+# imports nested deeper than this are not resolved locally
+IMPORTS_CLOSURE_MAX_DEPTH: int = 10
+
+# how the RDF format of an ontology is determined:
+# "negotiate": one request with a q-weighted Accept header, other formats are only probed if it fails to parse
+# "probe": one request per supported format, the one with the most triples wins
+CONTENT_NEGOTIATION_MODE: str = "negotiate"
+
+# how the update checks an ontology for changes:
+# "conditional": one conditional GET with the stored ETag/Last-Modified, its body is reused for the diff
+# "head": a HEAD request comparing the headers, followed by a full download
+UPDATE_CHECK_MODE: str = "conditional"
+
 # max. recursion depth of discovery
 # recursion depth of 2 means: uri -> rdf-content -> uri -> rdf-content STOP
 DISCOVERY_MAXIMUM_RECURSION_DEPTH: int = 5
 
+# number of URIs crawled in parallel during the discovery
+DISCOVERY_WORKER_COUNT: int = 8
+
+# max. number of URIs of the same host crawled in parallel during the discovery
+DISCOVERY_MAX_REQUESTS_PER_HOST: int = 2
+
+# priorities of the URIs in the discovery frontier by source, higher priorities are crawled first
+# sources not listed here get the priority 0
+DISCOVERY_FRONTIER_SOURCE_PRIORITIES: Dict[str, int] = {
+    "user-suggestion": 100,
+    "linked": 50,
+}
+
+# number of URIs taken from the discovery frontier per run of the frontier job
+DISCOVERY_FRONTIER_BATCH_SIZE: int = 500
+
+# seconds a claimed frontier URI is locked, if the process dies it gets crawled again afterwards
+DISCOVERY_FRONTIER_LEASE_SECONDS: int = 2 * 60 * 60
+
+# seconds until a URI whose crawl failed with an exception is retried, multiplied with the attempts
+DISCOVERY_FRONTIER_RETRY_DELAY_SECONDS: int = 6 * 60 * 60
+
+# max. number of crawl attempts of a frontier URI before it is dropped
+DISCOVERY_FRONTIER_MAX_ATTEMPTS: int = 3
+
+# hours until a URI whose discovery failed is crawled again, by failure class (see models.user_interaction)
+# the delay doubles with every further failure of the URI
+DISCOVERY_RETRY_BASE_DELAY_HOURS: Dict[str, int] = {
+    "malformed": 90 * 24,
+    "robots-denied": 7 * 24,
+    "unavailable": 24,
+    "no-rdf": 14 * 24,
+    "unparseable": 7 * 24,
+    "no-ontology": 14 * 24,
+}
+
+# max. hours until a failed URI is crawled again
+DISCOVERY_RETRY_MAX_DELAY_HOURS: int = 180 * 24
+
 # All the ontologies in this list will not be skipped during update due to performance reasons
 # NOTE: These problems should be investigated, not ignored, so a GitHub issue should be opened to name and shame myself
+# the diff of dron.owl is streamed now, but deploying a new version still loads it into memory (as N-Triples
+# string and rdflib graph)
 DIFF_SKIP_ONTOLOGY_URLS: List[str] = ["http://purl.obolibrary.org/obo/dron.owl"]
 
+# number of ontologies updated in parallel by the official and dev update, defaults to one per core
+UPDATE_WORKER_COUNT: int = os.cpu_count() or 4
+
+# max. number of ontologies of the same host updated in parallel
+UPDATE_MAX_REQUESTS_PER_HOST: int = 2
+
+# number of update results written to the database per commit
+UPDATE_COMMIT_BATCH_SIZE: int = 25
+
+# check all ontologies of an update cycle with concurrent conditional HEAD requests first,
+# only the changed ones and those that couldn't be checked go through the update pipeline
+UPDATE_PRECHECK_ENABLED: bool = True
+
+# max. number of open connections of the pre-check (per host the limit is UPDATE_MAX_REQUESTS_PER_HOST)
+UPDATE_PRECHECK_MAX_CONNECTIONS: int = 100
+
+# timeout of a single pre-check request
+UPDATE_PRECHECK_TIMEOUT_SECONDS: int = 30
+
+# minutes the latest versions of all artifacts queried from the databus are reused by the official update, which
+# runs hourly but only checks the ontologies due according to their revisit schedule
+UPDATE_DATABUS_QUERY_INTERVAL_MINUTES: int = 8 * 60
+
+# only check ontologies for updates once they are due according to their estimated change rate
+REVISIT_SCHEDULING_ENABLED: bool = True
+
+# min. and max. minutes between two update checks of an ontology, per kind of ontology
+REVISIT_MIN_INTERVAL_MINUTES: Dict[str, int] = {"official": 8 * 60, "dev": 10}
+REVISIT_MAX_INTERVAL_MINUTES: Dict[str, int] = {
+    "official": 14 * 24 * 60,
+    "dev": 2 * 24 * 60,
+}
+
+# the next check is scheduled when a change since the last check has become this likely
+REVISIT_TARGET_CHANGE_PROBABILITY: float = 0.25
+
+# weight of the latest check in the averaged change and failure rates
+REVISIT_EWMA_WEIGHT: float = 0.2
+
+# assumed change history of every ontology, keeps the estimate of ontologies with few versions reasonable
+REVISIT_PRIOR_CHANGES: float = 1.0
+REVISIT_PRIOR_DAYS: float = 30.0
+
+# fallouts of the last days are used for the initial failure rate
+REVISIT_FALLOUT_WINDOW_DAYS: int = 90
+
 
 # path to the pellet binary
 # only needs to be configured if not run in the docker env, the default is set to that
 PELLET_BINARY_PATH = "/usr/lib/pellet/cli/target/pelletcli/bin/pellet"
+
+# the jars and the main class of the pellet CLI, used for running pellet in the JVM workers
+PELLET_CLASSPATH: List[str] = ["/usr/lib/pellet/cli/target/pelletcli/lib/*"]
+PELLET_MAIN_CLASS: str = "pellet.Pellet"
+
+# run DisplayAxioms, the profile checker and pellet in long-lived JVM workers instead of a new JVM per call
+JVM_WORKER_ENABLED: bool = True
+
+# number of JVM workers, i.e. max. number of java tools running at once
+JVM_WORKER_COUNT: int = 2
+
+# a JVM worker is replaced after this many jobs, since the tools keep static state between jobs
+JVM_WORKER_MAX_JOBS: int = 200
+
+# a JVM worker is replaced once its resident memory exceeds this
+JVM_WORKER_MAX_RSS_BYTES: int = 6 * 1024 * 1024 * 1024
+
+# options of the JVM workers, add -Djava.security.manager=allow for Java >= 18
+JVM_WORKER_OPTIONS: List[str] = ["-Xmx4g"]
+
+# max. number of external processes (rapper, sort, pellet, DisplayAxioms, profile checker) running at once
+PROCESS_MAX_RUNNING: int = os.cpu_count() or 4
+
+# max. number of processes of one tool running at once, tools not listed are only limited by PROCESS_MAX_RUNNING
+PROCESS_TOOL_LIMITS: Dict[str, int] = {
+    "pellet": 2,
+    "display-axioms": 2,
+    "profile-checker": 2,
+}
+
+# address space limit (RLIMIT_AS) of the processes of a tool
+# not set for the java tools: the JVM reserves far more address space than it uses, their heap is set with -Xmx
+PROCESS_MEMORY_LIMITS_BYTES: Dict[str, int] = {
+    "rapper": 8 * 1024 * 1024 * 1024,
+}
+
+# CPU time limit (RLIMIT_CPU) of the processes of a tool
+PROCESS_CPU_LIMITS_SECONDS: Dict[str, int] = {
+    "rapper": 1200,
+    "sort": 1200,
+    "pellet": 2400,
+    "display-axioms": 1200,
+    "profile-checker": 1200,
+}
+
+# waiting jobs are started cheapest (smallest input) first, jobs waiting longer than this go before cheaper ones
+PROCESS_QUEUE_MAX_WAIT_SECONDS: int = 300
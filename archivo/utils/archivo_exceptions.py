@@ -29,3 +29,7 @@ class UnavailableContentException(Exception):
 
 class UnparseableRDFException(Exception):
     """Raised if RDF string is not parseable without errors"""
+
+
+class ContentTooLargeException(Exception):
+    """Raised if downloaded content exceeds the configured maximum size"""
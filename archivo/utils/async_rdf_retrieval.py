@@ -7,8 +7,9 @@ from models.content_negotiation import RDF_Type
 from querying import graph_handling
 
 from models import content_negotiation
-from utils import parsing
+from utils import parsing, archivo_config
 from utils.parsing import RapperParsingResult, RapperParsingInfo
+from utils.spooling import SpooledContent
 
 
 def chunk_list(lst, size):
@@ -32,14 +33,23 @@ async def fetch_one_nt_resource(
         if resp.status >= 400:
             error_list.append((uri, f"Status {resp.status}"))
             return None
-        data = await resp.text(encoding="UTF-8")
-
-        parsing_result = parsing.parse_rdf_from_string(
-            data,
-            uri,
-            input_type=content_negotiation.get_rdf_type(acc_header),
-            output_type=content_negotiation.RDF_Type.N_TRIPLES,
+        data = SpooledContent(
+            memory_threshold=archivo_config.DOWNLOAD_SPOOL_MEMORY_BYTES,
+            max_size=archivo_config.DOWNLOAD_MAX_SIZE_BYTES,
         )
+        try:
+            async for chunk in resp.content.iter_chunked(64 * 1024):
+                data.write(chunk)
+            data.finish()
+
+            parsing_result = parsing.parse_rdf_from_string(
+                data,
+                uri,
+                input_type=content_negotiation.get_rdf_type(acc_header),
+                output_type=content_negotiation.RDF_Type.N_TRIPLES,
+            )
+        finally:
+            data.close()
         if not allow_rapper_errors and parsing_result.parsing_info.errors != []:
             error_list.append(
                 (uri, "Parsing error: " + ";".join(parsing_result.parsing_info.errors))
@@ -68,7 +78,9 @@ async def collect_linked_content(
 
     for chunk in chunk_list(defined_uris, concurrent_requests):
         tasks = []
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(
+            headers={"User-Agent": archivo_config.ARCHIVO_AGENT}
+        ) as session:
             for uri in chunk:
                 tasks.append(
                     fetch_one_nt_resource(
@@ -0,0 +1,133 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import urlparse
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def get_host_key(uri: str) -> str:
+    """Returns the host (netloc without www. prefix) of an URI, used for grouping requests per server"""
+
+    netloc = urlparse(uri).netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return netloc
+
+
+class KeyedLocks:
+    """One lock per key, e.g. for never working on the same artifact in two threads at once.
+    Locks are created on demand and dropped again once no thread holds or waits for them."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        # key -> (lock, number of threads holding or waiting for it)
+        self.__locks: Dict[str, List] = {}
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        with self.__lock:
+            entry = self.__locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.__lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self.__locks[key]
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__locks)
+
+
+def run_host_aware(
+    items: Iterable[T],
+    work_fun: Callable[[T], R],
+    key_fun: Callable[[T], str],
+    max_workers: int,
+    max_per_host: int,
+    max_backlog: Optional[int] = None,
+) -> Iterator[Tuple[T, Optional[R], Optional[BaseException]]]:
+    """Runs work_fun for every item on a pool of worker threads, with never more than max_per_host
+    items of the same host (determined by key_fun) running at once.
+
+    The results are yielded as tuples (item, result, exception) in the order they complete, so the consuming
+    thread can act as the single writer for everything that is not thread-safe (e.g. the database session).
+    Items of busy hosts are held back in a backlog of at most max_backlog items (default: 50 per worker)
+    while the rest of the input is processed, so lazy inputs (e.g. generators) are never fully materialized."""
+
+    if max_backlog is None:
+        max_backlog = max_workers * 50
+
+    item_iterator = iter(items)
+    input_exhausted = False
+
+    in_flight: Dict[Future, Tuple[T, str]] = {}
+    host_counts: Dict[str, int] = {}
+    deferred: Dict[str, Deque[T]] = {}
+    deferred_count = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        def submit(item: T, host: str) -> None:
+            host_counts[host] = host_counts.get(host, 0) + 1
+            in_flight[executor.submit(work_fun, item)] = (item, host)
+
+        while True:
+            # refill the pool from the input, deferring items of busy hosts
+            while (
+                not input_exhausted
+                and len(in_flight) < max_workers
+                and deferred_count < max_backlog
+            ):
+                try:
+                    item = next(item_iterator)
+                except StopIteration:
+                    input_exhausted = True
+                    break
+                host = key_fun(item)
+                if host_counts.get(host, 0) < max_per_host:
+                    submit(item, host)
+                else:
+                    deferred.setdefault(host, deque()).append(item)
+                    deferred_count += 1
+
+            if not in_flight:
+                # the backlog can only be non-empty if a host is busy, which means something is in flight
+                break
+
+            done, _ = wait(list(in_flight.keys()), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item, host = in_flight.pop(future)
+                host_counts[host] -= 1
+
+                # free slot for this host -> start the next deferred item of it
+                host_queue = deferred.get(host)
+                if host_queue:
+                    submit(host_queue.popleft(), host)
+                    deferred_count -= 1
+                    if not host_queue:
+                        del deferred[host]
+
+                exception = future.exception()
+                if exception is None:
+                    yield item, future.result(), None
+                else:
+                    yield item, None, exception
@@ -1,9 +1,8 @@
 from pathlib import Path
-
-import requests
+from typing import Optional
 
 from models.databus_identifier import DatabusFileMetadata
-from utils import archivo_config
+from utils import archivo_config, http_client
 from utils.archivo_exceptions import UnavailableContentException
 
 
@@ -16,7 +15,7 @@ def get_databus_file(file_metadata: DatabusFileMetadata) -> str:
         with open(local_file_path) as old_nt_file:
             return old_nt_file.read()
     else:
-        resp = requests.get(f"{archivo_config.DATABUS_BASE}/{file_metadata}")
+        resp = http_client.get(f"{archivo_config.DATABUS_BASE}/{file_metadata}")
         # this hardcodes the encoding since the old archivo also did that
         # it may be replaced with resp.apparent_encoding
         resp.encoding = "utf-8"
@@ -26,6 +25,38 @@ def get_databus_file(file_metadata: DatabusFileMetadata) -> str:
             return resp.text
 
 
+def get_local_file_path(file_metadata: DatabusFileMetadata) -> Optional[str]:
+    """Returns the path of the file if it is available on disk, else None"""
+
+    local_file_path = Path(f"{archivo_config.LOCAL_PATH}/{file_metadata}")
+
+    if archivo_config.LOCAL_PATH and local_file_path.is_file():
+        return str(local_file_path)
+    return None
+
+
+def download_databus_file(file_metadata: DatabusFileMetadata, target_path: str) -> str:
+    """Returns the path of the file on disk. If it isn't available locally it is streamed to target_path,
+    so the content is never held in memory."""
+
+    local_file_path = get_local_file_path(file_metadata)
+    if local_file_path is not None:
+        return local_file_path
+
+    resp = http_client.get(
+        f"{archivo_config.DATABUS_BASE}/{file_metadata}", stream=True
+    )
+    try:
+        if resp.status_code >= 400:
+            raise UnavailableContentException(resp)
+        with open(target_path, "wb") as target_file:
+            for chunk in resp.iter_content(chunk_size=1024 * 1024):
+                target_file.write(chunk)
+    finally:
+        resp.close()
+    return target_path
+
+
 def get_location_url(file_metadata: DatabusFileMetadata) -> str:
     """Returns the URL of a file, either a file path oder a http URL, based on availability. Files are preferred"""
 
@@ -1,5 +1,6 @@
+import threading
 from io import StringIO
-from typing import Tuple, List, Optional
+from typing import Tuple, List, Optional, Dict, Type
 
 from webservice import db
 from webservice.dbModels import (
@@ -7,14 +8,36 @@ from webservice.dbModels import (
     DevelopOntology,
     Version,
     Ontology,
+    ONTOLOGY_COUNTER,
+    get_change_count,
 )
 from utils import string_tools, validation
+from utils.uri_index import URIIndex
 from querying import query_databus
 from datetime import datetime
 import csv
 from crawling.discovery import ArchivoVersion
 
 
+# cached URI indices per ontology model, with the ontology change count they were built at
+__URI_INDEX_CACHE: Dict[Type[Ontology], Tuple[int, URIIndex]] = {}
+__URI_INDEX_LOCK = threading.Lock()
+
+
+def get_uri_index(model: Type[Ontology] = Ontology) -> URIIndex:
+    """Returns an index of the URIs of all ontologies of the model (all ontologies by default).
+    The index is cached and only rebuilt after ontologies were added or removed, by any process."""
+
+    change_count = get_change_count(ONTOLOGY_COUNTER)
+    with __URI_INDEX_LOCK:
+        cached = __URI_INDEX_CACHE.get(model, None)
+        if cached is not None and cached[0] == change_count:
+            return cached[1]
+        index = URIIndex(ont.uri for ont in db.session.query(model.uri).all())
+        __URI_INDEX_CACHE[model] = (change_count, index)
+        return index
+
+
 def db_objects_from_databus(
     uri: str, source: str, timestamp, dev=""
 ) -> Tuple[Optional[Ontology], Optional[List[Version]]]:
@@ -6,6 +6,8 @@ import requests
 # since pylode is not compatible with rdflib 6.2.0 it will be removed
 import pylode
 
+from utils import http_client
+
 # url for the lode docu service
 lodeServiceUrl = "https://w3id.org/lode/owlapi/"
 
@@ -15,7 +17,7 @@ oopsServiceUrl = " http://oops.linkeddata.es/rest"
 
 def getLodeDocuFile(vocab_uri: str, logger: Logger) -> Tuple[Optional[str], Optional[str]]:
     try:
-        response = requests.get(lodeServiceUrl + vocab_uri)
+        response = http_client.get(lodeServiceUrl + vocab_uri)
         if response.status_code < 400:
             return response.text, None
         else:
@@ -42,7 +44,7 @@ def getOOPSReport(parsedRdfString, logger):
     )
     headers = {"Content-Type": "application/xml"}
     try:
-        response = requests.post(
+        response = http_client.post(
             oopsServiceUrl, data=oopsXml.encode("utf-8"), headers=headers, timeout=30
         )
         if response.status_code < 400:
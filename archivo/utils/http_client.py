@@ -0,0 +1,214 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+
+from utils import archivo_config
+from utils.spooling import SpooledContent
+
+# process-wide counters of the requests sent and new connections opened per host
+_sent_requests: Dict[str, int] = {}
+_opened_connections: Dict[str, int] = {}
+_stats_lock = threading.Lock()
+
+
+def _count_request(host: str) -> None:
+    with _stats_lock:
+        _sent_requests[host] = _sent_requests.get(host, 0) + 1
+
+
+def _count_new_connection(host: str) -> None:
+    with _stats_lock:
+        _opened_connections[host] = _opened_connections.get(host, 0) + 1
+
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _count_new_connection(self.host)
+        return super()._new_conn()
+
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _count_new_connection(self.host)
+        return super()._new_conn()
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter keeping one keep-alive pool per host and counting the connections opened per host"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, *args, **kwargs):
+        # every redirect passes here again, so the request is counted for the host actually contacted
+        _count_request(urlparse(request.url).hostname or "")
+        return super().send(request, *args, **kwargs)
+
+
+class HTTPClient:
+    """Central client for all outbound HTTP requests of Archivo.
+    Reuses connections per host, sets the Archivo User-Agent and a default timeout.
+
+    requests.Session isn't thread-safe, so every thread gets its own session. Only the adapter with the
+    connection pools is shared, urllib3's pools are thread-safe. The sessions don't keep cookies, otherwise
+    cookies of one crawled host would be kept for all later requests of the thread."""
+
+    def __init__(
+        self,
+        pool_connections: int = archivo_config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = archivo_config.HTTP_POOL_MAXSIZE,
+        timeout_seconds: float = archivo_config.HTTP_DEFAULT_TIMEOUT_SECONDS,
+        user_agent: str = archivo_config.ARCHIVO_AGENT,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.user_agent = user_agent
+        self.adapter = CountingHTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        self.__local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """The session of the calling thread"""
+
+        session = getattr(self.__local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = self.user_agent
+            # rejects all cookies set by responses
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self.__local.session = session
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout_seconds)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("allow_redirects", True)
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+
+class SpooledResponse:
+    """A streamed response whose body was spooled to a SpooledContent instead of being held as a string.
+    Offers the attributes of requests.Response that Archivo uses."""
+
+    def __init__(self, response: requests.Response, body: SpooledContent):
+        self.raw_response = response
+        self.body = body
+        self.encoding: Optional[str] = response.encoding
+
+    @property
+    def url(self) -> str:
+        return self.raw_response.url
+
+    @property
+    def status_code(self) -> int:
+        return self.raw_response.status_code
+
+    @property
+    def headers(self):
+        return self.raw_response.headers
+
+    @property
+    def history(self):
+        return self.raw_response.history
+
+    @property
+    def request(self):
+        return self.raw_response.request
+
+    @property
+    def content(self) -> bytes:
+        return self.body.get_bytes()
+
+    @property
+    def text(self) -> str:
+        """The complete body as string. Materializes the whole content, so prefer using body."""
+        return self.body.get_text(self.encoding or "utf-8")
+
+
+# the client shared by all modules of this process
+default_client = HTTPClient()
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return default_client.request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return default_client.get(url, **kwargs)
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    return default_client.head(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return default_client.post(url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return default_client.put(url, **kwargs)
+
+
+def download_to_spool(
+    url: str,
+    max_size: Optional[int] = archivo_config.DOWNLOAD_MAX_SIZE_BYTES,
+    memory_threshold: int = archivo_config.DOWNLOAD_SPOOL_MEMORY_BYTES,
+    **kwargs,
+) -> SpooledResponse:
+    """Performs a streaming GET and spools the body, raising a ContentTooLargeException if it exceeds max_size"""
+
+    response = default_client.get(url, stream=True, **kwargs)
+    try:
+        body = SpooledContent.from_chunks(
+            response.iter_content(chunk_size=64 * 1024),
+            memory_threshold=memory_threshold,
+            max_size=max_size,
+        )
+    finally:
+        # hands the connection back to the pool
+        response.close()
+    return SpooledResponse(response, body)
+
+
+def host_stats() -> Dict[str, Dict[str, int]]:
+    """Returns per host the number of requests sent, the connections opened for them and the number of
+    requests that reused an already open connection"""
+
+    with _stats_lock:
+        sent_requests = dict(_sent_requests)
+        opened_connections = dict(_opened_connections)
+
+    stats = {}
+    for host in set(sent_requests) | set(opened_connections):
+        host_requests = sent_requests.get(host, 0)
+        host_connections = opened_connections.get(host, 0)
+        stats[host] = {
+            "requests": host_requests,
+            "connections": host_connections,
+            "reused": max(host_requests - host_connections, 0),
+        }
+    return stats
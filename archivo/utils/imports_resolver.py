@@ -0,0 +1,267 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from models.databus_identifier import DatabusFileMetadata, DatabusVersionIdentifier
+from utils import archivo_config, string_tools
+from utils.archivoLogs import webservice_logger
+from utils.private_dirs import ensure_private_dir
+
+# Resolves the owl:imports closure of an ontology to the parsed N-Triples files of the latest versions archived in
+# LOCAL_PATH and writes copies of them whose owl:imports point to these copies, so pellet reasons with full imports
+# without any network access. The pellet CLI doesn't read XML catalogs, so the imports are rewritten instead.
+
+OWL_IMPORTS = "http://www.w3.org/2002/07/owl#imports"
+__IMPORTS_PREDICATE = f" <{OWL_IMPORTS}> ".encode("utf-8")
+
+
+@dataclass
+class ImportsClosure:
+    # import IRI -> local N-Triples file of its latest archived version
+    files: Dict[str, str] = field(default_factory=dict)
+    # imports without an archived version, they are still resolved by pellet over the network
+    unresolved: List[str] = field(default_factory=list)
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.unresolved
+
+    @property
+    def digest(self) -> str:
+        """Identifies the closure: changes with every newly archived version of an imported ontology"""
+        entries = [f"{iri}\t{path}" for iri, path in sorted(self.files.items())]
+        entries += [f"{iri}\t" for iri in sorted(self.unresolved)]
+        return hashlib.sha256("\n".join(entries).encode("utf-8")).hexdigest()
+
+
+def read_imports(ntriples_path: str) -> List[str]:
+    """Returns the sorted objects of the owl:imports triples of the N-Triples file"""
+
+    imports = set()
+    with open(ntriples_path, "rb") as nt_file:
+        for line in nt_file:
+            if __IMPORTS_PREDICATE not in line:
+                continue
+            obj = line.split(__IMPORTS_PREDICATE, 1)[1].strip().rstrip(b".").strip()
+            if obj.startswith(b"<") and obj.endswith(b">"):
+                imports.add(obj[1:-1].decode("utf-8"))
+    return sorted(imports)
+
+
+def rewrite_imports(
+    source_path: str, target_path: str, locations: Dict[str, str]
+) -> None:
+    """Copies the N-Triples file, replacing the objects of owl:imports triples found in locations"""
+
+    replacements = {
+        f"<{iri}>".encode("utf-8"): f"<{location}>".encode("utf-8")
+        for iri, location in locations.items()
+    }
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        for line in source:
+            if __IMPORTS_PREDICATE in line:
+                subject_predicate, obj = line.split(__IMPORTS_PREDICATE, 1)
+                obj_term = obj.strip().rstrip(b".").strip()
+                if obj_term in replacements:
+                    line = (
+                        subject_predicate
+                        + __IMPORTS_PREDICATE
+                        + replacements[obj_term]
+                        + b" .\n"
+                    )
+            target.write(line)
+
+
+class ImportsResolver:
+    """Resolves imports against the archived files in local_path. Rewritten closures are kept in cache_dir,
+    one directory per closure digest and at most max_entries of them. Closures in use by this process or used
+    less than min_age_seconds ago (e.g. by another process) are never removed. Pellet trusts the closures, so
+    cache_dir must only be accessible by the user running Archivo."""
+
+    def __init__(
+        self,
+        local_path: str = archivo_config.LOCAL_PATH,
+        cache_dir: str = archivo_config.IMPORTS_CLOSURE_DIR,
+        max_entries: int = archivo_config.IMPORTS_CLOSURE_MAX_ENTRIES,
+        max_depth: int = archivo_config.IMPORTS_CLOSURE_MAX_DEPTH,
+        min_age_seconds: int = archivo_config.IMPORTS_CLOSURE_MIN_AGE_SECONDS,
+    ):
+        self.local_path = local_path
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_depth = max_depth
+        self.min_age_seconds = min_age_seconds
+        self.__lock = threading.Lock()
+        # whether the cache directory is private, checked on first use
+        self.__is_private: Optional[bool] = None
+        # closure directory -> number of runs of this process using it
+        self.__users: Dict[str, int] = {}
+        # archived files never change, so their imports are only read once
+        self.__imports_of_file: Dict[str, List[str]] = {}
+
+    def is_available(self) -> bool:
+        """Whether closures can be materialized, i.e. the cache directory is private"""
+
+        with self.__lock:
+            if self.__is_private is None:
+                try:
+                    ensure_private_dir(self.cache_dir)
+                    self.__is_private = True
+                except OSError as e:
+                    webservice_logger.error(
+                        f"Imports aren't resolved locally, {self.cache_dir} is unusable: {e}"
+                    )
+                    self.__is_private = False
+            return self.__is_private
+
+    def get_latest_file(self, iri: str) -> Optional[str]:
+        """Returns the parsed N-Triples file of the latest archived version of the ontology, if available locally"""
+
+        if not self.local_path:
+            return None
+        group, artifact = string_tools.generate_databus_identifier_from_uri(iri)
+        if group is None:
+            return None
+        artifact_dir = Path(
+            self.local_path, archivo_config.DATABUS_USER, group, artifact
+        )
+        try:
+            # versions are timestamps like 2020.06.10-175249, so they sort by name
+            versions = sorted(os.listdir(artifact_dir), reverse=True)
+        except OSError:
+            return None
+
+        for version in versions:
+            metadata = DatabusFileMetadata(
+                version_identifier=DatabusVersionIdentifier(
+                    archivo_config.DATABUS_USER, group, artifact, version
+                ),
+                content_variants={"type": "parsed"},
+                file_extension="nt",
+                compression=None,
+                sha_256_sum="",
+                content_length=-1,
+            )
+            path = Path(self.local_path, str(metadata))
+            if path.is_file():
+                return str(path)
+        return None
+
+    def __get_imports_of_file(self, path: str) -> List[str]:
+        with self.__lock:
+            imports = self.__imports_of_file.get(path, None)
+        if imports is None:
+            imports = read_imports(path)
+            with self.__lock:
+                self.__imports_of_file[path] = imports
+        return imports
+
+    def build_closure(self, imports: List[str]) -> ImportsClosure:
+        """Resolves the imports and, transitively, the imports of the imported ontologies"""
+
+        closure = ImportsClosure()
+        frontier = list(imports)
+        seen = set(frontier)
+        for _ in range(self.max_depth):
+            if not frontier:
+                break
+            next_frontier = []
+            for iri in frontier:
+                path = self.get_latest_file(iri)
+                if path is None:
+                    closure.unresolved.append(iri)
+                    continue
+                closure.files[iri] = path
+                for imported_iri in self.__get_imports_of_file(path):
+                    if imported_iri not in seen:
+                        seen.add(imported_iri)
+                        next_frontier.append(imported_iri)
+            frontier = next_frontier
+        # imports deeper than max_depth are left to pellet
+        closure.unresolved += frontier
+        return closure
+
+    @contextmanager
+    def materialize(self, ntriples_path: str, closure: ImportsClosure) -> Iterator[str]:
+        """Writes the ontology and its closure with rewritten imports to the cache and yields the path of the
+        rewritten ontology, which is removed afterwards. The directory of the same closure is reused.
+        Raises PermissionError if the cache directory isn't private (see is_available)."""
+
+        ensure_private_dir(self.cache_dir)
+
+        closure_dir = os.path.join(self.cache_dir, closure.digest)
+        locations = {
+            iri: Path(
+                closure_dir, hashlib.sha256(path.encode("utf-8")).hexdigest() + ".nt"
+            ).as_uri()
+            for iri, path in closure.files.items()
+        }
+
+        # registered before the directory is checked, so a concurrent prune never removes it while it is used
+        with self.__lock:
+            self.__users[closure_dir] = self.__users.get(closure_dir, 0) + 1
+        try:
+            if not os.path.isdir(closure_dir):
+                # written to a temporary directory first, so concurrent runs never see half of a closure
+                tmp_dir = tempfile.mkdtemp(dir=self.cache_dir)
+                try:
+                    for iri, path in closure.files.items():
+                        target = os.path.join(tmp_dir, os.path.basename(locations[iri]))
+                        if not os.path.isfile(target):
+                            rewrite_imports(path, target, locations)
+                    os.rename(tmp_dir, closure_dir)
+                except OSError:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    if not os.path.isdir(closure_dir):
+                        raise
+                self.__prune()
+            else:
+                # marks the closure as recently used for pruning
+                os.utime(closure_dir)
+
+            # the ontology itself is written per run, its content differs between versions
+            fd, root_path = tempfile.mkstemp(suffix=".nt", dir=closure_dir)
+            os.close(fd)
+            try:
+                rewrite_imports(ntriples_path, root_path, locations)
+                yield root_path
+            finally:
+                os.remove(root_path)
+        finally:
+            with self.__lock:
+                self.__users[closure_dir] -= 1
+                if self.__users[closure_dir] == 0:
+                    del self.__users[closure_dir]
+
+    def __prune(self) -> None:
+        try:
+            entries = [
+                os.path.join(self.cache_dir, name)
+                for name in os.listdir(self.cache_dir)
+                if len(name) == 64
+            ]
+            entries.sort(key=os.path.getmtime)
+        except OSError:
+            return
+        min_age_limit = time.time() - self.min_age_seconds
+        with self.__lock:
+            for entry in entries[: max(0, len(entries) - self.max_entries)]:
+                try:
+                    # creating and removing the root file of a run updates the modification time as well
+                    if entry in self.__users or os.path.getmtime(entry) > min_age_limit:
+                        continue
+                except OSError:
+                    continue
+                webservice_logger.debug(f"Removing imports closure {entry}")
+                shutil.rmtree(entry, ignore_errors=True)
+
+
+# the resolver of the archive in LOCAL_PATH
+imports_resolver = ImportsResolver()
@@ -0,0 +1,316 @@
+import atexit
+import os
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from utils import archivo_config, string_tools
+from utils.archivoLogs import webservice_logger
+from utils.process_scheduler import process_scheduler, ResourceUsage
+
+# Runs the Java tools in long-lived JVMs (helpingBinaries/src/ArchivoJvmWorker.java) instead of starting a new
+# JVM per call. The worker class is compiled on first use into a new private directory of the process, if that or
+# a worker fails the tool is started in a new JVM as before.
+
+# stdout, stderr, exit code
+ToolResult = Tuple[str, str, int]
+
+
+def __escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def encode_job_header(
+    classpath: List[str], main_class: Optional[str], args: List[str]
+) -> bytes:
+    fields = [os.pathsep.join(classpath), main_class or "-"] + args
+    return ("\t".join(__escape(field) for field in fields) + "\n").encode("utf-8")
+
+
+class JvmWorkerError(Exception):
+    pass
+
+
+class JvmWorker:
+    """One worker JVM, running one job at a time"""
+
+    def __init__(self, class_dir: str, java_options: List[str]):
+        self.process = subprocess.Popen(
+            ["java", *java_options, "-cp", class_dir, "ArchivoJvmWorker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+        )
+        self.job_count = 0
+        self.__buffer = bytearray()
+
+    def __fill_buffer(self, deadline: Optional[float]) -> None:
+        timeout = None if deadline is None else deadline - time.monotonic()
+        if timeout is not None and timeout <= 0:
+            raise subprocess.TimeoutExpired(self.process.args, timeout)
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            raise subprocess.TimeoutExpired(self.process.args, timeout)
+        chunk = os.read(self.process.stdout.fileno(), 1024 * 1024)
+        if not chunk:
+            raise JvmWorkerError(f"JVM worker exited with {self.process.poll()}")
+        self.__buffer += chunk
+
+    def __read_line(self, deadline: Optional[float]) -> bytes:
+        while b"\n" not in self.__buffer:
+            self.__fill_buffer(deadline)
+        line, _, rest = bytes(self.__buffer).partition(b"\n")
+        self.__buffer = bytearray(rest)
+        return line
+
+    def __read_exactly(self, size: int, deadline: Optional[float]) -> bytes:
+        while len(self.__buffer) < size:
+            self.__fill_buffer(deadline)
+        data = bytes(self.__buffer[:size])
+        del self.__buffer[:size]
+        return data
+
+    def run(
+        self,
+        classpath: List[str],
+        main_class: Optional[str],
+        args: List[str],
+        stdin_data: bytes = b"",
+        stdin_path: Optional[str] = None,
+        timeout: Optional[int] = None,
+    ) -> ToolResult:
+        """Runs the main class in the worker. Raises subprocess.TimeoutExpired on timeouts and JvmWorkerError if
+        the worker died, in both cases the worker can't be used anymore."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.job_count += 1
+        try:
+            request = encode_job_header(classpath, main_class, args)
+            if stdin_path is not None:
+                request += f"@{stdin_path}\n".encode("utf-8")
+            else:
+                request += f"{len(stdin_data)}\n".encode("utf-8") + stdin_data
+            self.process.stdin.write(request)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise JvmWorkerError(str(e))
+
+        exit_code, stdout_length, stderr_length = (
+            int(field) for field in self.__read_line(deadline).split()
+        )
+        stdout = self.__read_exactly(stdout_length, deadline)
+        stderr = self.__read_exactly(stderr_length, deadline)
+        return (
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+            exit_code,
+        )
+
+    def get_rss_bytes(self) -> Optional[int]:
+        """Resident memory of the worker, None where /proc is not available"""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as status_file:
+                for line in status_file:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def stop(self) -> None:
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+            self.process.wait()
+
+
+class JvmWorkerPool:
+    """Hands out up to worker_count worker JVMs to the calling threads. Workers are replaced after max_jobs jobs
+    or once they use more than max_rss_bytes, since the tools keep static state and caches between jobs."""
+
+    def __init__(
+        self,
+        enabled: bool = archivo_config.JVM_WORKER_ENABLED,
+        worker_count: int = archivo_config.JVM_WORKER_COUNT,
+        max_jobs: int = archivo_config.JVM_WORKER_MAX_JOBS,
+        max_rss_bytes: int = archivo_config.JVM_WORKER_MAX_RSS_BYTES,
+        java_options: List[str] = archivo_config.JVM_WORKER_OPTIONS,
+    ):
+        self.enabled = enabled
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        self.java_options = java_options
+        # the directory of the compiled worker class and the process that created it
+        self.class_dir: Optional[str] = None
+        self.__class_dir_pid: Optional[int] = None
+
+        self.__slots = threading.BoundedSemaphore(worker_count)
+        self.__idle_workers: List[JvmWorker] = []
+        self.__lock = threading.Lock()
+        self.__compiled: Optional[bool] = None
+        self.__stats = {"jobs": 0, "fallbacks": 0, "recycled": 0}
+
+    def __ensure_compiled(self) -> bool:
+        """Compiles the worker class once per process, returns False if that fails"""
+
+        with self.__lock:
+            if self.__compiled is not None:
+                return self.__compiled
+
+            source_path = os.path.join(
+                string_tools.get_local_directory(),
+                "helpingBinaries",
+                "src",
+                "ArchivoJvmWorker.java",
+            )
+            try:
+                # never a shared directory: a class file replaced by another user would run as every java tool
+                self.class_dir = tempfile.mkdtemp(prefix="archivo-jvm-worker-")
+                self.__class_dir_pid = os.getpid()
+                subprocess.run(
+                    ["javac", "-d", self.class_dir, source_path],
+                    check=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+                self.__compiled = True
+            except Exception:
+                webservice_logger.exception(
+                    "Couldn't compile the JVM worker, running every tool in a new JVM"
+                )
+                self.__compiled = False
+            return self.__compiled
+
+    def __take_worker(self) -> JvmWorker:
+        with self.__lock:
+            while self.__idle_workers:
+                worker = self.__idle_workers.pop()
+                if worker.is_alive():
+                    return worker
+        return JvmWorker(self.class_dir, self.java_options)
+
+    def __return_worker(self, worker: JvmWorker) -> None:
+        rss_bytes = worker.get_rss_bytes()
+        if worker.job_count >= self.max_jobs or (
+            rss_bytes is not None and rss_bytes > self.max_rss_bytes
+        ):
+            self.__count_stat("recycled")
+            worker.stop()
+            return
+        with self.__lock:
+            self.__idle_workers.append(worker)
+
+    def __count_stat(self, key: str) -> None:
+        with self.__lock:
+            self.__stats[key] += 1
+
+    def run_tool(
+        self,
+        tool: str,
+        classpath: List[str],
+        main_class: Optional[str],
+        args: List[str],
+        fallback_command: List[str],
+        stdin_data: bytes = b"",
+        stdin_path: Optional[str] = None,
+        timeout: Optional[int] = None,
+        cost: int = 0,
+    ) -> ToolResult:
+        """Runs the main class (None: the Main-Class of the first jar) with the arguments in a worker JVM, or
+        the fallback command in a new process if no worker is available. Both are scheduled as job of the tool
+        by the process scheduler. Raises subprocess.TimeoutExpired."""
+
+        if self.enabled and self.__ensure_compiled():
+            enqueued = time.monotonic()
+            # a scheduler slot is only taken once a worker is free, else waiting jobs would block rapper and sort
+            with self.__slots, process_scheduler.reserve(tool, cost):
+                queue_seconds = time.monotonic() - enqueued
+                worker = None
+                start = time.monotonic()
+                try:
+                    worker = self.__take_worker()
+                    result = worker.run(
+                        classpath, main_class, args, stdin_data, stdin_path, timeout
+                    )
+                except subprocess.TimeoutExpired:
+                    # the job is still running in the worker, so it is dropped
+                    worker.process.kill()
+                    worker.process.wait()
+                    raise
+                except Exception:
+                    webservice_logger.exception(
+                        "JVM worker failed, running the tool in a new JVM"
+                    )
+                    if worker is not None:
+                        worker.process.kill()
+                        worker.process.wait()
+                else:
+                    self.__count_stat("jobs")
+                    # CPU time and memory are only known for the whole worker JVM
+                    process_scheduler.record_usage(
+                        tool,
+                        ResourceUsage(
+                            queue_seconds=queue_seconds,
+                            wall_seconds=time.monotonic() - start,
+                        ),
+                        result[2],
+                    )
+                    self.__return_worker(worker)
+                    return result
+
+        self.__count_stat("fallbacks")
+        return self.__run_subprocess(
+            tool, fallback_command, stdin_data, stdin_path, timeout, cost
+        )
+
+    @staticmethod
+    def __run_subprocess(
+        tool: str,
+        command: List[str],
+        stdin_data: bytes,
+        stdin_path: Optional[str],
+        timeout: Optional[int],
+        cost: int,
+    ) -> ToolResult:
+        if stdin_path is not None:
+            with open(stdin_path, "rb") as stdin_file:
+                process = process_scheduler.run(
+                    tool, command, cost=cost, stdin=stdin_file, timeout=timeout
+                )
+        else:
+            process = process_scheduler.run(
+                tool, command, cost=cost, input=stdin_data, timeout=timeout
+            )
+        return (
+            process.stdout.decode("utf-8"),
+            process.stderr.decode("utf-8"),
+            process.returncode,
+        )
+
+    def stats(self):
+        with self.__lock:
+            return dict(self.__stats)
+
+    def shutdown(self) -> None:
+        with self.__lock:
+            workers, self.__idle_workers = self.__idle_workers, []
+        for worker in workers:
+            worker.stop()
+        # forked processes (e.g. the gunicorn workers) inherit the directory but must not remove it
+        if self.class_dir is not None and self.__class_dir_pid == os.getpid():
+            shutil.rmtree(self.class_dir, ignore_errors=True)
+
+
+# the pool shared by all test suites of this process
+jvm_workers = JvmWorkerPool()
+atexit.register(jvm_workers.shutdown)
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from utils import archivo_config
+from utils.archivoLogs import webservice_logger
+from utils.private_dirs import ensure_private_dir
+
+# marker for cache misses, since None may be a cached value
+MISS = object()
+
+
+class ParseCache:
+    """Content-addressed on-disk cache of parsing results, keyed by the SHA-256 of the input and the parameters
+    of the parsing. Values must be JSON serializable (tuples are returned as lists) and are written to one JSON
+    file each, the least recently used ones are evicted once the cache grows beyond max_bytes. The directory may
+    be shared by several processes of the same user, the cache is disabled if it is accessible by other users."""
+
+    def __init__(
+        self,
+        directory: str = archivo_config.PARSE_CACHE_DIR,
+        max_bytes: int = archivo_config.PARSE_CACHE_MAX_BYTES,
+        min_input_bytes: int = archivo_config.PARSE_CACHE_MIN_INPUT_BYTES,
+        enabled: bool = archivo_config.PARSE_CACHE_ENABLED,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_input_bytes = min_input_bytes
+        self.enabled = enabled
+
+        self.__lock = threading.Lock()
+        # whether the directory is private, checked on first use
+        self.__is_private: Optional[bool] = None
+        self.__stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "evictions": 0}
+        # estimate of the cache size, the directory is only scanned if it exceeds max_bytes
+        self.__size_estimate: Optional[int] = None
+
+    @staticmethod
+    def build_key(input_sha_256: str, *parameters: str) -> str:
+        return hashlib.sha256(
+            "\n".join([input_sha_256, *parameters]).encode("utf-8")
+        ).hexdigest()
+
+    def is_applicable(self, input_length: int) -> bool:
+        """Small inputs are parsed faster than they are read from disk"""
+        return self.enabled and input_length >= self.min_input_bytes
+
+    def __check_directory(self) -> bool:
+        with self.__lock:
+            if self.__is_private is None:
+                try:
+                    ensure_private_dir(self.directory)
+                    self.__is_private = True
+                except OSError as e:
+                    webservice_logger.error(f"Cache in {self.directory} disabled: {e}")
+                    self.__is_private = False
+            return self.__is_private
+
+    def __get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def __count_stat(self, key: str, value: int = 1) -> None:
+        with self.__lock:
+            self.__stats[key] += value
+
+    def get(self, key: str, input_length: int) -> Any:
+        """Returns the cached value or MISS"""
+
+        if not self.__check_directory():
+            return MISS
+        path = self.__get_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as cache_file:
+                value = json.load(cache_file)
+            # the modification time is the LRU order
+            os.utime(path)
+        except FileNotFoundError:
+            self.__count_stat("misses")
+            return MISS
+        except Exception:
+            # broken entry, e.g. written by an incompatible version
+            self.__remove(path)
+            self.__count_stat("misses")
+            return MISS
+
+        self.__count_stat("hits")
+        self.__count_stat("bytes_saved", input_length)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        if not self.__check_directory():
+            return
+        path = self.__get_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            # write to a temporary file first, so other processes never read a partial entry
+            file_descriptor, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), suffix=".tmp"
+            )
+        except Exception:
+            return
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as cache_file:
+                json.dump(value, cache_file, ensure_ascii=False)
+            entry_size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            # e.g. a full disk or a value that isn't JSON serializable, the partial file would never be evicted
+            self.__remove(tmp_path)
+            return
+
+        with self.__lock:
+            if self.__size_estimate is None:
+                self.__size_estimate = self.__scan_size()
+            else:
+                self.__size_estimate += entry_size
+            if self.__size_estimate > self.max_bytes:
+                self.__evict()
+
+    def __scan_entries(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if not file_name.endswith(".json"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def __scan_size(self) -> int:
+        return sum(size for _, size, _ in self.__scan_entries())
+
+    def __evict(self) -> None:
+        """Removes the least recently used entries until the cache is below 90% of max_bytes"""
+
+        entries = sorted(self.__scan_entries())
+        total_size = sum(size for _, size, _ in entries)
+        target_size = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total_size <= target_size:
+                break
+            if self.__remove(path):
+                self.__stats["evictions"] += 1
+            total_size -= size
+        self.__size_estimate = total_size
+
+    @staticmethod
+    def __remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self) -> Dict[str, float]:
+        with self.__lock:
+            stats: Dict[str, float] = dict(self.__stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups > 0 else 0.0
+        return stats
+
+
+# the cache of the parsing service of this process
+parse_cache = ParseCache()
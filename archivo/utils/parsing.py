@@ -1,7 +1,10 @@
+import os
 import re
-from utils import string_tools
 import subprocess
-from typing import Tuple, List
+import time
+from contextlib import contextmanager
+from utils import string_tools, parsing_service
+from typing import Tuple, List, Union, Dict, Iterator, Optional
 from dataclasses import dataclass
 
 from models.content_negotiation import (
@@ -14,11 +17,21 @@ from models.databus_identifier import (
     DatabusFileMetadata,
     DatabusVersionIdentifier,
 )
+from utils.process_scheduler import process_scheduler, build_usage
+from utils.spooling import SpooledContent
+
+# RDF content can be given as string, as (utf-8) bytes or as spooled download
+RDFInput = Union[str, bytes, SpooledContent]
 
 rapperErrorsRegex = re.compile(r"^rapper: Error.*$")
 rapperWarningsRegex = re.compile(r"^rapper: Warning.*$")
 rapperTriplesRegex = re.compile(r"rapper: Parsing returned (\d+) triples")
 
+turtlePrefixRegex = re.compile(
+    r"^\s*(?:@prefix|PREFIX)\s+([A-Za-z][\w.-]*)?:\s*<([^>]*)>", re.MULTILINE
+)
+xmlNamespaceRegex = re.compile(r"xmlns:([A-Za-z_][\w.-]*)\s*=\s*[\"']([^\"']*)[\"']")
+
 profileCheckerRegex = re.compile(r"(OWL2_DL|OWL2_QL|OWL2_EL|OWL2_RL|OWL2_FULL): OK")
 pelletInfoProfileRegex = re.compile(r"OWL Profile = (.*)\n")
 
@@ -59,15 +72,96 @@ def triple_number_from_rapper_log(rapper_log: str) -> int:
         return 0
 
 
+@contextmanager
+def rapper_stdin(rdf_input: RDFInput) -> Iterator[Dict]:
+    """Yields the keyword arguments for subprocess.run feeding the content to stdin.
+    Spooled content on disk is passed as file handle, so it is never loaded into memory."""
+
+    if isinstance(rdf_input, str):
+        yield {"input": bytes(rdf_input, "utf-8")}
+    elif isinstance(rdf_input, bytes):
+        yield {"input": rdf_input}
+    elif rdf_input.is_in_memory:
+        yield {"input": rdf_input.get_bytes()}
+    else:
+        with rdf_input.open() as rdf_file:
+            yield {"stdin": rdf_file}
+
+
+def get_input_size(rdf_input: RDFInput) -> int:
+    """Size of the content in bytes (characters for strings), used as cost estimate of the rapper job"""
+
+    if isinstance(rdf_input, SpooledContent):
+        return rdf_input.content_length
+    return len(rdf_input)
+
+
+def parsing_info_from_rapper_log(rapper_log: str) -> RapperParsingInfo:
+    triples = triple_number_from_rapper_log(rapper_log)
+    errors, warnings = parse_rapper_errors(rapper_log)
+    return RapperParsingInfo(triple_number=triples, warnings=warnings, errors=errors)
+
+
 def parse_rdf_from_string(
-    rdf_string: str,
+    rdf_string: RDFInput,
     base_uri: str,
     input_type: RDF_Type,
     output_type: RDF_Type = RDF_Type.N_TRIPLES,
+    allow_inprocess: bool = False,
 ) -> RapperParsingResult:
-    """Parses RDF content in string with Raptor RDF"""
+    """Parses RDF content in string with Raptor RDF. If allow_inprocess is set, small documents may be
+    serialized by the rdflib worker pool instead, only use it if the output is not published."""
 
-    command = [
+    return parsing_service.default_service.parse(
+        rdf_string,
+        base_uri,
+        input_type,
+        output_type,
+        allow_inprocess=allow_inprocess,
+    )
+
+
+def get_triples_from_rdf_string(
+    rdf_string: RDFInput, base_uri: str, input_type: RDF_Type
+) -> RapperParsingInfo:
+    """Counts triples of an rdf string without generating any output.
+    Returns triple number and a list of errors (rapper warnings are ignored)"""
+
+    return parsing_service.default_service.count(rdf_string, base_uri, input_type)
+
+
+def sniff_namespaces(content_start: str) -> Dict[str, str]:
+    """Returns the prefixes declared in the beginning of a Turtle or RDF/XML document"""
+
+    namespaces = {}
+    for regex in [turtlePrefixRegex, xmlNamespaceRegex]:
+        for prefix, namespace in regex.findall(content_start):
+            if prefix and prefix not in namespaces:
+                namespaces[prefix] = namespace
+    return namespaces
+
+
+def check_rapper_exit(
+    returncode: int, parsing_info: RapperParsingInfo, command: List[str]
+) -> None:
+    """Raises if rapper didn't finish its output. rapper exits with 1 on syntax errors too, those are reported
+    in the parsing info and the output is complete, so only exits without any error message count."""
+
+    if returncode < 0 or (returncode == 1 and not parsing_info.errors):
+        raise subprocess.CalledProcessError(returncode, command)
+
+
+def parse_to_sorted_ntriples_file(
+    rdf_input: RDFInput,
+    base_uri: str,
+    input_type: RDF_Type,
+    target_path: str,
+    tmp_dir: Optional[str] = None,
+) -> RapperParsingInfo:
+    """Parses the content with rapper into an N-Triples file, sorted in byte order and without duplicates.
+    The output goes directly from rapper through sort to the file and is never held in memory."""
+
+    rapper_command = [
         "rapper",
         "-I",
         base_uri,
@@ -75,39 +169,104 @@ def parse_rdf_from_string(
         get_rapper_name(input_type),
         "-",
         "-o",
-        get_rapper_name(output_type),
+        "ntriples",
     ]
+    sort_command = ["sort", "-u"]
+    if tmp_dir is not None:
+        sort_command += ["-T", tmp_dir]
 
-    process = subprocess.run(
-        command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        input=bytes(rdf_string, "utf-8"),
-    )
-    triples = triple_number_from_rapper_log(process.stderr.decode("utf-8"))
-    errors, warnings = parse_rapper_errors(process.stderr.decode("utf-8"))
-    return RapperParsingResult(
-        process.stdout.decode("utf-8"),
-        output_type,
-        RapperParsingInfo(triple_number=triples, warnings=warnings, errors=errors),
-    )
+    with rapper_stdin(rdf_input) as stdin_kwargs, open(
+        target_path, "wb"
+    ) as target, process_scheduler.reserve(
+        "rapper", get_input_size(rdf_input)
+    ) as queue_seconds:
+        input_data = stdin_kwargs.get("input", None)
+        start = time.monotonic()
+        rapper_process = process_scheduler.popen(
+            "rapper",
+            rapper_command,
+            stdin=stdin_kwargs.get("stdin", subprocess.PIPE),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        sort_process = process_scheduler.popen(
+            "sort",
+            sort_command,
+            stdin=rapper_process.stdout,
+            stdout=target,
+            env={**os.environ, "LC_ALL": "C"},
+        )
+        # only sort reads the output, so rapper gets a SIGPIPE if sort dies
+        rapper_process.stdout.close()
+        _, rapper_log = rapper_process.communicate(input=input_data)
+        sort_process.wait()
+        # both run in the slot of the rapper job
+        process_scheduler.record_usage(
+            "rapper",
+            build_usage(rapper_process, queue_seconds, start),
+            rapper_process.returncode,
+        )
+        process_scheduler.record_usage(
+            "sort", build_usage(sort_process, 0.0, start), sort_process.returncode
+        )
 
+    if sort_process.returncode != 0:
+        # e.g. killed by its rlimits or a full disk, the file is truncated
+        raise subprocess.CalledProcessError(sort_process.returncode, sort_command)
+    parsing_info = parsing_info_from_rapper_log(rapper_log.decode("utf-8"))
+    check_rapper_exit(rapper_process.returncode, parsing_info, rapper_command)
+    return parsing_info
 
-def get_triples_from_rdf_string(
-    rdf_string: str, base_uri: str, input_type: RDF_Type
+
+def serialize_ntriples_file(
+    ntriples_path: str,
+    base_uri: str,
+    output_type: RDF_Type,
+    target_path: str,
+    namespaces: Optional[Dict[str, str]] = None,
 ) -> RapperParsingInfo:
-    """Counts triples of an rdf string. Returns triple number and a list of errors (rapper warnings are ignored)"""
-    command = ["rapper", "-I", base_uri, "-i", get_rapper_name(input_type), "-"]
-
-    process = subprocess.run(
-        command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        input=bytes(rdf_string, "utf-8"),
+    """Serializes an N-Triples file with rapper into another format, using the given namespace prefixes"""
+
+    command = [
+        "rapper",
+        "-I",
+        base_uri,
+        "-i",
+        "ntriples",
+        "-o",
+        get_rapper_name(output_type),
+    ]
+    for prefix, namespace in (namespaces or {}).items():
+        command += ["-f", f'xmlns:{prefix}="{namespace}"']
+    command.append(ntriples_path)
+
+    with open(target_path, "wb") as target:
+        process = process_scheduler.run(
+            "rapper",
+            command,
+            cost=os.path.getsize(ntriples_path),
+            stdout=target,
+            stderr=subprocess.PIPE,
+        )
+    parsing_info = parsing_info_from_rapper_log(process.stderr.decode("utf-8"))
+    check_rapper_exit(process.returncode, parsing_info, command)
+    return parsing_info
+
+
+def generate_metadata_for_parsed_file(
+    db_version_identifier: DatabusVersionIdentifier,
+    rdf_type: RDF_Type,
+    content: SpooledContent,
+) -> DatabusFileMetadata:
+
+    return DatabusFileMetadata(
+        version_identifier=db_version_identifier,
+        content_variants={"type": "parsed"},
+        file_extension=get_file_extension(rdf_type),
+        sha_256_sum=content.sha_256_sum,
+        content_length=content.content_length,
+        compression=None,
     )
-    triples = triple_number_from_rapper_log(process.stderr.decode("utf-8"))
-    errors, warnings = parse_rapper_errors(process.stderr.decode("utf-8"))
-    return RapperParsingInfo(triples, warnings, errors)
 
 
 def generate_metadata_for_parsing_result(
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import dataclasses
+import multiprocessing
+import subprocess
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import rdflib
+
+from models.content_negotiation import RDF_Type, get_rapper_name, get_rdflib_string
+from utils import archivo_config, parsing, string_tools
+from utils.parse_cache import ParseCache, parse_cache, MISS
+from utils.process_scheduler import process_scheduler
+from utils.spooling import SpooledContent
+
+
+class RapperBackend:
+    """Parses RDF with a new rapper subprocess per document"""
+
+    def parse(
+        self,
+        rdf_input: parsing.RDFInput,
+        base_uri: str,
+        input_type: RDF_Type,
+        output_type: RDF_Type,
+    ) -> parsing.RapperParsingResult:
+        command = [
+            "rapper",
+            "-I",
+            base_uri,
+            "-i",
+            get_rapper_name(input_type),
+            "-",
+            "-o",
+            get_rapper_name(output_type),
+        ]
+
+        with parsing.rapper_stdin(rdf_input) as stdin_kwargs:
+            process = process_scheduler.run(
+                "rapper",
+                command,
+                cost=parsing.get_input_size(rdf_input),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                **stdin_kwargs,
+            )
+        return parsing.RapperParsingResult(
+            process.stdout.decode("utf-8"),
+            output_type,
+            parsing.parsing_info_from_rapper_log(process.stderr.decode("utf-8")),
+        )
+
+    def count(
+        self, rdf_input: parsing.RDFInput, base_uri: str, input_type: RDF_Type
+    ) -> parsing.RapperParsingInfo:
+        """Only counts the triples (rapper -c), no serialization is generated"""
+        command = [
+            "rapper",
+            "-c",
+            "-I",
+            base_uri,
+            "-i",
+            get_rapper_name(input_type),
+            "-",
+        ]
+
+        with parsing.rapper_stdin(rdf_input) as stdin_kwargs:
+            process = process_scheduler.run(
+                "rapper",
+                command,
+                cost=parsing.get_input_size(rdf_input),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                **stdin_kwargs,
+            )
+        return parsing.parsing_info_from_rapper_log(process.stderr.decode("utf-8"))
+
+
+def to_cache_value(
+    result: Union[parsing.RapperParsingResult, parsing.RapperParsingInfo]
+) -> Dict[str, Any]:
+    """The JSON representation of a result in the parse cache"""
+
+    if isinstance(result, parsing.RapperParsingInfo):
+        return {"parsing_info": dataclasses.asdict(result)}
+    return {
+        "parsed_rdf": result.parsed_rdf,
+        "rdf_type": result.rdf_type.name,
+        "parsing_info": dataclasses.asdict(result.parsing_info),
+    }
+
+
+def from_cache_value(
+    value: Dict[str, Any]
+) -> Union[parsing.RapperParsingResult, parsing.RapperParsingInfo]:
+    parsing_info = parsing.RapperParsingInfo(**value["parsing_info"])
+    if "parsed_rdf" not in value:
+        return parsing_info
+    return parsing.RapperParsingResult(
+        value["parsed_rdf"], RDF_Type[value["rdf_type"]], parsing_info
+    )
+
+
+# rdflib serializer names, rdflib parses turtle with its n3 parser (see get_rdflib_string)
+__RDFLIB_SERIALIZERS: Dict[RDF_Type, str] = {
+    RDF_Type.RDF_XML: "xml",
+    RDF_Type.TURTLE: "turtle",
+    RDF_Type.N_TRIPLES: "nt",
+}
+
+
+def get_rdflib_serializer(rdf_type: RDF_Type) -> str:
+    return __RDFLIB_SERIALIZERS[rdf_type]
+
+
+def rdflib_worker_parse(
+    data: bytes, base_uri: str, input_format: str, output_format: Optional[str]
+) -> Tuple[int, Optional[str]]:
+    """Runs in the worker processes: parses the document and returns the triple number and the serialization
+    (None if no output format is given). Parsing errors are raised."""
+
+    graph = rdflib.Graph()
+    graph.parse(data=data, format=input_format, publicID=base_uri)
+    if output_format is None:
+        return len(graph), None
+    return len(graph), graph.serialize(format=output_format)
+
+
+class RDFLibWorkerPool:
+    """Parses RDF with rdflib in a pool of long-lived worker processes, avoiding a process spawn per document.
+    The workers are replaced after max_tasks_per_worker documents (Python >= 3.11) to limit memory growth."""
+
+    def __init__(
+        self, worker_count: int, max_tasks_per_worker: int, timeout_seconds: int
+    ):
+        self.worker_count = worker_count
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.timeout_seconds = timeout_seconds
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__lock = threading.Lock()
+
+    def __get_executor(self) -> ProcessPoolExecutor:
+        with self.__lock:
+            if self.__executor is None:
+                # spawned workers don't inherit locks held by the threads of the webservice
+                kwargs = {"mp_context": multiprocessing.get_context("spawn")}
+                if sys.version_info >= (3, 11):
+                    kwargs["max_tasks_per_child"] = self.max_tasks_per_worker
+                self.__executor = ProcessPoolExecutor(
+                    max_workers=self.worker_count, **kwargs
+                )
+            return self.__executor
+
+    def run(
+        self,
+        data: bytes,
+        base_uri: str,
+        input_type: RDF_Type,
+        output_type: Optional[RDF_Type],
+    ) -> Tuple[int, Optional[str]]:
+        """Raises concurrent.futures.TimeoutError if the document takes longer than timeout_seconds. In that case
+        the workers are killed, since the parse would keep its worker busy, and a new pool is started."""
+
+        executor = self.__get_executor()
+        future = executor.submit(
+            rdflib_worker_parse,
+            data,
+            base_uri,
+            get_rdflib_string(input_type),
+            get_rdflib_serializer(output_type) if output_type is not None else None,
+        )
+        try:
+            return future.result(timeout=self.timeout_seconds)
+        except (FutureTimeoutError, BrokenProcessPool):
+            self.__kill_executor(executor)
+            raise
+
+    def __kill_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Replaces the executor with a new one on the next run. Documents other threads are parsing in it fail
+        with BrokenProcessPool and are parsed by rapper."""
+
+        with self.__lock:
+            if self.__executor is executor:
+                self.__executor = None
+        # the executor has no public way to stop running tasks
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def shutdown(self) -> None:
+        with self.__lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=False, cancel_futures=True)
+                self.__executor = None
+
+
+class ParsingService:
+    """Entry point for all RDF parsing of Archivo.
+
+    In "auto" mode documents smaller than inprocess_max_bytes are parsed by the rdflib worker pool, everything
+    else and every document the pool fails on is parsed by rapper, so errors are always reported by rapper.
+    Triples are always counted by rapper.
+    Serializations are only taken from the pool if the caller allows it, since rdflib's output is not
+    byte-identical to rapper's and the published files have to stay comparable between versions."""
+
+    def __init__(
+        self,
+        mode: str = archivo_config.PARSING_BACKEND,
+        inprocess_max_bytes: int = archivo_config.PARSING_INPROCESS_MAX_BYTES,
+        worker_count: int = archivo_config.PARSING_WORKER_COUNT,
+        max_tasks_per_worker: int = archivo_config.PARSING_WORKER_MAX_TASKS,
+        timeout_seconds: int = archivo_config.PARSING_INPROCESS_TIMEOUT_SECONDS,
+        cache: ParseCache = parse_cache,
+    ):
+        self.mode = mode
+        self.cache = cache
+        self.inprocess_max_bytes = inprocess_max_bytes
+        self.rapper = RapperBackend()
+        self.worker_pool = RDFLibWorkerPool(
+            worker_count, max_tasks_per_worker, timeout_seconds
+        )
+
+        self.__stats = {"inprocess": 0, "rapper": 0, "fallbacks": 0}
+        self.__stats_lock = threading.Lock()
+
+    def __count_stat(self, key: str) -> None:
+        with self.__stats_lock:
+            self.__stats[key] += 1
+
+    def __get_small_input(self, rdf_input: parsing.RDFInput) -> Optional[bytes]:
+        """Returns the content as bytes if it may be parsed in the worker pool, else None"""
+
+        if self.mode != "auto":
+            return None
+        if isinstance(rdf_input, SpooledContent):
+            if (
+                not rdf_input.is_in_memory
+                or rdf_input.content_length > self.inprocess_max_bytes
+            ):
+                return None
+            return rdf_input.get_bytes()
+        data = bytes(rdf_input, "utf-8") if isinstance(rdf_input, str) else rdf_input
+        return data if len(data) <= self.inprocess_max_bytes else None
+
+    def __run_inprocess(
+        self,
+        data: bytes,
+        base_uri: str,
+        input_type: RDF_Type,
+        output_type: Optional[RDF_Type],
+    ) -> Optional[Tuple[int, Optional[str]]]:
+        try:
+            result = self.worker_pool.run(data, base_uri, input_type, output_type)
+        except Exception:
+            self.__count_stat("fallbacks")
+            return None
+        self.__count_stat("inprocess")
+        return result
+
+    def __cached(
+        self,
+        rdf_input: parsing.RDFInput,
+        parameters: List[str],
+        backends: List[str],
+        parse_fun: Callable,
+    ):
+        """Returns the result cached for the input, parameters and one of the backends (tried in order), or
+        computes it with parse_fun, which returns the backend used and the result, and caches it"""
+
+        if isinstance(rdf_input, SpooledContent):
+            shasum, content_length = rdf_input.sha_256_sum, rdf_input.content_length
+        else:
+            shasum, content_length = string_tools.get_content_stats(
+                bytes(rdf_input, "utf-8") if isinstance(rdf_input, str) else rdf_input
+            )
+        if not self.cache.is_applicable(content_length):
+            return parse_fun()[1]
+
+        for backend in backends:
+            result = self.cache.get(
+                ParseCache.build_key(shasum, *parameters, backend), content_length
+            )
+            if result is not MISS:
+                return from_cache_value(result)
+        backend, result = parse_fun()
+        self.cache.put(
+            ParseCache.build_key(shasum, *parameters, backend), to_cache_value(result)
+        )
+        return result
+
+    def parse(
+        self,
+        rdf_input: parsing.RDFInput,
+        base_uri: str,
+        input_type: RDF_Type,
+        output_type: RDF_Type = RDF_Type.N_TRIPLES,
+        allow_inprocess: bool = False,
+    ) -> parsing.RapperParsingResult:
+        data = self.__get_small_input(rdf_input) if allow_inprocess else None
+        return self.__cached(
+            rdf_input,
+            ["parse", input_type.name, output_type.name, base_uri],
+            # results of the worker pool must not be used for published files, rapper results always may
+            ["rdflib", "rapper"] if data is not None else ["rapper"],
+            lambda: self.__parse(rdf_input, data, base_uri, input_type, output_type),
+        )
+
+    def __parse(
+        self,
+        rdf_input: parsing.RDFInput,
+        data: Optional[bytes],
+        base_uri: str,
+        input_type: RDF_Type,
+        output_type: RDF_Type,
+    ) -> Tuple[str, parsing.RapperParsingResult]:
+        if data is not None:
+            result = self.__run_inprocess(data, base_uri, input_type, output_type)
+            if result is not None:
+                triple_number, serialization = result
+                return "rdflib", parsing.RapperParsingResult(
+                    serialization,
+                    output_type,
+                    parsing.RapperParsingInfo(triple_number, [], []),
+                )
+
+        self.__count_stat("rapper")
+        return "rapper", self.rapper.parse(rdf_input, base_uri, input_type, output_type)
+
+    def count(
+        self, rdf_input: parsing.RDFInput, base_uri: str, input_type: RDF_Type
+    ) -> parsing.RapperParsingInfo:
+        """Always counted by rapper: rdflib counts distinct triples and reports no warnings, so format probes
+        would compare numbers of different backends depending on the size of the documents"""
+
+        def count_with_rapper():
+            self.__count_stat("rapper")
+            return "rapper", self.rapper.count(rdf_input, base_uri, input_type)
+
+        return self.__cached(
+            rdf_input,
+            ["count", input_type.name, base_uri],
+            ["rapper"],
+            count_with_rapper,
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self.__stats_lock:
+            return dict(self.__stats)
+
+    def shutdown(self) -> None:
+        self.worker_pool.shutdown()
+
+
+# the service shared by all modules of this process
+default_service = ParsingService()
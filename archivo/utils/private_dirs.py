@@ -0,0 +1,22 @@
+import os
+import stat
+
+# The caches and work directories of Archivo hold content that is trusted later (parsing results, pellet results,
+# the ontologies pellet reasons over), so they must never be writable by other users of the machine.
+
+
+def ensure_private_dir(path: str) -> str:
+    """Creates the directory with mode 0700 if it doesn't exist and returns its path. Raises PermissionError if
+    it is no real directory (e.g. a symlink), belongs to another user or is accessible by other users."""
+
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    path_stat = os.lstat(path)
+    if not stat.S_ISDIR(path_stat.st_mode):
+        raise PermissionError(f"{path} is no directory")
+    if path_stat.st_uid != os.geteuid():
+        raise PermissionError(f"{path} belongs to another user")
+    if path_stat.st_mode & 0o077:
+        raise PermissionError(
+            f"{path} is accessible by other users, restrict it to mode 0700"
+        )
+    return path
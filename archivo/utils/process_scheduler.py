@@ -0,0 +1,266 @@
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, IO, Iterator, List, Optional, Union
+
+from utils import archivo_config
+from utils.archivoLogs import webservice_logger
+
+try:
+    import resource
+except ImportError:  # no rlimits outside of unix
+    resource = None
+
+# Central admission control for the external tools (rapper, sort, pellet, DisplayAxioms, profile checker):
+# at most PROCESS_MAX_RUNNING jobs run at once, at most PROCESS_TOOL_LIMITS[tool] of the same tool, waiting jobs
+# are started cheapest first (by their estimated cost, usually the input size) and get the memory and CPU time
+# rlimits of their tool. The resource usage of every job is read with wait4 when the process is reaped.
+
+
+@dataclass
+class ResourceUsage:
+    queue_seconds: float
+    wall_seconds: float
+    user_seconds: float = 0.0
+    system_seconds: float = 0.0
+    # peak resident memory, 0 if unknown
+    max_rss_bytes: int = 0
+
+
+@dataclass
+class ProcessResult:
+    args: List[str]
+    returncode: int
+    stdout: Optional[bytes]
+    stderr: Optional[bytes]
+    usage: ResourceUsage
+
+
+class RusagePopen(subprocess.Popen):
+    """Popen reaping the child with os.wait4, so the resource usage of exactly this process is known"""
+
+    rusage = None
+
+    def _try_wait(self, wait_flags):
+        try:
+            pid, status, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            # same as Popen: the child was reaped elsewhere (e.g. SIGCHLD ignored)
+            return self.pid, 0
+        if pid == self.pid:
+            self.rusage = rusage
+        return pid, status
+
+
+def apply_rlimits(
+    pid: int, memory_bytes: Optional[int], cpu_seconds: Optional[int]
+) -> None:
+    """Sets the limits of the started process with prlimit, since preexec_fn isn't safe in threaded programs"""
+
+    if resource is None or not hasattr(resource, "prlimit"):
+        return
+    try:
+        if memory_bytes is not None:
+            resource.prlimit(pid, resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+        if cpu_seconds is not None:
+            # SIGXCPU at the soft limit, SIGKILL a bit later if it is ignored
+            resource.prlimit(pid, resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+    except ProcessLookupError:
+        # already done
+        pass
+
+
+class _Ticket:
+    def __init__(self, tool: str, cost: int, sequence: int):
+        self.tool = tool
+        self.cost = cost
+        self.sequence = sequence
+        self.enqueued = time.monotonic()
+
+
+class ProcessScheduler:
+    """Runs external processes with global and per-tool concurrency limits, cheapest job first. Jobs waiting
+    longer than max_queue_seconds are started before cheaper ones, so large ontologies aren't starved."""
+
+    def __init__(
+        self,
+        max_running: int = archivo_config.PROCESS_MAX_RUNNING,
+        tool_limits: Dict[str, int] = archivo_config.PROCESS_TOOL_LIMITS,
+        memory_limits: Dict[str, int] = archivo_config.PROCESS_MEMORY_LIMITS_BYTES,
+        cpu_limits: Dict[str, int] = archivo_config.PROCESS_CPU_LIMITS_SECONDS,
+        max_queue_seconds: int = archivo_config.PROCESS_QUEUE_MAX_WAIT_SECONDS,
+    ):
+        self.max_running = max_running
+        self.tool_limits = tool_limits
+        self.memory_limits = memory_limits
+        self.cpu_limits = cpu_limits
+        self.max_queue_seconds = max_queue_seconds
+
+        self.__condition = threading.Condition()
+        self.__waiting: List[_Ticket] = []
+        self.__running: Dict[str, int] = {}
+        self.__running_count = 0
+        self.__sequence = 0
+        self.__stats: Dict[str, Dict[str, float]] = {}
+
+    def __priority(self, ticket: _Ticket, now: float):
+        starving = now - ticket.enqueued > self.max_queue_seconds
+        return (0 if starving else 1, ticket.cost, ticket.sequence)
+
+    def __has_free_slot(self, tool: str) -> bool:
+        tool_limit = self.tool_limits.get(tool, None)
+        return self.__running_count < self.max_running and (
+            tool_limit is None or self.__running.get(tool, 0) < tool_limit
+        )
+
+    def __is_next(self, ticket: _Ticket) -> bool:
+        """The ticket may start if no other startable ticket comes before it"""
+
+        if not self.__has_free_slot(ticket.tool):
+            return False
+        now = time.monotonic()
+        startable = [
+            waiting for waiting in self.__waiting if self.__has_free_slot(waiting.tool)
+        ]
+        return (
+            min(startable, key=lambda waiting: self.__priority(waiting, now)) is ticket
+        )
+
+    @contextmanager
+    def reserve(self, tool: str, cost: int = 0) -> Iterator[float]:
+        """Blocks until the job may run and holds its slot until the block is left. Yields the seconds waited."""
+
+        with self.__condition:
+            self.__sequence += 1
+            ticket = _Ticket(tool, cost, self.__sequence)
+            self.__waiting.append(ticket)
+            try:
+                # the timeout re-checks the priorities of long waiting jobs
+                while not self.__is_next(ticket):
+                    self.__condition.wait(timeout=10)
+            finally:
+                self.__waiting.remove(ticket)
+            self.__running[tool] = self.__running.get(tool, 0) + 1
+            self.__running_count += 1
+            # others may be startable now, e.g. jobs of other tools
+            self.__condition.notify_all()
+
+        try:
+            yield time.monotonic() - ticket.enqueued
+        finally:
+            with self.__condition:
+                self.__running[tool] -= 1
+                self.__running_count -= 1
+                self.__condition.notify_all()
+
+    def popen(self, tool: str, command: List[str], **kwargs) -> RusagePopen:
+        """Starts the command with the rlimits of the tool, only call it while holding a reservation"""
+
+        process = RusagePopen(command, **kwargs)
+        apply_rlimits(
+            process.pid,
+            self.memory_limits.get(tool, None),
+            self.cpu_limits.get(tool, None),
+        )
+        return process
+
+    def run(
+        self,
+        tool: str,
+        command: List[str],
+        cost: int = 0,
+        input: Optional[bytes] = None,
+        stdin: Union[None, int, IO] = None,
+        stdout: Union[None, int, IO] = subprocess.PIPE,
+        stderr: Union[None, int, IO] = subprocess.PIPE,
+        timeout: Optional[float] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> ProcessResult:
+        """Like subprocess.run, but scheduled. Raises subprocess.TimeoutExpired after killing the process."""
+
+        if input is not None:
+            stdin = subprocess.PIPE
+
+        with self.reserve(tool, cost) as queue_seconds:
+            start = time.monotonic()
+            with self.popen(
+                tool, command, stdin=stdin, stdout=stdout, stderr=stderr, env=env
+            ) as process:
+                try:
+                    out, err = process.communicate(input=input, timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.communicate()
+                    self.__record(tool, process, queue_seconds, start)
+                    raise
+            usage = self.__record(tool, process, queue_seconds, start)
+
+        return ProcessResult(command, process.returncode, out, err, usage)
+
+    def __record(
+        self, tool: str, process: RusagePopen, queue_seconds: float, start: float
+    ) -> ResourceUsage:
+        usage = build_usage(process, queue_seconds, start)
+        self.record_usage(tool, usage, process.returncode)
+        return usage
+
+    def record_usage(
+        self, tool: str, usage: ResourceUsage, returncode: Optional[int] = None
+    ) -> None:
+        with self.__condition:
+            tool_stats = self.__stats.setdefault(
+                tool,
+                {
+                    "jobs": 0,
+                    "queue_seconds": 0.0,
+                    "wall_seconds": 0.0,
+                    "cpu_seconds": 0.0,
+                    "max_rss_bytes": 0,
+                },
+            )
+            tool_stats["jobs"] += 1
+            tool_stats["queue_seconds"] += usage.queue_seconds
+            tool_stats["wall_seconds"] += usage.wall_seconds
+            tool_stats["cpu_seconds"] += usage.user_seconds + usage.system_seconds
+            tool_stats["max_rss_bytes"] = max(
+                tool_stats["max_rss_bytes"], usage.max_rss_bytes
+            )
+        webservice_logger.debug(
+            f"{tool} exited with {returncode}: queued {usage.queue_seconds:.2f}s, "
+            f"wall {usage.wall_seconds:.2f}s, user {usage.user_seconds:.2f}s, "
+            f"system {usage.system_seconds:.2f}s, max rss {usage.max_rss_bytes} bytes"
+        )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self.__condition:
+            return {tool: dict(tool_stats) for tool, tool_stats in self.__stats.items()}
+
+
+def build_usage(
+    process: RusagePopen, queue_seconds: float, start: float
+) -> ResourceUsage:
+    usage = ResourceUsage(
+        queue_seconds=queue_seconds, wall_seconds=time.monotonic() - start
+    )
+    if process.rusage is not None:
+        usage.user_seconds = process.rusage.ru_utime
+        usage.system_seconds = process.rusage.ru_stime
+        # ru_maxrss is in kilobytes on linux
+        usage.max_rss_bytes = process.rusage.ru_maxrss * 1024
+    return usage
+
+
+def estimate_cost(path_or_url: str) -> int:
+    """Cost of a job reading the file: its size, 0 if it is no local file"""
+
+    try:
+        return os.path.getsize(path_or_url)
+    except OSError:
+        return 0
+
+
+# the scheduler shared by all tools of this process
+process_scheduler = ProcessScheduler()
@@ -0,0 +1,142 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Iterable, Optional
+
+from utils.archivo_exceptions import ContentTooLargeException
+
+
+class SpooledContent:
+    """Binary content that is kept in memory while it is small and moved to a temporary file once it exceeds
+    memory_threshold bytes. The SHA-256 sum and the length are computed while writing."""
+
+    def __init__(self, memory_threshold: int, max_size: Optional[int] = None):
+        self.memory_threshold = memory_threshold
+        self.max_size = max_size
+        self.content_length = 0
+
+        self.__hash = hashlib.sha256()
+        self.__buffer: Optional[io.BytesIO] = io.BytesIO()
+        self.__file: Optional[tempfile._TemporaryFileWrapper] = None
+        # an existing file adopted by from_file
+        self.__adopted_path: Optional[str] = None
+        self.__finished = False
+
+    @staticmethod
+    def from_chunks(
+        chunks: Iterable[bytes], memory_threshold: int, max_size: Optional[int] = None
+    ) -> "SpooledContent":
+        content = SpooledContent(memory_threshold, max_size)
+        try:
+            for chunk in chunks:
+                content.write(chunk)
+        except Exception:
+            content.close()
+            raise
+        content.finish()
+        return content
+
+    @staticmethod
+    def from_bytes(data: bytes, memory_threshold: int) -> "SpooledContent":
+        return SpooledContent.from_chunks([data], memory_threshold)
+
+    @staticmethod
+    def from_file(path: str) -> "SpooledContent":
+        """Takes over an existing file without copying it, the file is deleted on close.
+        The file is read once for computing the SHA-256 sum and the length."""
+
+        content = SpooledContent(memory_threshold=0)
+        with open(path, "rb") as content_file:
+            for chunk in iter(lambda: content_file.read(1024 * 1024), b""):
+                content.__hash.update(chunk)
+                content.content_length += len(chunk)
+        content.__buffer = None
+        content.__adopted_path = path
+        content.__finished = True
+        return content
+
+    def write(self, chunk: bytes) -> None:
+        if self.__finished:
+            raise ValueError("Can't write to finished content")
+        if not chunk:
+            return
+
+        self.content_length += len(chunk)
+        if self.max_size is not None and self.content_length > self.max_size:
+            raise ContentTooLargeException(
+                f"Content exceeds the maximum size of {self.max_size} bytes"
+            )
+        self.__hash.update(chunk)
+
+        if self.__file is None and self.content_length > self.memory_threshold:
+            # roll over to disk
+            self.__file = tempfile.NamedTemporaryFile(
+                prefix="archivo-", suffix=".spool"
+            )
+            self.__file.write(self.__buffer.getvalue())
+            self.__buffer = None
+
+        if self.__file is not None:
+            self.__file.write(chunk)
+        else:
+            self.__buffer.write(chunk)
+
+    def finish(self) -> None:
+        if self.__file is not None:
+            self.__file.flush()
+        self.__finished = True
+
+    @property
+    def sha_256_sum(self) -> str:
+        return self.__hash.hexdigest()
+
+    @property
+    def is_in_memory(self) -> bool:
+        return self.file_path is None
+
+    @property
+    def file_path(self) -> Optional[str]:
+        """The path of the file holding the content, None if the content is held in memory"""
+        if self.__file is not None:
+            return self.__file.name
+        return self.__adopted_path
+
+    def open(self) -> BinaryIO:
+        """Returns a new, independent binary file handle positioned at the start of the content.
+        The caller is responsible for closing it."""
+        path = self.file_path
+        if path is not None:
+            return open(path, "rb")
+        else:
+            return io.BytesIO(self.__buffer.getvalue())
+
+    def get_bytes(self) -> bytes:
+        """Returns the complete content. Only use it where the content is known to be small."""
+        with self.open() as content_file:
+            return content_file.read()
+
+    def get_text(self, encoding: str = "utf-8", limit: Optional[int] = None) -> str:
+        """Returns the content (or its first limit bytes) decoded as text"""
+        with self.open() as content_file:
+            data = content_file.read() if limit is None else content_file.read(limit)
+        return data.decode(encoding, errors="replace")
+
+    def copy_to(self, target: BinaryIO) -> None:
+        with self.open() as content_file:
+            shutil.copyfileobj(content_file, target)
+
+    def close(self) -> None:
+        if self.__file is not None:
+            self.__file.close()
+        if self.__adopted_path is not None and os.path.exists(self.__adopted_path):
+            os.remove(self.__adopted_path)
+            self.__adopted_path = None
+        self.__buffer = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,127 @@
+import re
+import sys
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+from utils import archivo_config
+
+# the rule key matching every predicate in DIFF_IGNORE_SUBJECT_RULES
+ANY_PREDICATE = "*"
+
+
+def split_triple(line: str) -> Optional[Tuple[str, str, str]]:
+    """Splits a N-Triples line into subject, predicate and object. IRIs are returned without angle brackets,
+    literals and blank nodes as written. Subject, predicate and IRI objects are interned, since they repeat a lot.
+    Returns None for empty lines, comments and lines which are no triple."""
+
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    # neither IRIs nor blank node labels contain whitespace in N-Triples
+    parts = line.split(None, 2)
+    if len(parts) < 3:
+        return None
+    subject, predicate, rest = parts
+
+    if rest.endswith("."):
+        rest = rest[:-1].rstrip()
+    if rest.startswith("<") and rest.endswith(">"):
+        rest = sys.intern(rest[1:-1])
+
+    return (
+        sys.intern(subject[1:-1] if subject.startswith("<") else subject),
+        sys.intern(predicate[1:-1] if predicate.startswith("<") else predicate),
+        rest,
+    )
+
+
+class TripleFilter:
+    """Decides which changed triples are irrelevant for the diff: triples with one of the ignored properties and
+    triples whose subject matches one of the subject patterns configured for its predicate (or for all predicates
+    with the key "*")."""
+
+    def __init__(
+        self,
+        ignored_properties: Iterable[str] = archivo_config.DIFF_IGNORE_PROPERTIES,
+        subject_rules: Dict[str, List[str]] = archivo_config.DIFF_IGNORE_SUBJECT_RULES,
+    ):
+        self.ignored_properties = frozenset(
+            sys.intern(prop) for prop in ignored_properties
+        )
+        # one combined regex per predicate
+        self.subject_rules: Dict[str, Pattern] = {
+            sys.intern(predicate): re.compile(
+                "|".join(f"(?:{pattern})" for pattern in patterns)
+            )
+            for predicate, patterns in subject_rules.items()
+            if predicate != ANY_PREDICATE and patterns
+        }
+        # the predicate terms of undecoded lines, with angle brackets
+        self.ignored_property_terms = frozenset(
+            f"<{prop}>".encode("utf-8") for prop in self.ignored_properties
+        )
+        self.subject_rule_terms = frozenset(
+            f"<{predicate}>".encode("utf-8") for predicate in self.subject_rules
+        )
+        any_predicate_patterns = subject_rules.get(ANY_PREDICATE, [])
+        self.any_predicate_rule: Optional[Pattern] = (
+            re.compile("|".join(f"(?:{pattern})" for pattern in any_predicate_patterns))
+            if any_predicate_patterns
+            else None
+        )
+
+    def is_ignored(self, triple: Tuple[str, str, str]) -> bool:
+        subject, predicate, _ = triple
+        if predicate in self.ignored_properties:
+            return True
+        subject_rule = self.subject_rules.get(predicate, None)
+        if subject_rule is not None and subject_rule.search(subject):
+            return True
+        return (
+            self.any_predicate_rule is not None
+            and self.any_predicate_rule.search(subject) is not None
+        )
+
+    def is_ignored_line(self, line: str) -> bool:
+        """Lines that are no triple are never ignored, so they show up in the diff"""
+
+        # fast path for the single space separated lines written by rapper: only the predicate is cut out
+        subject_end = line.find(" ")
+        predicate_end = line.find(" ", subject_end + 1)
+        if (
+            subject_end > 0
+            and predicate_end > subject_end
+            and line[subject_end + 1] == "<"
+            and line[predicate_end - 1] == ">"
+            and not line[0].isspace()
+        ):
+            predicate = line[subject_end + 2 : predicate_end - 1]
+            if predicate in self.ignored_properties:
+                return True
+            if self.any_predicate_rule is None and predicate not in self.subject_rules:
+                return False
+
+        triple = split_triple(line)
+        return triple is not None and self.is_ignored(triple)
+
+    def is_ignored_bytes(self, line: bytes) -> bool:
+        """is_ignored_line for undecoded lines, the line is only decoded if a subject rule has to be checked"""
+
+        # fast path for the single space separated lines written by rapper: one split and one set lookup
+        parts = line.split(b" ", 2)
+        if len(parts) == 3 and parts[0]:
+            predicate = parts[1]
+            if predicate in self.ignored_property_terms:
+                return True
+            if (
+                self.any_predicate_rule is None
+                and predicate[-1:] == b">"
+                and predicate not in self.subject_rule_terms
+            ):
+                return False
+
+        return self.is_ignored_line(line.decode("utf-8", errors="replace"))
+
+
+# the filter of the configured rules
+default_filter = TripleFilter()
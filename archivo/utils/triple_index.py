@@ -0,0 +1,228 @@
+import hashlib
+import heapq
+import mmap
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from models.databus_identifier import DatabusFileMetadata, DatabusVersionIdentifier
+from utils import triple_filter
+from utils.spooling import SpooledContent
+
+# Sidecar of a parsed N-Triples file for diffing without reading the whole file:
+# a header (magic, number of triples) followed by the sorted 64-bit hashes of all triples and, in the same order,
+# the byte offsets of the triples in the N-Triples file. All numbers are little-endian uint64.
+
+TRIPLE_INDEX_MAGIC = b"ARCHTH01"
+TRIPLE_INDEX_HEADER = struct.Struct("<8sQ")
+# triples sorted at once while building an index, the rest is kept in arrays of 16 bytes per triple
+TRIPLE_INDEX_SORT_CHUNK_SIZE = 1_000_000
+
+
+def hash_triple(line: bytes) -> int:
+    """Hashes a N-Triples line without its line break"""
+    return int.from_bytes(hashlib.blake2b(line, digest_size=8).digest(), "little")
+
+
+def compute_fingerprint(lines: Iterable[bytes]) -> str:
+    """Order-independent fingerprint of the set of triples: the number of distinct triples and the sum of their
+    128-bit hashes mod 2^128. Triples ignored by the diff are left out, so equal fingerprints mean there is no
+    relevant change. The lines have to be sorted (like the output of sort -u), duplicates are only detected if
+    they are adjacent."""
+
+    triple_count = 0
+    hash_sum = 0
+    last_triple = None
+    for line in lines:
+        triple = line.strip()
+        if not triple or triple == last_triple:
+            continue
+        last_triple = triple
+        if triple_filter.default_filter.is_ignored_bytes(triple):
+            continue
+        triple_hash = int.from_bytes(
+            hashlib.blake2b(triple, digest_size=16).digest(), "little"
+        )
+        triple_count += 1
+        hash_sum = (hash_sum + triple_hash) % 2**128
+    return f"{triple_count}-{hash_sum:032x}"
+
+
+def compute_file_fingerprint(ntriples_path: str) -> str:
+    """Fingerprint of a sorted N-Triples file"""
+    with open(ntriples_path, "rb") as nt_file:
+        return compute_fingerprint(nt_file)
+
+
+def __to_little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array("Q", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def __sort_chunk(entries: List[int]) -> Tuple[array, array]:
+    entries.sort()
+    hashes, offsets = array("Q"), array("Q")
+    for entry in entries:
+        hashes.append(entry >> 64)
+        offsets.append(entry & 0xFFFFFFFFFFFFFFFF)
+    return hashes, offsets
+
+
+def build_triple_index(
+    ntriples_path: str, target_path: str, chunk_size: int = TRIPLE_INDEX_SORT_CHUNK_SIZE
+) -> int:
+    """Writes the sidecar of the N-Triples file to target_path and returns the number of indexed triples.
+    Empty lines are skipped, lines with the same hash are only indexed once. The triples are sorted in chunks of
+    chunk_size that are kept as arrays and merged, so only one chunk is held as Python ints."""
+
+    chunks = []
+    entries = []
+    offset = 0
+    with open(ntriples_path, "rb") as nt_file:
+        for line in nt_file:
+            triple = line.rstrip(b"\r\n")
+            if triple.strip():
+                # hash and offset packed into one int, so sorting needs no tuples
+                entries.append(hash_triple(triple) << 64 | offset)
+                if len(entries) >= chunk_size:
+                    chunks.append(__sort_chunk(entries))
+                    entries = []
+            offset += len(line)
+    if entries:
+        chunks.append(__sort_chunk(entries))
+    del entries
+
+    offsets = array("Q")
+    with open(target_path, "wb") as index_file:
+        # the count is only known after the merge
+        index_file.write(TRIPLE_INDEX_HEADER.pack(TRIPLE_INDEX_MAGIC, 0))
+        hashes = array("Q")
+        last_hash = None
+        for triple_hash, triple_offset in heapq.merge(
+            *[
+                zip(chunk_hashes, chunk_offsets)
+                for chunk_hashes, chunk_offsets in chunks
+            ]
+        ):
+            if triple_hash == last_hash:
+                continue
+            last_hash = triple_hash
+            hashes.append(triple_hash)
+            offsets.append(triple_offset)
+            if len(hashes) >= chunk_size:
+                index_file.write(__to_little_endian(hashes))
+                hashes = array("Q")
+        index_file.write(__to_little_endian(hashes))
+        del chunks, hashes
+
+        index_file.write(__to_little_endian(offsets))
+        index_file.seek(0)
+        index_file.write(TRIPLE_INDEX_HEADER.pack(TRIPLE_INDEX_MAGIC, len(offsets)))
+    return len(offsets)
+
+
+class TripleIndex:
+    """Memory-mapped sidecar written by build_triple_index"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__file: BinaryIO = open(path, "rb")
+        try:
+            magic, self.triple_count = TRIPLE_INDEX_HEADER.unpack(
+                self.__file.read(TRIPLE_INDEX_HEADER.size)
+            )
+            if magic != TRIPLE_INDEX_MAGIC:
+                raise ValueError(f"{path} is no triple index")
+            self.__mmap: Optional[mmap.mmap] = (
+                mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+                if self.triple_count > 0
+                else None
+            )
+        except Exception:
+            self.__file.close()
+            raise
+
+        if self.__mmap is None:
+            self.hashes, self.offsets = array("Q"), array("Q")
+        elif sys.byteorder == "little":
+            view = memoryview(self.__mmap)[TRIPLE_INDEX_HEADER.size :].cast("Q")
+            self.hashes = view[: self.triple_count]
+            self.offsets = view[self.triple_count :]
+        else:
+            values = array("Q", self.__mmap[TRIPLE_INDEX_HEADER.size :])
+            values.byteswap()
+            self.hashes = values[: self.triple_count]
+            self.offsets = values[self.triple_count :]
+
+    def __len__(self) -> int:
+        return self.triple_count
+
+    def close(self) -> None:
+        # the views have to be released before the map can be closed
+        if isinstance(self.hashes, memoryview):
+            self.hashes.release()
+            self.offsets.release()
+        if self.__mmap is not None:
+            self.__mmap.close()
+        self.__file.close()
+
+    def __enter__(self) -> "TripleIndex":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def diff_triple_indices(
+    old_index: TripleIndex, new_index: TripleIndex
+) -> Tuple[List[int], List[int]]:
+    """Merges the sorted hashes of both indices. Returns the offsets of the triples only in the old file and of
+    the triples only in the new file."""
+
+    old_hashes, new_hashes = old_index.hashes, new_index.hashes
+    old_count, new_count = len(old_index), len(new_index)
+    removed_offsets, added_offsets = [], []
+
+    i, j = 0, 0
+    while i < old_count and j < new_count:
+        old_hash, new_hash = old_hashes[i], new_hashes[j]
+        if old_hash < new_hash:
+            removed_offsets.append(old_index.offsets[i])
+            i += 1
+        elif new_hash < old_hash:
+            added_offsets.append(new_index.offsets[j])
+            j += 1
+        else:
+            i += 1
+            j += 1
+    removed_offsets.extend(old_index.offsets[k] for k in range(i, old_count))
+    added_offsets.extend(new_index.offsets[k] for k in range(j, new_count))
+    return removed_offsets, added_offsets
+
+
+def read_lines_at(ntriples_path: str, offsets: Iterable[int]) -> Iterator[bytes]:
+    """Yields the lines (without line break) starting at the given offsets, read in file order"""
+
+    with open(ntriples_path, "rb") as nt_file:
+        for offset in sorted(offsets):
+            nt_file.seek(offset)
+            yield nt_file.readline().rstrip(b"\r\n")
+
+
+def get_triple_index_metadata(
+    version_identifier: DatabusVersionIdentifier,
+    content: Optional[SpooledContent] = None,
+) -> DatabusFileMetadata:
+    """The sidecar is stored next to the parsed N-Triples file of the version, but not deployed to the databus"""
+
+    return DatabusFileMetadata(
+        version_identifier=version_identifier,
+        content_variants={"type": "parsed", "index": "tripleHashes"},
+        file_extension="idx",
+        compression=None,
+        sha_256_sum=content.sha_256_sum if content is not None else "",
+        content_length=content.content_length if content is not None else -1,
+    )
@@ -0,0 +1,76 @@
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urldefrag
+
+
+class URIIndex:
+    """Thread-safe in-memory index of ontology URIs.
+
+    Lookups are keyed by the defragmented URI, so they match the semantics of string_tools.check_uri_equality
+    in constant time. A character trie over the indexed URIs answers whether an indexed URI is a prefix of a
+    given URI in time linear to the length of the given URI, independent of the size of the index."""
+
+    # key marking the end of an indexed URI in a trie node
+    __TERMINAL = ""
+
+    def __init__(self, uris: Iterable[str] = ()):
+        self.__lock = threading.Lock()
+        self.__uris_by_key: Dict[str, str] = {}
+        self.__trie: Dict[str, Dict] = {}
+
+        for uri in uris:
+            self.add(uri)
+
+    @staticmethod
+    def normalize(uri: str) -> str:
+        return urldefrag(uri)[0]
+
+    def add(self, uri: str) -> bool:
+        """Adds the URI to the index. Returns False if an equal URI was already contained."""
+
+        key = self.normalize(uri)
+        with self.__lock:
+            if key in self.__uris_by_key:
+                return False
+            self.__uris_by_key[key] = uri
+
+            node = self.__trie
+            for char in uri:
+                node = node.setdefault(char, {})
+            node[self.__TERMINAL] = {}
+        return True
+
+    def find(self, uri: str) -> Optional[str]:
+        """Returns the indexed URI equal to the given URI (ignoring fragments), None if there is none"""
+
+        key = self.normalize(uri)
+        # reads take the lock as well, add changes the dict and the trie in several steps
+        with self.__lock:
+            return self.__uris_by_key.get(key, None)
+
+    def contains_prefix_of(self, uri: str) -> bool:
+        """Checks whether the URI itself or a prefix of it is indexed"""
+
+        with self.__lock:
+            node = self.__trie
+            for char in uri:
+                if self.__TERMINAL in node:
+                    return True
+                node = node.get(char, None)
+                if node is None:
+                    return False
+            return self.__TERMINAL in node
+
+    def __contains__(self, uri: str) -> bool:
+        return self.find(uri) is not None
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__uris_by_key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_list())
+
+    def to_list(self) -> List[str]:
+        with self.__lock:
+            return list(self.__uris_by_key.values())
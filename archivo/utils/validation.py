@@ -3,17 +3,29 @@ from typing import Optional, Tuple, Set, List
 import rdflib
 from pyshacl import validate
 from rdflib import Graph, URIRef
-from utils import archivo_config, string_tools
+from utils import archivo_config, string_tools, parsing
 import os
 import subprocess
 import re
 from utils.archivo_exceptions import UnparseableRDFException
+from utils.jvm_worker import jvm_workers
+from utils.parse_cache import ParseCache, MISS
+from utils.process_scheduler import estimate_cost
+from utils.spooling import SpooledContent
 
 # from owlready2 import get_ontology, sync_reasoner_pellet
 
 
 consistencyRegex = re.compile(r"Consistent: (Yes|No)")
 
+# pellet results by the content of the ontology, the digest of its imports and the pellet options
+reasoning_cache = ParseCache(
+    directory=archivo_config.REASONING_CACHE_DIR,
+    max_bytes=archivo_config.REASONING_CACHE_MAX_BYTES,
+    min_input_bytes=0,
+    enabled=archivo_config.REASONING_CACHE_ENABLED,
+)
+
 
 # needed for gunicorn
 def load_shacl_graph(filepath: str, pub_id: Optional[str] = None) -> rdflib.Graph:
@@ -83,55 +95,95 @@ class TestSuite:
         return self.__run_local_shacl_test(ontograph, self.lodeTestGraph)
 
     def getProfileCheck(self, ontofile):
-        process = subprocess.run(
-            ["java", "-jar", self.profile_checker_jar_path, ontofile, "--all"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+        stdout, stderr, _ = jvm_workers.run_tool(
+            "profile-checker",
+            [self.profile_checker_jar_path],
+            None,
+            [ontofile, "--all"],
+            fallback_command=[
+                "java",
+                "-jar",
+                self.profile_checker_jar_path,
+                ontofile,
+                "--all",
+            ],
+            cost=estimate_cost(ontofile),
         )
-        return process.stdout.decode("utf-8"), process.stderr.decode("utf-8")
+        return stdout, stderr
 
     def run_pellet_command(
-        self, ontology_url: str, command: str, parameters: List[str] = None
+        self,
+        ontology_url: str,
+        command: str,
+        parameters: List[str] = None,
+        cache_key: Optional[str] = None,
     ):
+        """Runs pellet on the ontology. If a cache key identifying the content of the ontology and its imports
+        is given, the result is taken from or stored in the reasoning cache."""
+
         if parameters is None:
             parameters = []
+
+        if cache_key is None or not reasoning_cache.enabled:
+            return self.__run_pellet(ontology_url, command, parameters)
+
+        key = ParseCache.build_key(cache_key, command, *parameters)
+        result = reasoning_cache.get(key, 0)
+        if result is not MISS:
+            # stdout, stderr, exit code, stored as JSON list
+            return tuple(result)
+        result = self.__run_pellet(ontology_url, command, parameters)
+        # timeouts may not happen again
+        if result[2] != 999:
+            reasoning_cache.put(key, result)
+        return result
+
+    def __run_pellet(self, ontology_url: str, command: str, parameters: List[str]):
         pelletCommand = [self.pellet_jar_path, command]
         for parameter in parameters:
             pelletCommand.append(parameter)
         pelletCommand.append(ontology_url)
 
         try:
-            process = subprocess.run(
-                pelletCommand,
+            return jvm_workers.run_tool(
+                "pellet",
+                archivo_config.PELLET_CLASSPATH,
+                archivo_config.PELLET_MAIN_CLASS,
+                pelletCommand[1:],
+                fallback_command=pelletCommand,
                 timeout=600,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            return (
-                process.stdout.decode("utf-8"),
-                process.stderr.decode("utf-8"),
-                process.returncode,
+                cost=estimate_cost(ontology_url),
             )
         except TimeoutError:
             return "", "Timeout in pellet", 999
         except subprocess.TimeoutExpired:
             return "", "Timeout in pellet", 999
 
-    def get_pellet_info(self, ontology_url: str, ignore_imports: bool = False):
+    def get_pellet_info(
+        self,
+        ontology_url: str,
+        ignore_imports: bool = False,
+        cache_key: Optional[str] = None,
+    ):
         params = ["-v"]
         if ignore_imports:
             params.append("--ignore-imports")
         stdout, stderr, returncode = self.run_pellet_command(
-            ontology_url, "info", parameters=params
+            ontology_url, "info", parameters=params, cache_key=cache_key
         )
         return stderr + "\n\n" + stdout
 
-    def get_consistency(self, ontology_url: str, ignore_imports: bool = False):
+    def get_consistency(
+        self,
+        ontology_url: str,
+        ignore_imports: bool = False,
+        cache_key: Optional[str] = None,
+    ):
         params = ["-v", "--loader", "Jena"]
         if ignore_imports:
             params.append("--ignore-imports")
         stdout, stderr, returncode = self.run_pellet_command(
-            ontology_url, "consistency", parameters=params
+            ontology_url, "consistency", parameters=params, cache_key=cache_key
         )
         if returncode == 0:
             match = consistencyRegex.search(stdout)
@@ -147,20 +199,41 @@ class TestSuite:
         else:
             return "Error - Exit " + str(returncode), stderr + "\n\n" + stdout
 
-    def get_axioms_of_rdf_ontology(self, ontology_content: str) -> Set[str]:
-        process = subprocess.run(
-            ["java", "-jar", self.displayAxiomsPath],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            input=bytes(ontology_content, "utf-8"),
+    def get_axioms_of_rdf_ontology(
+        self, ontology_content: parsing.RDFInput
+    ) -> Set[str]:
+        # spooled content on disk is read by the JVM from the file
+        if (
+            isinstance(ontology_content, SpooledContent)
+            and not ontology_content.is_in_memory
+        ):
+            stdin_data, stdin_path = b"", ontology_content.file_path
+        elif isinstance(ontology_content, SpooledContent):
+            stdin_data, stdin_path = ontology_content.get_bytes(), None
+        elif isinstance(ontology_content, str):
+            stdin_data, stdin_path = bytes(ontology_content, "utf-8"), None
+        else:
+            stdin_data, stdin_path = ontology_content, None
+
+        stdout, stderr, returncode = jvm_workers.run_tool(
+            "display-axioms",
+            [self.displayAxiomsPath],
+            None,
+            [],
+            fallback_command=["java", "-jar", self.displayAxiomsPath],
+            stdin_data=stdin_data,
+            stdin_path=stdin_path,
+            cost=estimate_cost(stdin_path)
+            if stdin_path is not None
+            else len(stdin_data),
         )
 
-        axiomSet = process.stdout.decode("utf-8").split("\n")
+        axiomSet = stdout.split("\n")
 
-        if process.returncode == 0:
+        if returncode == 0:
             return set([axiom.strip() for axiom in axiomSet if axiom.strip() != ""])
         else:
-            raise UnparseableRDFException(process.stderr.decode("utf-8"))
+            raise UnparseableRDFException(stderr)
 
 
 def check_if_consistent(consistent: str, consistent_without_imports: str) -> bool:
@@ -1,4 +1,6 @@
 from __future__ import annotations
+import itertools
+from sqlalchemy import event, update
 from models.databus_responses import VersionInformation
 from webservice import db
 from datetime import datetime
@@ -93,3 +95,89 @@ class Fallout(db.Model):
     inArchivo = db.Column(db.Boolean, index=True)
     error = db.Column(db.String(250))
     ontology = db.Column(db.String(120), db.ForeignKey("ontology.uri"))
+
+
+class FrontierEntry(db.Model):
+    """A candidate URI waiting in the discovery frontier"""
+
+    __tablename__ = "frontierEntry"
+    uri = db.Column(db.String(120), primary_key=True)
+    source = db.Column(db.String(64))
+    priority = db.Column(db.Integer, index=True, default=0)
+    depth = db.Column(db.Integer, default=1)
+    attempts = db.Column(db.Integer, default=0)
+    nextEligible = db.Column(db.DateTime, index=True, default=datetime.now)
+    enqueued = db.Column(db.DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return "<FrontierEntry {}>".format(self.uri)
+
+
+class NegativeCacheEntry(db.Model):
+    """A URI whose discovery failed, with the time it may be crawled again"""
+
+    __tablename__ = "negativeCacheEntry"
+    uri = db.Column(db.String(120), primary_key=True)
+    failureClass = db.Column(db.String(32), index=True)
+    attempts = db.Column(db.Integer, default=1)
+    lastAttempt = db.Column(db.DateTime, default=datetime.now)
+    nextRetry = db.Column(db.DateTime, index=True)
+
+    def __repr__(self):
+        return "<NegativeCacheEntry {}>".format(self.uri)
+
+
+class RevisitSchedule(db.Model):
+    """When an ontology is checked for changes next, based on its estimated change rate"""
+
+    __tablename__ = "revisitSchedule"
+    uri = db.Column(db.String(120), primary_key=True)
+    # exponentially weighted averages of the checks: changes found, days since the previous check, failures
+    changeWeight = db.Column(db.Float)
+    exposureWeight = db.Column(db.Float)
+    failureWeight = db.Column(db.Float)
+    lastCheck = db.Column(db.DateTime)
+    nextCheck = db.Column(db.DateTime, index=True)
+
+    def __repr__(self):
+        return "<RevisitSchedule {}>".format(self.uri)
+
+
+class ChangeCounter(db.Model):
+    """Counts the commits changing a set of rows, so other processes can tell whether their caches are stale"""
+
+    __tablename__ = "changeCounter"
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return "<ChangeCounter {}: {}>".format(self.name, self.value)
+
+
+# the counter of added or removed ontologies, e.g. for the URI index of the webservice
+ONTOLOGY_COUNTER = "ontology"
+
+
+@event.listens_for(db.session, "before_flush")
+def count_ontology_changes(session, flush_context, instances):
+    """Increments the ontology counter in the transaction adding or removing ontologies, so it changes exactly
+    when they are committed"""
+
+    if not any(
+        isinstance(obj, Ontology)
+        for obj in itertools.chain(session.new, session.deleted)
+    ):
+        return
+    # incremented in the database, concurrent writers never produce the same value
+    updated = session.execute(
+        update(ChangeCounter)
+        .where(ChangeCounter.name == ONTOLOGY_COUNTER)
+        .values(value=ChangeCounter.value + 1)
+    )
+    if updated.rowcount == 0:
+        session.add(ChangeCounter(name=ONTOLOGY_COUNTER, value=1))
+
+
+def get_change_count(name: str) -> int:
+    value = db.session.query(ChangeCounter.value).filter_by(name=name).scalar()
+    return value or 0
@@ -68,7 +68,7 @@ class InfoForm(FlaskForm):
 @app.route("/add", methods=["GET", "POST"])
 def suggest_ontology():
     form = SuggestionForm()
-    all_ontology_uris = [ont.uri for ont in db.session.query(Ontology.uri).all()]
+    all_ontology_uris = database_utils.get_uri_index(Ontology)
 
     suggested_uri = None
 
@@ -172,7 +172,7 @@ def ontology_info_page():
     ontoUri = unquote(ontoUri)
     isDev = True if "dev" in args else False
     form = InfoForm()
-    all_ontologies = [ont.uri for ont in db.session.query(OfficialOntology).all()]
+    all_ontologies = database_utils.get_uri_index(OfficialOntology)
     if form.validate_on_submit():
         uri = form.uris.data.strip()
         return redirect(f"/info?o={uri}")
@@ -184,7 +184,7 @@ def ontology_info_page():
             title="Archivo - Ontology Info",
         )
     else:
-        foundUri = string_tools.get_uri_from_index(ontoUri, all_ontologies)
+        foundUri = all_ontologies.find(ontoUri)
         if foundUri is None:
             abort(code=404)
         ont = db.session.query(OfficialOntology).filter_by(uri=foundUri).first()
@@ -256,9 +256,7 @@ def turtleInfo():
     args = request.args
     ontoUri = args["o"] if "o" in args else ""
     ontoUri = unquote(ontoUri)
-    if not string_tools.get_uri_from_index(
-        ontoUri, [ont.uri for ont in db.session.query(Ontology).all()]
-    ):
+    if ontoUri not in database_utils.get_uri_index(Ontology):
         abort(404)
     return redirect(get_info_as_rdf(ontoUri, "text/turtle"), code=307)
 
@@ -269,9 +267,7 @@ def rdfxmlInfo():
     args = request.args
     ontoUri = args["o"] if "o" in args else ""
     ontoUri = unquote(ontoUri)
-    if not string_tools.get_uri_from_index(
-        ontoUri, [ont.uri for ont in db.session.query(Ontology).all()]
-    ):
+    if ontoUri not in database_utils.get_uri_index(Ontology):
         abort(404)
     return redirect(get_info_as_rdf(ontoUri, "application/rdf+xml"), code=307)
 
@@ -282,9 +278,7 @@ def ntriplesInfo():
     args = request.args
     ontoUri = args["o"] if "o" in args else ""
     ontoUri = unquote(ontoUri)
-    if not string_tools.get_uri_from_index(
-        ontoUri, [ont.uri for ont in db.session.query(Ontology).all()]
-    ):
+    if ontoUri not in database_utils.get_uri_index(Ontology):
         abort(status=404)
     return redirect(get_info_as_rdf(ontoUri, "application/n-triples"), code=307)
 
@@ -424,9 +418,7 @@ def download_handling(
     uri, is_dev=False, version="", rdf_format="owl", source_schema="http", versionMatching="exact"
 ):
     ontoUri = unquote(uri)
-    foundURI = string_tools.get_uri_from_index(
-        ontoUri, [ont.uri for ont in db.session.query(Ontology).all()]
-    )
+    foundURI = database_utils.get_uri_index(Ontology).find(ontoUri)
     if foundURI is None:
         abort(code=404)
     group, artifact = string_tools.generate_databus_identifier_from_uri(
@@ -0,0 +1,17 @@
+import os
+import sys
+
+# the modules of archivo are imported like in archivo/ itself, with top-level imports
+ARCHIVO_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archivo"
+)
+sys.path.insert(0, ARCHIVO_DIR)
+
+# the log files are opened relative to archivo/ on import, the working directory stays as it is for the
+# server tests
+__cwd = os.getcwd()
+os.chdir(ARCHIVO_DIR)
+try:
+    import utils.archivoLogs  # noqa: F401
+finally:
+    os.chdir(__cwd)
@@ -0,0 +1,102 @@
+import threading
+import time
+import unittest
+
+from utils.concurrency import KeyedLocks, get_host_key, run_host_aware
+
+
+class TestRunHostAware(unittest.TestCase):
+    def test_items_of_a_host_run_one_after_another(self):
+        lock = threading.Lock()
+        running = {}
+        max_running = {}
+        max_total = [0]
+
+        def work(item):
+            host, _ = item
+            with lock:
+                running[host] = running.get(host, 0) + 1
+                max_running[host] = max(max_running.get(host, 0), running[host])
+                max_total[0] = max(max_total[0], sum(running.values()))
+            time.sleep(0.01)
+            with lock:
+                running[host] -= 1
+            return item
+
+        items = [(host, i) for i in range(5) for host in ["a", "b", "c"]]
+        results = list(
+            run_host_aware(
+                items, work, key_fun=lambda item: item[0], max_workers=3, max_per_host=1
+            )
+        )
+
+        self.assertEqual(sorted(item for item, _, _ in results), sorted(items))
+        self.assertEqual(max_running, {"a": 1, "b": 1, "c": 1})
+        # the hosts themselves ran in parallel
+        self.assertGreater(max_total[0], 1)
+
+    def test_backlog_limits_the_consumed_input(self):
+        consumed = [0]
+        release = threading.Event()
+
+        def items():
+            for i in range(100):
+                consumed[0] += 1
+                yield i
+
+        def work(item):
+            release.wait(5)
+            return item
+
+        results = []
+        consumer = threading.Thread(
+            target=lambda: results.extend(
+                run_host_aware(
+                    items(),
+                    work,
+                    key_fun=lambda item: "same-host",
+                    max_workers=2,
+                    max_per_host=1,
+                    max_backlog=3,
+                )
+            )
+        )
+        consumer.start()
+        time.sleep(0.2)
+        # one item running, three waiting for the busy host
+        self.assertEqual(consumed[0], 4)
+        release.set()
+        consumer.join(10)
+
+        self.assertEqual(consumed[0], 100)
+        self.assertEqual(sorted(result for _, result, _ in results), list(range(100)))
+
+    def test_exceptions_are_yielded(self):
+        def work(item):
+            if item == 2:
+                raise ValueError(item)
+            return item * 10
+
+        results = {
+            item: (result, exception)
+            for item, result, exception in run_host_aware(
+                range(4), work, key_fun=str, max_workers=2, max_per_host=1
+            )
+        }
+        self.assertEqual(results[1], (10, None))
+        self.assertIsNone(results[2][0])
+        self.assertIsInstance(results[2][1], ValueError)
+
+    def test_host_key(self):
+        self.assertEqual(get_host_key("https://WWW.Example.org/onto#"), "example.org")
+        self.assertEqual(
+            get_host_key("http://example.org:8080/onto"), "example.org:8080"
+        )
+
+
+class TestKeyedLocks(unittest.TestCase):
+    def test_locks_are_dropped_when_released(self):
+        locks = KeyedLocks()
+        with locks.hold("a"):
+            self.assertEqual(len(locks), 1)
+        self.assertEqual(len(locks), 0)
@@ -0,0 +1,81 @@
+import unittest
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("databusclient")
+
+from webservice_database import app, db, dbModels  # noqa: E402
+from utils import database_utils  # noqa: E402
+
+OFFICIAL_URI = "http://example.org/onto"
+DEV_URI = "https://raw.githubusercontent.com/example/onto/master/onto.ttl"
+
+
+class TestGetURIIndex(unittest.TestCase):
+    def setUp(self):
+        self.context = app.app_context()
+        self.context.push()
+        db.drop_all()
+        db.create_all()
+        now = datetime.now()
+        db.session.add(
+            dbModels.OfficialOntology(uri=OFFICIAL_URI, source="user", accessDate=now)
+        )
+        db.session.add(
+            dbModels.DevelopOntology(
+                uri=DEV_URI, source="DEV", accessDate=now, official=OFFICIAL_URI
+            )
+        )
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        self.context.pop()
+
+    def test_index_of_the_model(self):
+        self.assertIn(OFFICIAL_URI, database_utils.get_uri_index(dbModels.Ontology))
+        self.assertIn(DEV_URI, database_utils.get_uri_index(dbModels.Ontology))
+        self.assertNotIn(
+            DEV_URI, database_utils.get_uri_index(dbModels.OfficialOntology)
+        )
+
+    def test_replaced_ontology(self):
+        self.assertIn(DEV_URI, database_utils.get_uri_index(dbModels.Ontology))
+
+        # like a new trackThis URI of the official ontology, the number of ontologies stays the same
+        new_dev_uri = DEV_URI.replace("master", "main")
+        db.session.add(
+            dbModels.DevelopOntology(
+                uri=new_dev_uri,
+                source="DEV",
+                accessDate=datetime.now(),
+                official=OFFICIAL_URI,
+            )
+        )
+        db.session.delete(
+            db.session.query(dbModels.DevelopOntology).filter_by(uri=DEV_URI).first()
+        )
+        db.session.commit()
+
+        index = database_utils.get_uri_index(dbModels.Ontology)
+        self.assertIn(new_dev_uri, index)
+        self.assertNotIn(DEV_URI, index)
+        self.assertEqual(len(index), 2)
+
+    def test_cached_until_ontologies_change(self):
+        index = database_utils.get_uri_index(dbModels.Ontology)
+        ontology = (
+            db.session.query(dbModels.Ontology).filter_by(uri=OFFICIAL_URI).first()
+        )
+        ontology.title = "changed"
+        db.session.commit()
+        self.assertIs(database_utils.get_uri_index(dbModels.Ontology), index)
+
+        db.session.add(
+            dbModels.OfficialOntology(uri=OFFICIAL_URI + "/other", source="user")
+        )
+        db.session.flush()
+        db.session.rollback()
+        self.assertIs(database_utils.get_uri_index(dbModels.Ontology), index)
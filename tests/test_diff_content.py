@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import pytest
+
+# update_archivo pulls in the webservice and the databus client
+pytest.importorskip("flask")
+pytest.importorskip("databusclient")
+
+from update import update_archivo  # noqa: E402
+
+MODIFIED = "http://purl.org/dc/terms/modified"
+
+
+def triple(subject, predicate, obj):
+    return f"<http://example.org/{subject}> <{predicate}> {obj} ."
+
+
+def set_based_diff(old_lines, new_lines):
+    """The result of the diff before the merge: set differences of the triples"""
+    old_triples, new_triples = set(old_lines), set(new_lines)
+    removed, added = old_triples - new_triples, new_triples - old_triples
+    is_diff = any(
+        update_archivo.no_ignored_props_in_line(line.encode("utf-8"))
+        for line in removed | added
+    )
+    return is_diff, removed, added
+
+
+class TestDiffContent(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def write_sorted(self, name, lines):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "wb") as nt_file:
+            nt_file.write(
+                b"".join(line.encode("utf-8") + b"\n" for line in sorted(set(lines)))
+            )
+        return path
+
+    def assertSameAsSetDiff(self, old_lines, new_lines):
+        diff_result = update_archivo.diff_content(
+            self.write_sorted("old.nt", old_lines),
+            self.write_sorted("new.nt", new_lines),
+        )
+        self.addCleanup(diff_result.close)
+        is_diff, removed, added = set_based_diff(old_lines, new_lines)
+        self.assertEqual(diff_result.is_diff, is_diff)
+        self.assertEqual(set(diff_result.old_content.get_text().splitlines()), removed)
+        self.assertEqual(set(diff_result.new_content.get_text().splitlines()), added)
+        self.assertEqual(diff_result.old_triple_count, len(removed))
+        self.assertEqual(diff_result.new_triple_count, len(added))
+        return diff_result
+
+    def test_changed_label(self):
+        label = "http://www.w3.org/2000/01/rdf-schema#label"
+        old_lines = [triple(f"t{i}", label, f'"old {i}"') for i in range(20)]
+        new_lines = old_lines[5:] + [triple("t0", label, '"new 0"')]
+        self.assertTrue(self.assertSameAsSetDiff(old_lines, new_lines).is_diff)
+
+    def test_only_ignored_changes(self):
+        old_lines = [triple("a", MODIFIED, '"2023-01-01"')]
+        new_lines = [triple("a", MODIFIED, '"2023-01-02"')]
+        self.assertFalse(self.assertSameAsSetDiff(old_lines, new_lines).is_diff)
+
+    def test_equal_files(self):
+        lines = [triple(f"t{i}", MODIFIED, f'"{i}"') for i in range(5)]
+        self.assertFalse(self.assertSameAsSetDiff(lines, list(reversed(lines))).is_diff)
+
+    def test_one_side_empty(self):
+        lines = [triple("a", "http://example.org/p", "<http://example.org/b>")]
+        self.assertSameAsSetDiff([], lines)
+        self.assertSameAsSetDiff(lines, [])
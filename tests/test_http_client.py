@@ -0,0 +1,39 @@
+import threading
+import unittest
+
+import requests
+
+from utils.http_client import HTTPClient
+
+
+class TestHTTPClient(unittest.TestCase):
+    def test_one_session_per_thread_sharing_the_adapter(self):
+        client = HTTPClient()
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(client.session))
+        thread.start()
+        thread.join()
+
+        self.assertIs(client.session, client.session)
+        self.assertIsNot(sessions[0], client.session)
+        self.assertIs(sessions[0].get_adapter("https://example.org"), client.adapter)
+        self.assertIs(client.session.get_adapter("http://example.org"), client.adapter)
+
+    def test_cookies_are_rejected(self):
+        session = HTTPClient().session
+        request = requests.Request("GET", "http://example.org/").prepare()
+
+        class FakeHeaders:
+            def get_all(self, name, default=None):
+                return (
+                    ["tracking=1; Path=/"] if name.lower() == "set-cookie" else default
+                )
+
+        class FakeOriginalResponse:
+            msg = FakeHeaders()
+
+        class FakeRaw:
+            _original_response = FakeOriginalResponse()
+
+        requests.cookies.extract_cookies_to_jar(session.cookies, request, FakeRaw())
+        self.assertEqual(len(session.cookies), 0)
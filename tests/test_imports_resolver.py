@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from utils.imports_resolver import OWL_IMPORTS, ImportsClosure, ImportsResolver
+
+
+def write_ontology(path, iri, imports):
+    with open(path, "w", encoding="utf-8") as nt_file:
+        nt_file.write(
+            f"<{iri}> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/2002/07/owl#Ontology> .\n"
+        )
+        for imported_iri in imports:
+            nt_file.write(f"<{iri}> <{OWL_IMPORTS}> <{imported_iri}> .\n")
+
+
+class TestImportsResolver(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cache_dir = os.path.join(self.tmp_dir.name, "closures")
+        self.resolver = ImportsResolver(
+            local_path=None, cache_dir=self.cache_dir, max_entries=1, min_age_seconds=0
+        )
+
+    def build_closure(self, name):
+        iri = f"http://example.org/{name}"
+        path = os.path.join(self.tmp_dir.name, f"{name}.nt")
+        write_ontology(path, iri, [])
+        root_path = os.path.join(self.tmp_dir.name, f"root-{name}.nt")
+        write_ontology(root_path, "http://example.org/root", [iri])
+        return root_path, ImportsClosure(files={iri: path})
+
+    def test_imports_are_rewritten_to_the_closure(self):
+        root_path, closure = self.build_closure("a")
+        with self.resolver.materialize(root_path, closure) as full_path:
+            with open(full_path, encoding="utf-8") as nt_file:
+                content = nt_file.read()
+            self.assertIn(f"<{OWL_IMPORTS}> <file:", content)
+            self.assertNotIn("<http://example.org/a> .", content)
+        self.assertFalse(os.path.exists(full_path))
+
+    def test_closures_in_use_are_not_pruned(self):
+        root_a, closure_a = self.build_closure("a")
+        root_b, closure_b = self.build_closure("b")
+        with self.resolver.materialize(root_a, closure_a) as path_a:
+            # writing b exceeds max_entries, but a is still used
+            with self.resolver.materialize(root_b, closure_b):
+                pass
+            self.assertTrue(os.path.isfile(path_a))
+            self.assertEqual(len(os.listdir(os.path.dirname(path_a))), 2)
+
+    def test_recently_used_closures_are_not_pruned(self):
+        resolver = ImportsResolver(
+            local_path=None,
+            cache_dir=self.cache_dir,
+            max_entries=1,
+            min_age_seconds=3600,
+        )
+        for name in ["a", "b"]:
+            root_path, closure = self.build_closure(name)
+            with resolver.materialize(root_path, closure):
+                pass
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        root_path, closure = self.build_closure("c")
+        with self.resolver.materialize(root_path, closure):
+            pass
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_cache_dir_accessible_by_others_is_not_used(self):
+        os.makedirs(self.cache_dir, mode=0o777)
+        os.chmod(self.cache_dir, 0o777)
+        self.assertFalse(self.resolver.is_available())
+        root_path, closure = self.build_closure("a")
+        with self.assertRaises(PermissionError):
+            with self.resolver.materialize(root_path, closure):
+                pass
+        self.assertEqual(os.listdir(self.cache_dir), [])
@@ -0,0 +1,29 @@
+import os
+import unittest
+from unittest import mock
+
+from utils import jvm_worker
+
+
+class TestJvmWorkerPool(unittest.TestCase):
+    def test_worker_class_is_compiled_into_a_private_directory(self):
+        pool = jvm_worker.JvmWorkerPool()
+        with mock.patch.object(jvm_worker.subprocess, "run") as run:
+            self.assertTrue(pool._JvmWorkerPool__ensure_compiled())
+        self.assertEqual(run.call_args[0][0][:3], ["javac", "-d", pool.class_dir])
+        self.assertEqual(os.stat(pool.class_dir).st_mode & 0o777, 0o700)
+
+        other_pool = jvm_worker.JvmWorkerPool()
+        with mock.patch.object(jvm_worker.subprocess, "run"):
+            other_pool._JvmWorkerPool__ensure_compiled()
+        self.assertNotEqual(other_pool.class_dir, pool.class_dir)
+
+        for compiled_pool in [pool, other_pool]:
+            compiled_pool.shutdown()
+            self.assertFalse(os.path.exists(compiled_pool.class_dir))
+
+    def test_failed_compilation(self):
+        pool = jvm_worker.JvmWorkerPool()
+        with mock.patch.object(jvm_worker.subprocess, "run", side_effect=OSError):
+            self.assertFalse(pool._JvmWorkerPool__ensure_compiled())
+        pool.shutdown()
@@ -0,0 +1,39 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("SPARQLWrapper")
+
+from querying import query_databus  # noqa: E402
+
+ARTIFACT = "https://databus.dbpedia.org/ontologies/example.org/onto"
+
+
+class TestLatestVersionCache(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(
+            query_databus,
+            "nir_to_latest_version_files",
+            side_effect=lambda: {ARTIFACT: {"version": "2024.01.01-000000"}},
+        )
+        self.query = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_queried_again_after_max_age(self):
+        cache = query_databus.LatestVersionCache(max_age_minutes=60)
+        now = datetime.now()
+        cache.get(now)
+        cache.get(now + timedelta(minutes=59))
+        self.assertEqual(self.query.call_count, 1)
+        cache.get(now + timedelta(minutes=60))
+        self.assertEqual(self.query.call_count, 2)
+
+    def test_deployed_versions_are_recorded(self):
+        cache = query_databus.LatestVersionCache(max_age_minutes=60)
+        now = datetime.now()
+        cache.get(now)
+        cache.set_version(ARTIFACT, "2024.02.01-000000")
+        cache.set_version(ARTIFACT + "-unknown", "2024.02.01-000000")
+        self.assertEqual(cache.get(now), {ARTIFACT: {"version": "2024.02.01-000000"}})
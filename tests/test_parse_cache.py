@@ -0,0 +1,45 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from utils.parse_cache import MISS, ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cache = ParseCache(
+            directory=os.path.join(self.tmp_dir.name, "cache"), max_bytes=1024 * 1024
+        )
+
+    def list_files(self):
+        return [
+            file_name
+            for _, _, files in os.walk(self.tmp_dir.name)
+            for file_name in files
+        ]
+
+    def test_put_and_get(self):
+        key = ParseCache.build_key("sha", "parse")
+        self.assertIs(self.cache.get(key, 10), MISS)
+        self.cache.put(key, {"parsed_rdf": '<a> <b> "ä" .', "triples": 1})
+        self.assertEqual(
+            self.cache.get(key, 10), {"parsed_rdf": '<a> <b> "ä" .', "triples": 1}
+        )
+        self.assertEqual(os.stat(self.cache.directory).st_mode & 0o777, 0o700)
+
+    def test_failed_put_leaves_no_temporary_file(self):
+        key = ParseCache.build_key("sha", "parse")
+        self.cache.put(key, threading.Lock())
+        self.assertEqual(self.list_files(), [])
+        self.assertIs(self.cache.get(key, 10), MISS)
+
+    def test_directory_accessible_by_others_is_not_used(self):
+        os.makedirs(self.cache.directory, mode=0o777)
+        os.chmod(self.cache.directory, 0o777)
+        key = ParseCache.build_key("sha", "parse")
+        self.cache.put(key, "result")
+        self.assertEqual(self.list_files(), [])
+        self.assertIs(self.cache.get(key, 10), MISS)
@@ -0,0 +1,75 @@
+import tempfile
+import unittest
+
+import pytest
+
+pytest.importorskip("rdflib")
+
+from models.content_negotiation import RDF_Type  # noqa: E402
+from utils import parsing  # noqa: E402
+from utils.parse_cache import ParseCache  # noqa: E402
+from utils.parsing_service import ParsingService  # noqa: E402
+
+DOCUMENT = "<http://example.org/a> <http://example.org/b> <http://example.org/c> .\n"
+BASE_URI = "http://example.org/"
+
+
+class FakeRapper:
+    def __init__(self):
+        self.calls = []
+
+    def parse(self, rdf_input, base_uri, input_type, output_type):
+        self.calls.append("parse")
+        return parsing.RapperParsingResult(
+            "rapper", output_type, parsing.RapperParsingInfo(2, ["warning"], [])
+        )
+
+    def count(self, rdf_input, base_uri, input_type):
+        self.calls.append("count")
+        return parsing.RapperParsingInfo(2, ["warning"], [])
+
+
+class FakeWorkerPool:
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, data, base_uri, input_type, output_type):
+        self.calls += 1
+        return 1, "rdflib" if output_type is not None else None
+
+
+class TestParsingService(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.service = ParsingService(
+            mode="auto",
+            inprocess_max_bytes=1024,
+            cache=ParseCache(directory=self.tmp_dir.name, min_input_bytes=0),
+        )
+        self.service.rapper = FakeRapper()
+        self.service.worker_pool = FakeWorkerPool()
+
+    def test_small_documents_are_counted_by_rapper(self):
+        info = self.service.count(DOCUMENT, BASE_URI, RDF_Type.N_TRIPLES)
+        self.assertEqual((info.triple_number, info.warnings), (2, ["warning"]))
+        self.assertEqual(self.service.worker_pool.calls, 0)
+        # cached
+        self.service.count(DOCUMENT, BASE_URI, RDF_Type.N_TRIPLES)
+        self.assertEqual(self.service.rapper.calls, ["count"])
+
+    def test_worker_pool_results_are_not_cached_for_rapper(self):
+        result = self.service.parse(
+            DOCUMENT, BASE_URI, RDF_Type.N_TRIPLES, allow_inprocess=True
+        )
+        self.assertEqual(result.parsed_rdf, "rdflib")
+
+        result = self.service.parse(DOCUMENT, BASE_URI, RDF_Type.N_TRIPLES)
+        self.assertEqual(result.parsed_rdf, "rapper")
+        # both results are cached separately
+        result = self.service.parse(
+            DOCUMENT, BASE_URI, RDF_Type.N_TRIPLES, allow_inprocess=True
+        )
+        self.assertEqual(result.parsed_rdf, "rdflib")
+        self.assertEqual(self.service.rapper.calls, ["parse"])
+        self.assertEqual(self.service.worker_pool.calls, 1)
@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("pyshacl")
+
+from utils import validation  # noqa: E402
+from utils.parse_cache import ParseCache  # noqa: E402
+
+
+class TestReasoningCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        patcher = mock.patch.object(
+            validation,
+            "reasoning_cache",
+            ParseCache(directory=self.tmp_dir.name, min_input_bytes=0),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # the SHACL graphs aren't needed for pellet
+        self.test_suite = validation.TestSuite.__new__(validation.TestSuite)
+        self.pellet_runs = []
+
+        def run_pellet(ontology_url, command, parameters):
+            self.pellet_runs.append(ontology_url)
+            return "Consistent: Yes", "", 0
+
+        self.test_suite._TestSuite__run_pellet = run_pellet
+
+    def test_cached_by_key(self):
+        for _ in range(2):
+            result = self.test_suite.run_pellet_command(
+                "file:///onto.ttl", "consistency", cache_key="content"
+            )
+            self.assertEqual(result, ("Consistent: Yes", "", 0))
+        self.assertEqual(self.pellet_runs, ["file:///onto.ttl"])
+
+        self.test_suite.run_pellet_command(
+            "file:///onto.ttl", "consistency", ["--ignore-imports"], cache_key="content"
+        )
+        self.assertEqual(len(self.pellet_runs), 2)
@@ -0,0 +1,110 @@
+import unittest
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("flask")
+
+from webservice_database import app, db, dbModels  # noqa: E402
+from update import revisit_schedule  # noqa: E402
+from utils import archivo_config  # noqa: E402
+
+URI = "http://example.org/onto"
+
+
+class TestGetInterval(unittest.TestCase):
+    def test_clamped_to_the_limits_of_the_kind(self):
+        for kind in ["official", "dev"]:
+            min_interval = timedelta(
+                minutes=archivo_config.REVISIT_MIN_INTERVAL_MINUTES[kind]
+            )
+            max_interval = timedelta(
+                minutes=archivo_config.REVISIT_MAX_INTERVAL_MINUTES[kind]
+            )
+            self.assertEqual(
+                revisit_schedule.get_interval(0.0, 0.0, kind), max_interval
+            )
+            self.assertEqual(
+                revisit_schedule.get_interval(1000.0, 0.0, kind), min_interval
+            )
+
+    def test_shorter_for_frequent_changes(self):
+        self.assertLess(
+            revisit_schedule.get_interval(0.5, 0.0, "official"),
+            revisit_schedule.get_interval(0.1, 0.0, "official"),
+        )
+
+    def test_failures_stretch_the_interval_up_to_twice(self):
+        interval = revisit_schedule.get_interval(0.1, 0.0, "official").total_seconds()
+        self.assertAlmostEqual(
+            revisit_schedule.get_interval(0.1, 0.5, "official").total_seconds(),
+            interval * 1.5,
+            places=3,
+        )
+        self.assertAlmostEqual(
+            revisit_schedule.get_interval(0.1, 5.0, "official").total_seconds(),
+            interval * 2,
+            places=3,
+        )
+
+
+class TestRecordCheck(unittest.TestCase):
+    def setUp(self):
+        self.context = app.app_context()
+        self.context.push()
+        db.drop_all()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        self.context.pop()
+
+    def test_first_check_creates_the_schedule(self):
+        schedule = revisit_schedule.record_check(URI, "official", False)
+        self.assertIsNotNone(schedule.lastCheck)
+        self.assertGreater(schedule.nextCheck, schedule.lastCheck)
+        self.assertEqual(db.session.query(dbModels.RevisitSchedule).count(), 1)
+
+    def test_changes_shorten_the_interval(self):
+        unchanged = revisit_schedule.record_check(URI, "official", False)
+        unchanged_interval = unchanged.nextCheck - unchanged.lastCheck
+        changed = revisit_schedule.record_check(URI, "official", True)
+        self.assertLess(changed.nextCheck - changed.lastCheck, unchanged_interval)
+
+    def test_failed_check_keeps_the_change_estimate(self):
+        schedule = revisit_schedule.record_check(URI, "official", False)
+        change_weight, last_check = schedule.changeWeight, schedule.lastCheck
+        failure_weight = schedule.failureWeight
+        schedule = revisit_schedule.record_check(URI, "official", None)
+        self.assertEqual(schedule.changeWeight, change_weight)
+        self.assertEqual(schedule.lastCheck, last_check)
+        self.assertGreater(schedule.failureWeight, failure_weight)
+
+    def test_due_ontologies(self):
+        now = datetime.now()
+        for uri in [URI, URI + "/due", URI + "/new"]:
+            db.session.add(
+                dbModels.OfficialOntology(uri=uri, source="user", accessDate=now)
+            )
+        revisit_schedule.record_check(URI, "official", False)
+        due_schedule = revisit_schedule.record_check(URI + "/due", "official", False)
+        due_schedule.nextCheck = now - timedelta(minutes=1)
+        db.session.commit()
+
+        due_uris = {
+            ont.uri
+            for ont in revisit_schedule.get_due_ontologies(
+                dbModels.OfficialOntology, now
+            )
+        }
+        self.assertEqual(due_uris, {URI + "/due", URI + "/new"})
+
+    def test_delete_schedule(self):
+        revisit_schedule.record_check(URI, "dev", False)
+        revisit_schedule.record_check(URI + "/other", "dev", False)
+        revisit_schedule.delete_schedule(URI)
+        db.session.commit()
+        self.assertEqual(
+            [schedule.uri for schedule in db.session.query(dbModels.RevisitSchedule)],
+            [URI + "/other"],
+        )
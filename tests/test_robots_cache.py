@@ -0,0 +1,56 @@
+import threading
+import unittest
+from unittest import mock
+
+from crawling.robots_cache import RobotsCache
+
+
+class FakeResponse:
+    status_code = 200
+    text = "User-agent: *\nDisallow: /private/\n"
+
+
+class TestRobotsCache(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch(
+            "crawling.robots_cache.http_client.get", return_value=FakeResponse()
+        )
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_can_fetch(self):
+        cache = RobotsCache()
+        self.assertEqual(cache.can_fetch("http://example.org/onto"), (True, None))
+        self.assertEqual(
+            cache.can_fetch("http://example.org/private/onto"), (False, "Not allowed")
+        )
+        self.assertEqual(self.get.call_count, 1)
+        self.assertEqual(cache.can_fetch("no uri"), (None, None))
+
+    def test_least_recently_used_hosts_are_evicted(self):
+        cache = RobotsCache(max_entries=2)
+        cache.get_entry("http://a.example.org/")
+        cache.get_entry("http://b.example.org/")
+        # a is used again, so b is evicted by c
+        cache.get_entry("http://a.example.org/")
+        cache.get_entry("http://c.example.org/")
+        self.assertEqual(cache.stats()["hosts"], 2)
+        self.assertEqual(self.get.call_count, 3)
+
+        cache.get_entry("http://a.example.org/")
+        self.assertEqual(self.get.call_count, 3)
+        cache.get_entry("http://b.example.org/")
+        self.assertEqual(self.get.call_count, 4)
+
+    def test_concurrent_lookups_fetch_once(self):
+        cache = RobotsCache()
+        threads = [
+            threading.Thread(target=cache.get_entry, args=(f"http://example.org/{i}",))
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.get.call_count, 1)
+        self.assertEqual(cache.stats(), {"hits": 19, "misses": 1, "hosts": 1})
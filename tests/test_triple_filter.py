@@ -0,0 +1,73 @@
+import unittest
+
+from utils.triple_filter import TripleFilter, split_triple
+
+MODIFIED = "http://purl.org/dc/terms/modified"
+LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+SEE_ALSO = "http://www.w3.org/2000/01/rdf-schema#seeAlso"
+
+
+class TestTripleFilter(unittest.TestCase):
+    def setUp(self):
+        self.triple_filter = TripleFilter(
+            ignored_properties=[MODIFIED], subject_rules={}
+        )
+
+    def assertIgnored(self, line, expected):
+        self.assertEqual(self.triple_filter.is_ignored_line(line), expected)
+        self.assertEqual(
+            self.triple_filter.is_ignored_bytes(line.encode("utf-8")), expected
+        )
+
+    def test_ignored_predicate(self):
+        self.assertIgnored(f'<http://example.org/a> <{MODIFIED}> "2023-01-01" .', True)
+
+    def test_ignored_property_as_object_is_a_change(self):
+        self.assertIgnored(f"<http://example.org/a> <{SEE_ALSO}> <{MODIFIED}> .", False)
+
+    def test_ignored_property_in_literal_is_a_change(self):
+        self.assertIgnored(
+            f'<http://example.org/a> <{LABEL}> "see {MODIFIED}" .', False
+        )
+
+    def test_blank_node_subject(self):
+        self.assertIgnored(f'_:b0 <{MODIFIED}> "2023-01-01" .', True)
+        self.assertIgnored(f'_:b0 <{LABEL}> "a" .', False)
+
+    def test_irregular_whitespace(self):
+        self.assertIgnored(
+            f'<http://example.org/a>\t<{MODIFIED}>\t"2023-01-01" .', True
+        )
+
+    def test_no_triple_is_not_ignored(self):
+        self.assertIgnored("# a comment", False)
+        self.assertIgnored("", False)
+
+    def test_subject_rules(self):
+        triple_filter = TripleFilter(
+            ignored_properties=[],
+            subject_rules={
+                LABEL: [r"^http://example\.org/generated/"],
+                "*": [r"/tmp#"],
+            },
+        )
+        for line, expected in [
+            (f'<http://example.org/generated/a> <{LABEL}> "a" .', True),
+            (f'<http://example.org/a> <{LABEL}> "a" .', False),
+            (
+                f"<http://example.org/a> <{SEE_ALSO}> <http://example.org/generated/a> .",
+                False,
+            ),
+            (f"<http://example.org/tmp#a> <{SEE_ALSO}> <http://example.org/b> .", True),
+        ]:
+            self.assertEqual(triple_filter.is_ignored_line(line), expected, line)
+            self.assertEqual(
+                triple_filter.is_ignored_bytes(line.encode("utf-8")), expected, line
+            )
+
+    def test_split_triple(self):
+        self.assertEqual(
+            split_triple(f'<http://example.org/a> <{LABEL}> "a b"@en .'),
+            ("http://example.org/a", LABEL, '"a b"@en'),
+        )
+        self.assertIsNone(split_triple("# comment"))
@@ -0,0 +1,99 @@
+import os
+import random
+import tempfile
+import unittest
+
+from utils import triple_index
+
+TRIPLES = [
+    f"<http://example.org/s{i}> <http://example.org/p> <http://example.org/o{i}> .".encode(
+        "utf-8"
+    )
+    for i in range(50)
+]
+
+
+def write_lines(path, lines):
+    with open(path, "wb") as nt_file:
+        nt_file.write(b"".join(line + b"\n" for line in lines))
+
+
+class TestTripleIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def build_index(
+        self, name, lines, chunk_size=triple_index.TRIPLE_INDEX_SORT_CHUNK_SIZE
+    ):
+        nt_path = os.path.join(self.tmp_dir.name, f"{name}.nt")
+        index_path = os.path.join(self.tmp_dir.name, f"{name}.idx")
+        write_lines(nt_path, lines)
+        triple_index.build_triple_index(nt_path, index_path, chunk_size=chunk_size)
+        return nt_path, index_path
+
+    def test_fingerprint_is_order_independent(self):
+        shuffled = list(TRIPLES)
+        random.Random(42).shuffle(shuffled)
+        self.assertEqual(
+            triple_index.compute_fingerprint(TRIPLES),
+            triple_index.compute_fingerprint(shuffled),
+        )
+
+    def test_fingerprint_ignores_sorted_duplicates(self):
+        lines = sorted(TRIPLES)
+        with_duplicates = sorted(lines + lines[:10])
+        fingerprint = triple_index.compute_fingerprint(with_duplicates)
+        self.assertEqual(triple_index.compute_fingerprint(lines), fingerprint)
+        self.assertTrue(fingerprint.startswith(f"{len(TRIPLES)}-"))
+
+    def test_fingerprint_changes_with_the_triples(self):
+        self.assertNotEqual(
+            triple_index.compute_fingerprint(TRIPLES),
+            triple_index.compute_fingerprint(TRIPLES[1:]),
+        )
+
+    def test_build_index_skips_duplicates(self):
+        _, index_path = self.build_index("dup", TRIPLES + TRIPLES[:5] + [b""])
+        with triple_index.TripleIndex(index_path) as index:
+            self.assertEqual(len(index), len(TRIPLES))
+            self.assertEqual(list(index.hashes), sorted(index.hashes))
+
+    def test_chunked_index_equals_single_chunk(self):
+        lines = TRIPLES + TRIPLES[:5]
+        _, single_path = self.build_index("single", lines)
+        _, chunked_path = self.build_index("chunked", lines, chunk_size=7)
+        with triple_index.TripleIndex(single_path) as single, triple_index.TripleIndex(
+            chunked_path
+        ) as chunked:
+            self.assertEqual(len(chunked), len(TRIPLES))
+            self.assertEqual(list(chunked.hashes), list(single.hashes))
+            self.assertEqual(list(chunked.offsets), list(single.offsets))
+
+    def test_diff_triple_indices(self):
+        old_lines = TRIPLES[:40]
+        new_lines = list(reversed(TRIPLES[10:50]))
+        old_nt, old_index_path = self.build_index("old", old_lines)
+        new_nt, new_index_path = self.build_index("new", new_lines)
+
+        with triple_index.TripleIndex(
+            old_index_path
+        ) as old_index, triple_index.TripleIndex(new_index_path) as new_index:
+            removed, added = triple_index.diff_triple_indices(old_index, new_index)
+
+        self.assertEqual(
+            set(triple_index.read_lines_at(old_nt, removed)), set(TRIPLES[:10])
+        )
+        self.assertEqual(
+            set(triple_index.read_lines_at(new_nt, added)), set(TRIPLES[40:])
+        )
+
+    def test_diff_of_equal_indices_is_empty(self):
+        _, old_index_path = self.build_index("old", TRIPLES)
+        _, new_index_path = self.build_index("new", list(reversed(TRIPLES)))
+        with triple_index.TripleIndex(
+            old_index_path
+        ) as old_index, triple_index.TripleIndex(new_index_path) as new_index:
+            self.assertEqual(
+                triple_index.diff_triple_indices(old_index, new_index), ([], [])
+            )
@@ -0,0 +1,55 @@
+import threading
+import unittest
+
+from utils.uri_index import URIIndex
+
+ONTOLOGY = "http://example.org/onto"
+
+
+class TestURIIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = URIIndex([ONTOLOGY, "https://w3id.org/vocab#"])
+
+    def test_find_ignores_fragments(self):
+        self.assertEqual(self.index.find(ONTOLOGY + "#"), ONTOLOGY)
+        self.assertEqual(
+            self.index.find("https://w3id.org/vocab"), "https://w3id.org/vocab#"
+        )
+        self.assertIsNone(self.index.find(ONTOLOGY + "/"))
+        self.assertIn(ONTOLOGY + "#Class", self.index)
+
+    def test_add_of_equal_uri(self):
+        self.assertFalse(self.index.add(ONTOLOGY + "#"))
+        self.assertTrue(self.index.add("http://example.org/other"))
+        self.assertEqual(len(self.index), 3)
+
+    def test_prefix_matches(self):
+        self.assertTrue(self.index.contains_prefix_of(ONTOLOGY))
+        self.assertTrue(self.index.contains_prefix_of(ONTOLOGY + "/Class"))
+        self.assertTrue(self.index.contains_prefix_of("https://w3id.org/vocab#term"))
+
+    def test_substring_is_no_match(self):
+        self.assertFalse(
+            self.index.contains_prefix_of(f"http://mirror.example.com/?url={ONTOLOGY}")
+        )
+        self.assertFalse(self.index.contains_prefix_of("http://example.org/ont"))
+        self.assertFalse(self.index.contains_prefix_of("https://w3id.org/vocab"))
+
+    def test_concurrent_adds_and_reads(self):
+        uris = [f"http://example.org/onto{i}/" for i in range(2000)]
+
+        def add_all():
+            for uri in uris:
+                self.index.add(uri)
+
+        writer = threading.Thread(target=add_all)
+        writer.start()
+        while writer.is_alive():
+            self.index.contains_prefix_of(uris[-1] + "Class")
+            self.index.find(uris[-1])
+        writer.join()
+
+        self.assertEqual(len(self.index), len(uris) + 2)
+        self.assertTrue(
+            all(self.index.contains_prefix_of(uri + "Class") for uri in uris)
+        )
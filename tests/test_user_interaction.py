@@ -0,0 +1,48 @@
+import unittest
+
+from models.user_interaction import (
+    FailureClass,
+    LogLevel,
+    ProcessStepLog,
+    classify_failure,
+)
+
+URI = "http://example.org/onto"
+LINKED_URI = "http://example.org/linked"
+
+
+class TestClassifyFailure(unittest.TestCase):
+    def test_failure_of_the_uri(self):
+        process_log = [
+            ProcessStepLog(LogLevel.INFO, "Robot allowance check", "allowed"),
+            ProcessStepLog(
+                LogLevel.ERROR,
+                "Accessing RDF content",
+                "No RDF content accessible or parseable",
+                failure_class=FailureClass.UNAVAILABLE,
+                uri=URI,
+            ),
+        ]
+        self.assertEqual(
+            classify_failure(process_log, URI + "#"), FailureClass.UNAVAILABLE
+        )
+
+    def test_failure_of_a_linked_uri_is_ignored(self):
+        process_log = [
+            ProcessStepLog(LogLevel.INFO, "Searching for linked ontologies", "found"),
+            ProcessStepLog(
+                LogLevel.ERROR,
+                "Robot allowance check",
+                "not allowed",
+                failure_class=FailureClass.ROBOTS_DENIED,
+                uri=LINKED_URI,
+            ),
+        ]
+        self.assertIsNone(classify_failure(process_log, URI))
+
+    def test_unclassified_errors(self):
+        process_log = [
+            ProcessStepLog(LogLevel.ERROR, "Deployment to Databus", "Databus down"),
+        ]
+        self.assertIsNone(classify_failure(process_log, URI))
+        self.assertIsNone(classify_failure([], URI))
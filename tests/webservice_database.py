@@ -0,0 +1,28 @@
+import os
+import sqlite3
+import tempfile
+
+# Imports the webservice with a temporary SQLite database, for the tests of code using the database models.
+
+DATABASE_DIR = tempfile.TemporaryDirectory()
+DATABASE_PATH = os.path.join(DATABASE_DIR.name, "archivo.db")
+# the forms of the webservice query the ontologies on import, so these tables have to exist before
+with sqlite3.connect(DATABASE_PATH) as connection:
+    connection.executescript(
+        """
+        CREATE TABLE ontology (uri VARCHAR(120) PRIMARY KEY, title VARCHAR(300), source VARCHAR(64),
+            "accessDate" DATETIME, crawling_status BOOLEAN, type VARCHAR(50));
+        CREATE TABLE "officialOntology" (uri VARCHAR(120) PRIMARY KEY REFERENCES ontology (uri));
+        """
+    )
+
+# only set while the webservice reads its config, the server started by other tests uses the real database
+__database_url = os.environ.get("DATABASE_URL")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_PATH}"
+try:
+    from webservice import app, db, dbModels  # noqa: E402, F401
+finally:
+    if __database_url is None:
+        del os.environ["DATABASE_URL"]
+    else:
+        os.environ["DATABASE_URL"] = __database_url